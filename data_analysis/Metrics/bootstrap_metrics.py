@@ -0,0 +1,166 @@
+import functools
+import pandas as pd
+import numpy as np
+
+from multiprocessing import pool
+
+from .fold_metrics import FOLDS, log_arrays, metric_arrays, model_names
+
+# Largest number of resampled values held in memory at once, per array
+MAX_ELEMENTS = 2 ** 22
+
+
+def bootstrap_indices(n, resamples=2000, seed=0):
+    """
+    Draw a (resamples x n) matrix of row indices, sampled with replacement
+    :int n: number of rows to resample
+    :int resamples: number of bootstrap resamples
+    :int seed: seed of the random generator
+    """
+
+    rng = np.random.default_rng(seed)
+
+    return rng.integers(0, n, size=(resamples, n))
+
+
+def _resample_model(arrays, indices, folds=FOLDS, rank=True):
+    """
+    Every metric of one model on every resample, a chunk of resamples at
+    a time. Also the function run by the process pool.
+    :tuple arrays: log_x, log_y, fold_errors and valid of the model
+    :np.array indices: (resamples x n) row indices
+    :return: dict of metric name -> (resamples,) array
+    """
+
+    chunk = max(1, MAX_ELEMENTS // indices.shape[1])
+    chunks = []
+    for start in range(0, len(indices), chunk):
+        idx = indices[start:start + chunk]
+        chunks.append(metric_arrays(*[a[idx] for a in arrays], folds=folds,
+                                    rank=rank))
+
+    return {name: np.concatenate([c[name] for c in chunks])
+            for name in chunks[0]}
+
+
+def resample_metrics(x, y, resamples=2000, folds=FOLDS, seed=0, rank=True,
+                     workers=1):
+    """
+    Every metric of every model on the same bootstrap resamples
+    :float_vec x: true values
+    :float_vec y: predicted values, or a matrix/df with one column per model
+    :int resamples: number of bootstrap resamples
+    :list folds: folds to report % within n-fold for
+    :int seed: seed of the random generator
+    :bool rank: if False, skip the spearman correlation
+    :int workers: number of cores to devote, one model per job
+    :return: list of model names, list of point estimate dicts and list of
+        resample dicts of metric name -> array, one per model
+    """
+
+    log_x, log_y, fold_errors, valid = log_arrays(x, y)
+    names = model_names(y) or list(range(len(log_y)))
+    models = [(log_x[i], log_y[i], fold_errors[i], valid[i])
+              for i in range(len(log_y))]
+
+    points = [metric_arrays(*arrays, folds=folds, rank=rank)
+              for arrays in models]
+
+    indices = bootstrap_indices(log_x.shape[1], resamples, seed)
+    func = functools.partial(_resample_model, indices=indices, folds=folds,
+                             rank=rank)
+
+    if workers > 1:
+        with pool.Pool(workers) as p:
+            samples = p.map(func, models)
+    else:
+        samples = [func(arrays) for arrays in models]
+
+    return names, points, samples
+
+
+def bootstrap_ci(x, y, resamples=2000, alpha=0.05, folds=FOLDS, seed=0,
+                 rank=True, workers=1):
+    """
+    Percentile bootstrap confidence intervals of every metric of every
+    model, all evaluated on the same resamples
+    :float_vec x: true values
+    :float_vec y: predicted values, or a matrix/df with one column per model
+    :int resamples: number of bootstrap resamples
+    :float alpha: 1 - confidence level of the intervals
+    :list folds: folds to report % within n-fold for
+    :int seed: seed of the random generator
+    :bool rank: if False, skip the spearman correlation
+    :int workers: number of cores to devote, one model per job
+    :return: tidy pd.DataFrame of model, metric, estimate, se, lower, upper
+    """
+
+    names, points, samples = resample_metrics(x, y, resamples, folds, seed,
+                                              rank, workers)
+
+    rows = []
+    for name, point, sample in zip(names, points, samples):
+        for metric, values in sample.items():
+            lower, upper = np.nanpercentile(values, [100 * alpha / 2,
+                                                     100 * (1 - alpha / 2)])
+            rows.append({'model': name, 'metric': metric,
+                         'estimate': float(point[metric]),
+                         'se': float(np.nanstd(values, ddof=1)),
+                         'lower': lower, 'upper': upper})
+
+    return pd.DataFrame(rows)
+
+
+def paired_bootstrap(x, y, reference, resamples=2000, alpha=0.05,
+                     folds=FOLDS, seed=0, rank=True, workers=1):
+    """
+    Compare every model against a reference model on shared resamples.
+    Each model and the reference are scored on the rows both predict, and
+    each resample scores them on the same rows, so the interval of the
+    difference accounts for their correlated errors.
+    :float_vec x: true values
+    :pd.DataFrame y: predicted values with one column per model
+    :str reference: column of y holding the reference model
+    :int resamples: number of bootstrap resamples
+    :float alpha: 1 - confidence level of the intervals
+    :list folds: folds to report % within n-fold for
+    :int seed: seed of the random generator
+    :bool rank: if False, skip the spearman correlation
+    :int workers: number of cores to devote, one model per job
+    :return: tidy pd.DataFrame of model, metric, number of shared rows,
+        difference (model minus reference), lower, upper and a two-sided
+        bootstrap p value
+    """
+
+    names = model_names(y)
+    _, _, _, valid = log_arrays(x, y)
+    ref = names.index(reference)
+
+    rows = []
+    for i, name in enumerate(names):
+        if i == ref:
+            continue
+
+        # Both models on the rows they both predict
+        shared = valid[i] & valid[ref]
+        pair = pd.DataFrame({col: np.where(shared, y[col], np.nan)
+                             for col in [name, reference]})
+        _, points, samples = resample_metrics(x, pair, resamples, folds,
+                                              seed, rank, workers)
+
+        for metric, values in samples[0].items():
+            if metric == 'n':
+                continue
+            diffs = values - samples[1][metric]
+            diffs = diffs[~np.isnan(diffs)]
+            lower, upper = np.percentile(diffs, [100 * alpha / 2,
+                                                 100 * (1 - alpha / 2)])
+            p_value = 2 * min(np.mean(diffs <= 0), np.mean(diffs >= 0))
+            rows.append({'model': name, 'reference': reference,
+                         'metric': metric, 'n': int(shared.sum()),
+                         'difference': float(points[0][metric] -
+                                             points[1][metric]),
+                         'lower': lower, 'upper': upper,
+                         'p_value': min(p_value, 1.)})
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,172 @@
+import pandas as pd
+import numpy as np
+
+# Folds reported by default as % within n-fold
+FOLDS = (2, 3)
+
+
+def tie_runs(ordered):
+    """
+    First and last position of the run of tied values each entry of a
+    sorted array belongs to, along the last axis
+    :np.array ordered: values sorted along the last axis
+    """
+
+    # Bounds of each run of tied values, found from both ends
+    positions = np.broadcast_to(np.arange(ordered.shape[-1]), ordered.shape)
+    new_run = np.ones(ordered.shape, dtype=bool)
+    new_run[..., 1:] = ordered[..., 1:] != ordered[..., :-1]
+    end_run = np.ones(ordered.shape, dtype=bool)
+    end_run[..., :-1] = new_run[..., 1:]
+
+    starts = np.maximum.accumulate(np.where(new_run, positions, 0), axis=-1)
+    ends = np.flip(np.minimum.accumulate(
+        np.flip(np.where(end_run, positions, ordered.shape[-1]), axis=-1),
+        axis=-1), axis=-1)
+
+    return starts, ends
+
+
+def rank_last_axis(values, ties='average'):
+    """
+    Rank values along the last axis. NaNs are not ranked and stay NaN.
+    :np.array values: values to rank
+    :str ties: rank given to tied values, as in scipy's rankdata: the
+        'average', 'min' or 'max' of their ranks, or 'ordinal' (in order
+        of appearance)
+    """
+
+    if ties == 'ordinal':
+        order = np.argsort(values, axis=-1, kind='stable')
+        ordinal = np.broadcast_to(np.arange(1., values.shape[-1] + 1),
+                                  values.shape)
+    else:
+        order = np.argsort(values, axis=-1)
+        starts, ends = tie_runs(np.take_along_axis(values, order, axis=-1))
+        ordinal = {'average': (starts + ends) / 2. + 1,
+                   'min': starts + 1.,
+                   'max': ends + 1.}[ties]
+
+    ranks = np.empty(values.shape)
+    np.put_along_axis(ranks, order, ordinal, axis=-1)
+    ranks[np.isnan(values)] = np.nan
+
+    return ranks
+
+
+def _correlation(a, b, valid, count):
+    """
+    Pearson correlation along the last axis over the valid entries
+    """
+
+    a = np.where(valid, a, 0.)
+    b = np.where(valid, b, 0.)
+    da = np.where(valid, a - a.sum(axis=-1, keepdims=True) / count, 0.)
+    db = np.where(valid, b - b.sum(axis=-1, keepdims=True) / count, 0.)
+
+    return (da * db).sum(axis=-1) / np.sqrt((da ** 2).sum(axis=-1) *
+                                            (db ** 2).sum(axis=-1))
+
+
+def metric_arrays(log_x, log_y, fold_errors, valid, folds=FOLDS, rank=True,
+                  rank_x=None):
+    """
+    Reduce log values and log fold errors to every metric along the last
+    axis, over the valid (non-missing) pairs only
+    :np.array log_x: log10 true values
+    :np.array log_y: log10 predicted values, same shape as log_x
+    :np.array fold_errors: log10(y/x), same shape as log_x
+    :np.array valid: False where x or y is missing, same shape as log_x
+    :list folds: folds to report % within n-fold for
+    :bool rank: if False, skip the spearman correlation
+    :np.array rank_x: ranks of the valid log_x, if already known
+    :return: dict of metric name -> array of the reduced shape
+    """
+
+    count = valid.sum(axis=-1)
+    errors = np.where(valid, fold_errors, 0.)
+    abs_errors = np.abs(errors)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        count_kd = count[..., None]
+        metrics = {'n': count,
+                   'gmfe': 10 ** (abs_errors.sum(axis=-1) / count),
+                   'afe': 10 ** (errors.sum(axis=-1) / count)}
+
+        for n in folds:
+            within = valid & (errors >= np.log10(1 / n)) & \
+                (errors <= np.log10(n))
+            metrics['{}_fold_perc'.format(n)] = \
+                100. * within.sum(axis=-1) / count
+
+        dx = np.where(valid, log_x - np.where(valid, log_x, 0.)
+                      .sum(axis=-1, keepdims=True) / count_kd, 0.)
+        ss_res = (errors ** 2).sum(axis=-1)
+        metrics['r2'] = 1 - ss_res / (dx ** 2).sum(axis=-1)
+        metrics['pearson'] = _correlation(log_x, log_y, valid, count_kd)
+        if rank:
+            if rank_x is None:
+                rank_x = rank_last_axis(np.where(valid, log_x, np.nan))
+            metrics['spearman'] = _correlation(
+                rank_x, rank_last_axis(np.where(valid, log_y, np.nan)),
+                valid, count_kd)
+        metrics['log_rmse'] = np.sqrt(ss_res / count)
+
+    return metrics
+
+
+def log_arrays(x, y):
+    """
+    Log values, log fold errors and the valid pairs of one or many
+    prediction columns, one row per model
+    :float_vec x: true values
+    :float_vec y: predicted values, or a matrix/df with one column per model
+    :return: log_x, log_y, fold_errors and valid, each (models x rows)
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float).reshape(len(x), -1).T
+
+    valid = ~(np.isnan(x) | np.isnan(y))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_x = np.broadcast_to(np.log10(x), y.shape)
+        log_y = np.log10(y)
+        fold_errors = np.log10(y / x)
+
+    return log_x, log_y, fold_errors, valid
+
+
+def model_names(y):
+    """
+    Names of the prediction columns in y, None if it has none
+    :float_vec y: predicted values, or a matrix/df with one column per model
+    """
+
+    return list(y.columns) if isinstance(y, pd.DataFrame) else None
+
+
+def fold_metrics(x, y, folds=FOLDS):
+    """
+    Every fold-error metric of one or many prediction columns in one pass.
+    Fold errors are computed once; GMFE, AFE and % within n-fold match
+    gmfe_score, afe_score and n_fold_perc. R2 (of predictions against
+    truth), pearson, spearman and RMSE are taken on log10 values.
+    :float_vec x: true values
+    :float_vec y: predicted values, or a matrix/df with one column per model
+    :list folds: folds to report % within n-fold for
+    :return: pd.Series of metrics, or a pd.DataFrame with a row per model
+    """
+
+    names = model_names(y)
+    single = np.ndim(y) == 1
+    log_x, log_y, fold_errors, valid = log_arrays(x, y)
+
+    # Models missing the same rows share one ranking of the true values
+    rank_x = None
+    if (valid == valid[0]).all():
+        rank_x = rank_last_axis(np.where(valid[0], log_x[0], np.nan))
+
+    metrics = pd.DataFrame(metric_arrays(log_x, log_y, fold_errors, valid,
+                                         folds, rank_x=rank_x), index=names)
+
+    return metrics.iloc[0] if single else metrics
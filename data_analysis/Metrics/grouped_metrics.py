@@ -0,0 +1,110 @@
+import pandas as pd
+import numpy as np
+
+from .fold_metrics import FOLDS, log_arrays, model_names
+
+
+def group_ranks(values, codes):
+    """
+    Rank values within each group, averaging the ranks of ties
+    :np.array values: values to rank, without NaNs
+    :np.array codes: integer group of each value
+    """
+
+    order = np.lexsort((values, codes))
+    ordered, ordered_codes = values[order], codes[order]
+
+    # Runs of tied values inside a group, and the first position of each group
+    new_run = np.ones(len(values), dtype=bool)
+    new_run[1:] = (ordered[1:] != ordered[:-1]) | \
+        (ordered_codes[1:] != ordered_codes[:-1])
+    run = np.cumsum(new_run) - 1
+    run_starts = np.flatnonzero(new_run)
+    run_ends = np.append(run_starts[1:], len(values)) - 1
+
+    new_group = np.ones(len(values), dtype=bool)
+    new_group[1:] = ordered_codes[1:] != ordered_codes[:-1]
+    group_starts = np.maximum.accumulate(
+        np.where(new_group, np.arange(len(values)), 0))
+
+    ranks = np.empty(len(values))
+    ranks[order] = (run_starts[run] + run_ends[run]) / 2. - group_starts + 1
+
+    return ranks
+
+
+def _group_correlation(a, b, codes, count):
+    """
+    Pearson correlation of a and b within each group
+    """
+
+    da = a - (np.bincount(codes, a, len(count)) / count)[codes]
+    db = b - (np.bincount(codes, b, len(count)) / count)[codes]
+
+    return np.bincount(codes, da * db, len(count)) / np.sqrt(
+        np.bincount(codes, da ** 2, len(count)) *
+        np.bincount(codes, db ** 2, len(count)))
+
+
+def grouped_metrics(x, y, groups, folds=FOLDS, rank=True):
+    """
+    Every fold-error metric of every group (e.g. ion class, source, series
+    or assay) in one pass. Groups are factorized once and each metric is a
+    segment sum over the log fold errors, so thousands of groups cost about
+    as much as one. Metrics match fold_metrics on each group's rows.
+    :float_vec x: true values
+    :float_vec y: predicted values, or a matrix/df with one column per model
+    :vec groups: group of each row, rows without a group are skipped
+    :list folds: folds to report % within n-fold for
+    :bool rank: if False, skip the spearman correlation
+    :return: tidy pd.DataFrame with a row per group (and model, for many
+        models) and a column per metric
+    """
+
+    names = model_names(y)
+    single = np.ndim(y) == 1
+    log_x, log_y, fold_errors, valid = log_arrays(x, y)
+
+    codes, uniques = pd.factorize(np.asarray(groups), sort=True)
+    n_groups = len(uniques)
+    n_models = len(log_y)
+
+    # One segment per (model, group) pair
+    segments = np.arange(n_models)[:, None] * n_groups + codes
+    keep = valid & (codes >= 0)
+    segments = segments[keep]
+    log_x, log_y, errors = log_x[keep], log_y[keep], fold_errors[keep]
+
+    size = n_models * n_groups
+    count = np.bincount(segments, minlength=size)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics = {'n': count,
+                   'gmfe': 10 ** (np.bincount(segments, np.abs(errors), size)
+                                  / count),
+                   'afe': 10 ** (np.bincount(segments, errors, size) / count)}
+
+        for n in folds:
+            within = (errors >= np.log10(1 / n)) & (errors <= np.log10(n))
+            metrics['{}_fold_perc'.format(n)] = \
+                100. * np.bincount(segments, within, size) / count
+
+        dx = log_x - (np.bincount(segments, log_x, size) / count)[segments]
+        ss_res = np.bincount(segments, errors ** 2, size)
+        metrics['r2'] = 1 - ss_res / np.bincount(segments, dx ** 2, size)
+        metrics['pearson'] = _group_correlation(log_x, log_y, segments,
+                                                count)
+        if rank:
+            metrics['spearman'] = _group_correlation(
+                group_ranks(log_x, segments), group_ranks(log_y, segments),
+                segments, count)
+        metrics['log_rmse'] = np.sqrt(ss_res / count)
+
+    group_name = getattr(groups, 'name', None) or 'group'
+    table = pd.DataFrame(metrics)
+    table.insert(0, group_name, np.tile(uniques, n_models))
+    if not single:
+        table.insert(0, 'model', np.repeat(names or range(n_models),
+                                           n_groups))
+
+    return table.loc[table['n'] > 0].reset_index(drop=True)
@@ -17,7 +17,7 @@ def n_fold_perc(x, y, n):
 
     fold = y/x
 
-    n_fe = [f >= (1/n) and f <= n for f in fold]
+    n_fe = (fold >= (1/n)) & (fold <= n)
     n_fe_perc = 100. * np.sum(n_fe) / len(n_fe)
 
     return n_fe_perc
@@ -0,0 +1,209 @@
+import math
+import pandas as pd
+import numpy as np
+
+from scipy.stats import kendalltau
+
+from .fold_metrics import _correlation, model_names, rank_last_axis, tie_runs
+
+
+def _rank_arrays(x, y, largest=False):
+    """
+    True and predicted values of one or many prediction columns, one row per
+    model, signed so the best values are the lowest
+    :float_vec x: true values
+    :float_vec y: predicted values, or a matrix/df with one column per model
+    :bool largest: if True the best values are the largest
+    :return: x, y and valid, each (models x rows)
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float).reshape(len(x), -1).T
+    if largest:
+        x, y = -x, -y
+
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x = np.where(valid, x, np.nan)
+    y = np.where(valid, y, np.nan)
+
+    return x, y, valid
+
+
+def _shape_result(values, y):
+    """
+    One value per model as a scalar for a single prediction vector, else a
+    pd.Series indexed by model
+    """
+
+    if np.ndim(y) == 1:
+        return values[0]
+
+    return pd.Series(values, index=model_names(y))
+
+
+def top_actives(x, fraction=0.1, largest=False):
+    """
+    Flag the best experimental values as actives
+    :float_vec x: true values
+    :float fraction: fraction of the (non-missing) values to flag
+    :bool largest: if True the best values are the largest
+    """
+
+    x = np.asarray(x, dtype=float)
+    ranks = rank_last_axis(-x if largest else x, ties='min')
+
+    return ranks <= math.ceil(fraction * np.count_nonzero(~np.isnan(x)))
+
+
+def capture_depth(x, y, top_n=1, largest=False, ties='max'):
+    """
+    Number of best predicted compounds to assay to capture every one of the
+    top_n best experimental compounds, as in the n 9s notebook's
+    to_capture_top_n. Experimental values tied with the top_n-th best are
+    all part of the set to capture.
+    :float_vec x: true values
+    :float_vec y: predicted values, or a matrix/df with one column per model
+    :int top_n: number of top experimental values to capture
+    :bool largest: if True the best values are the largest
+    :str ties: rank given to predictions tied with others, 'max' assumes
+        the worst order
+    :return: the depth, or a pd.Series of depths per model (NaN for a model
+        without predictions)
+    """
+
+    ranked_x, ranked_y, valid = _rank_arrays(x, y, largest)
+    captured = rank_last_axis(ranked_x, ties='min') <= top_n
+    ranks = np.where(captured, rank_last_axis(ranked_y, ties=ties), 0)
+    depths = np.where(valid.any(axis=-1), ranks.max(axis=-1), np.nan)
+
+    return _shape_result(depths, y)
+
+
+def enrichment_factor(active, y, fraction=0.01, largest=False):
+    """
+    Enrichment factor at fraction: the active rate among the best predicted
+    fraction over the overall active rate. Actives tied with the cutoff
+    count in proportion to the places left, the expected count under a
+    random order of the ties.
+    :bool_vec active: True for active compounds
+    :float_vec y: predicted values, or a matrix/df with one column per model
+    :float fraction: fraction of the library selected
+    :bool largest: if True the best predictions are the largest
+    :return: the enrichment factor, or a pd.Series per model
+    """
+
+    active = np.asarray(active, dtype=bool)
+    _, ranked, valid = _rank_arrays(active, y, largest)
+    count = valid.sum(axis=-1)
+    active = active & valid
+
+    order = np.argsort(np.where(valid, ranked, np.inf), axis=-1)
+    ordered = np.take_along_axis(ranked, order, axis=-1)
+    hits = np.cumsum(np.take_along_axis(active, order, axis=-1), axis=-1)
+    starts, ends = tie_runs(ordered)
+
+    # Selected places and the run of ties at the cutoff, per model
+    k = np.maximum(np.ceil(fraction * count).astype(int), 1)
+    models = np.arange(len(ranked))
+    start, end = starts[models, k - 1], ends[models, k - 1]
+    before = np.where(start > 0, hits[models, np.maximum(start - 1, 0)], 0)
+    in_run = hits[models, end] - before
+    selected = before + in_run * (k - start) / (end - start + 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ef = (selected / k) / (active.sum(axis=-1) / count)
+
+    return _shape_result(ef, y)
+
+
+def bedroc(active, y, alpha=20., largest=False):
+    """
+    Boltzmann-enhanced discrimination of ROC (Truchon & Bayly, 2007).
+    Actives ranked early count exponentially more; alpha=20 puts 80% of
+    the weight on the best 8% of the library. Ties get their average rank.
+    :bool_vec active: True for active compounds
+    :float_vec y: predicted values, or a matrix/df with one column per model
+    :float alpha: early recognition parameter
+    :bool largest: if True the best predictions are the largest
+    :return: the BEDROC, or a pd.Series per model
+    """
+
+    active = np.asarray(active, dtype=bool)
+    _, ranked, valid = _rank_arrays(active, y, largest)
+    total = valid.sum(axis=-1)
+    active = active & valid
+    n_active = active.sum(axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        ranks = rank_last_axis(ranked)
+        weights = np.where(active, np.exp(-alpha * ranks / total[:, None]),
+                           0.)
+        ra = n_active / total
+        rie = weights.sum(axis=-1) / (
+            ra * (1 - np.exp(-alpha)) / (np.exp(alpha / total) - 1))
+        scores = rie * ra * np.sinh(alpha / 2) / \
+            (np.cosh(alpha / 2) - np.cosh(alpha / 2 - alpha * ra)) + \
+            1 / (1 - np.exp(alpha * (1 - ra)))
+
+    return _shape_result(scores, y)
+
+
+def rank_correlations(x, y):
+    """
+    Spearman and Kendall (tau-b) rank correlations of one or many
+    prediction columns, over the pairs with both values. Ties get their
+    average rank.
+    :float_vec x: true values
+    :float_vec y: predicted values, or a matrix/df with one column per model
+    :return: pd.Series, or a pd.DataFrame with a row per model
+    """
+
+    ranked_x, ranked_y, valid = _rank_arrays(x, y)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spearman = _correlation(rank_last_axis(ranked_x),
+                                rank_last_axis(ranked_y), valid,
+                                valid.sum(axis=-1)[:, None])
+    kendall = [kendalltau(ranked_x[i, v], ranked_y[i, v])[0]
+               if v.sum() > 1 else np.nan for i, v in enumerate(valid)]
+
+    metrics = pd.DataFrame({'spearman': spearman, 'kendall': kendall},
+                           index=model_names(y))
+
+    return metrics.iloc[0] if np.ndim(y) == 1 else metrics
+
+
+def rank_metrics(x, y, top_ns=(1, 5, 10), fractions=(.01, .05, .1),
+                 active=None, active_fraction=.1, alpha=20., largest=False):
+    """
+    Every rank and enrichment metric of one or many prediction columns:
+    capture depths of the top experimental values, enrichment factors,
+    BEDROC and rank correlations
+    :float_vec x: true values
+    :float_vec y: predicted values, or a matrix/df with one column per model
+    :list top_ns: numbers of top experimental values to capture
+    :list fractions: library fractions to report enrichment factors at
+    :bool_vec active: True for active compounds, by default the best
+        active_fraction of the experimental values
+    :float active_fraction: fraction of compounds counted as active when
+        active is not given
+    :float alpha: BEDROC early recognition parameter
+    :bool largest: if True the best values are the largest
+    :return: pd.Series of metrics, or a pd.DataFrame with a row per model
+    """
+
+    if active is None:
+        active = top_actives(x, active_fraction, largest)
+
+    metrics = {}
+    for n in top_ns:
+        metrics['top_{}_depth'.format(n)] = capture_depth(x, y, n, largest)
+    for fraction in fractions:
+        metrics['ef_{:g}%'.format(100 * fraction)] = \
+            enrichment_factor(active, y, fraction, largest)
+    metrics['bedroc'] = bedroc(active, y, alpha, largest)
+
+    if np.ndim(y) == 1:
+        return pd.concat([pd.Series(metrics), rank_correlations(x, y)])
+
+    return pd.DataFrame(metrics).join(rank_correlations(x, y))
@@ -0,0 +1,200 @@
+import functools
+import os
+import pandas as pd
+import numpy as np
+
+from multiprocessing import pool
+
+from .fold_metrics import FOLDS, log_arrays
+
+# Rows read from a predictions file at a time
+CHUNK_SIZE = 10 ** 6
+
+
+class FoldAccumulator:
+    """
+    Running fold-error metrics of one or many prediction columns, updated
+    a chunk of rows at a time in constant memory. Sums of the log fold
+    errors give GMFE, AFE, % within n-fold and RMSE; Welford means and
+    co-moments of the log values give R^2 and pearson. Accumulators of
+    disjoint rows merge exactly, so shards can be scored in parallel.
+    Spearman needs every value at once and is not accumulated.
+    """
+
+    def __init__(self, models=1, folds=FOLDS, names=None):
+        """
+        :int models: number of prediction columns
+        :list folds: folds to report % within n-fold for
+        :list names: names of the prediction columns
+        """
+
+        self.folds = tuple(folds)
+        self.names = list(names) if names is not None else None
+        self.n = np.zeros(models)
+        self.sum_errors = np.zeros(models)
+        self.sum_abs_errors = np.zeros(models)
+        self.ss_res = np.zeros(models)
+        self.within = np.zeros((len(self.folds), models))
+        self.mean_x = np.zeros(models)
+        self.mean_y = np.zeros(models)
+        self.m2_x = np.zeros(models)
+        self.m2_y = np.zeros(models)
+        self.c_xy = np.zeros(models)
+
+    def _combine(self, n, mean_x, mean_y, m2_x, m2_y, c_xy):
+        """
+        Fold the moments of another set of rows into the running ones
+        (Chan et al. pairwise update)
+        """
+
+        total = self.n + n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.where(total > 0, self.n * n / total, 0.)
+            share = np.where(total > 0, n / total, 0.)
+        dx, dy = mean_x - self.mean_x, mean_y - self.mean_y
+
+        self.mean_x = self.mean_x + dx * share
+        self.mean_y = self.mean_y + dy * share
+        self.m2_x = self.m2_x + m2_x + dx ** 2 * weight
+        self.m2_y = self.m2_y + m2_y + dy ** 2 * weight
+        self.c_xy = self.c_xy + c_xy + dx * dy * weight
+        self.n = total
+
+    def update(self, x, y):
+        """
+        Add a chunk of rows
+        :float_vec x: true values
+        :float_vec y: predicted values, or a matrix/df with one column per
+            model
+        :return: self
+        """
+
+        log_x, log_y, fold_errors, valid = log_arrays(x, y)
+        if len(log_y) != len(self.n):
+            raise ValueError('Expected {} prediction columns, got {}.'
+                             .format(len(self.n), len(log_y)))
+
+        n = valid.sum(axis=-1)
+        errors = np.where(valid, fold_errors, 0.)
+        self.sum_errors += errors.sum(axis=-1)
+        self.sum_abs_errors += np.abs(errors).sum(axis=-1)
+        self.ss_res += (errors ** 2).sum(axis=-1)
+        for i, fold in enumerate(self.folds):
+            self.within[i] += (valid & (errors >= np.log10(1 / fold)) &
+                               (errors <= np.log10(fold))).sum(axis=-1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_x = np.where(valid, log_x, 0.).sum(axis=-1) / n
+            mean_y = np.where(valid, log_y, 0.).sum(axis=-1) / n
+            dx = np.where(valid, log_x - mean_x[:, None], 0.)
+            dy = np.where(valid, log_y - mean_y[:, None], 0.)
+        self._combine(n, np.nan_to_num(mean_x), np.nan_to_num(mean_y),
+                      (dx ** 2).sum(axis=-1), (dy ** 2).sum(axis=-1),
+                      (dx * dy).sum(axis=-1))
+
+        return self
+
+    def merge(self, other):
+        """
+        Add the rows seen by another accumulator over the same models
+        :FoldAccumulator other: accumulator of disjoint rows
+        :return: self
+        """
+
+        if other.folds != self.folds or len(other.n) != len(self.n):
+            raise ValueError('Cannot merge accumulators of different models '
+                             'or folds.')
+
+        self.sum_errors += other.sum_errors
+        self.sum_abs_errors += other.sum_abs_errors
+        self.ss_res += other.ss_res
+        self.within += other.within
+        self._combine(other.n, other.mean_x, other.mean_y, other.m2_x,
+                      other.m2_y, other.c_xy)
+
+        return self
+
+    def result(self):
+        """
+        Metrics of every row seen so far, matching fold_metrics without
+        spearman
+        :return: pd.DataFrame with a row per model
+        """
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            metrics = {'n': self.n.astype(int),
+                       'gmfe': 10 ** (self.sum_abs_errors / self.n),
+                       'afe': 10 ** (self.sum_errors / self.n)}
+            for i, fold in enumerate(self.folds):
+                metrics['{}_fold_perc'.format(fold)] = \
+                    100. * self.within[i] / self.n
+            metrics['r2'] = 1 - self.ss_res / self.m2_x
+            metrics['pearson'] = self.c_xy / np.sqrt(self.m2_x * self.m2_y)
+            metrics['log_rmse'] = np.sqrt(self.ss_res / self.n)
+
+        return pd.DataFrame(metrics, index=self.names)
+
+
+def read_chunks(path, columns, chunksize=CHUNK_SIZE):
+    """
+    Yield the columns of a csv or parquet file a chunk of rows at a time.
+    Parquet files need pyarrow.
+    :str path: path to the csv or parquet file
+    :list columns: columns to read
+    :int chunksize: number of rows read at a time
+    """
+
+    if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize,
+                                                       columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+
+def accumulate_file(path, x_col, y_cols, folds=FOLDS, chunksize=CHUNK_SIZE):
+    """
+    Stream one predictions file into an accumulator
+    :str path: path to the csv or parquet file
+    :str x_col: name of the true value column
+    :list y_cols: names of the prediction columns
+    :list folds: folds to report % within n-fold for
+    :int chunksize: number of rows read at a time
+    """
+
+    acc = FoldAccumulator(len(y_cols), folds, y_cols)
+    for chunk in read_chunks(path, [x_col] + list(y_cols), chunksize):
+        acc.update(chunk[x_col], chunk[list(y_cols)])
+
+    return acc
+
+
+def stream_metrics(paths, x_col, y_cols, folds=FOLDS, chunksize=CHUNK_SIZE,
+                   workers=1):
+    """
+    Fold-error metrics of prediction files too large to hold in memory.
+    Each file (shard) is streamed into its own accumulator, one per job,
+    and the accumulators are merged.
+    :list paths: paths to the csv or parquet shards, or a single path
+    :str x_col: name of the true value column
+    :list y_cols: names of the prediction columns, or a single name
+    :list folds: folds to report % within n-fold for
+    :int chunksize: number of rows read at a time
+    :int workers: number of cores to devote, one shard per job
+    :return: pd.DataFrame with a row per prediction column
+    """
+
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    y_cols = [y_cols] if isinstance(y_cols, str) else list(y_cols)
+    func = functools.partial(accumulate_file, x_col=x_col, y_cols=y_cols,
+                             folds=folds, chunksize=chunksize)
+
+    if workers > 1 and len(paths) > 1:
+        with pool.Pool(min(workers, len(paths))) as p:
+            accs = p.map(func, paths)
+    else:
+        accs = [func(path) for path in paths]
+
+    return functools.reduce(FoldAccumulator.merge, accs).result()
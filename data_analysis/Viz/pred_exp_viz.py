@@ -1,9 +1,14 @@
+import warnings
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from matplotlib.colors import LogNorm
 from matplotlib.ticker import FormatStrFormatter
 
+# Charts with at least this many points are drawn as a density by default
+DENSITY_MIN_POINTS = 20000
+
 
 class PredExpViz:
     """
@@ -11,10 +16,14 @@ class PredExpViz:
     values for a given endpoint.
     """
 
-    def __init__(self, df, xcol, ycol, hue_col=None):
+    def __init__(self, df, xcol, ycol, hue_col=None, density=None):
         """
         :float_vec x: true values
         :float_vec y: predicted values
+        :bool density: if True bin the points into a 2-D histogram image
+            instead of drawing each one, by default only for charts of at
+            least DENSITY_MIN_POINTS points. A categorical hue_col always
+            falls back to a scatter.
         """
 
         self.df = df
@@ -22,6 +31,15 @@ class PredExpViz:
         self.ycol = ycol
         self.hue_col = hue_col
 
+        if density is None:
+            density = len(df) >= DENSITY_MIN_POINTS
+        if density and hue_col is not None and df[hue_col].dtype == 'O':
+            warnings.warn('Density mode cannot shade by the categorical hue'
+                          ' column {}; drawing a scatter instead.'
+                          .format(hue_col))
+            density = False
+        self.density = density
+
         ### Assigning x and y columns
         self.x = df[xcol]
         self.y = df[ycol]
@@ -76,6 +94,49 @@ class PredExpViz:
 
         self.ax.set(xscale="log", yscale="log")
 
+    def plot_density(self, bins=200):
+        """
+        Bin the log-log points into a 2-D histogram and draw it as one
+        rasterized image. Bins are shaded by their count, or by the mean
+        hue of their points for a numeric hue column.
+        :int bins: number of bins along each axis
+        """
+
+        log_x = np.log10(self.x.to_numpy(dtype=float))
+        log_y = np.log10(self.y.to_numpy(dtype=float))
+        valid = np.isfinite(log_x) & np.isfinite(log_y)
+        log_x, log_y = log_x[valid], log_y[valid]
+
+        # Bin edges span the same decades axis_manager sets as limits
+        low = np.floor(min(log_x.min(), log_y.min()))
+        high = np.ceil(max(log_x.max(), log_y.max()))
+        edges = np.linspace(low, high, bins + 1)
+
+        counts, _, _ = np.histogram2d(log_x, log_y, bins=[edges, edges])
+        values, norm, label = counts, LogNorm(), 'count'
+
+        hue = None
+        if self.hue_col is not None:
+            hue = self.df[self.hue_col].to_numpy(dtype=float)[valid]
+        if hue is not None:
+            sums, _, _ = np.histogram2d(log_x, log_y, bins=[edges, edges],
+                                        weights=hue)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values, norm = sums / counts, None
+            label = getattr(self, 'cbar_label', self.hue_col)
+
+        self.ax = plt.gca()
+        self.ax.set(xscale="log", yscale="log")
+        mesh = self.ax.pcolormesh(10 ** edges, 10 ** edges,
+                                  np.ma.masked_where(counts.T == 0, values.T),
+                                  cmap=self.cmap if hue is not None
+                                  else 'viridis',
+                                  norm=norm, rasterized=True)
+
+        cbar = plt.colorbar(mesh, ax=self.ax)
+        cbar.ax.get_yaxis().labelpad = 20
+        cbar.ax.set_ylabel(label, rotation=270)
+
     def axis_manager(self):
 
         min_val = np.min([np.min(self.x), np.min(self.y)])
@@ -142,8 +203,11 @@ class PredExpViz:
         if not hasattr(self, 'cmap'):
             self.set_colorbar()
 
-        self.plot_colorbar()
-        self.plot_scatter()
+        if self.density:
+            self.plot_density()
+        else:
+            self.plot_colorbar()
+            self.plot_scatter()
         self.axis_manager()
 
         return self
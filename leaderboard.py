@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+import time
+
+from data_analysis.Metrics.fold_metrics import fold_metrics, FOLDS
+from utils.std_utils import get_std_path
+from utils.leaderboard_utils import build_index, prediction_paths, \
+    align_predictions, worst_errors, JOIN_COLS, __version__
+
+# Metrics where a higher value ranks a model higher
+HIGHER_IS_BETTER = ('r2', 'pearson', 'spearman', 'coverage') + \
+    tuple('{}_fold_perc'.format(fold) for fold in FOLDS)
+
+# Metrics models can be ranked by
+RANK_METRICS = ('gmfe', 'afe', 'log_rmse') + HIGHER_IS_BETTER
+
+
+def rank_key(values):
+    """
+    Leaderboard column signed so the best models sort first. AFE is best
+    at 1 in either direction, so it ranks by its absolute log.
+    :pd.Series values: leaderboard column of the metric to rank by
+    """
+
+    if values.name == 'afe':
+        return np.abs(np.log10(values))
+    if values.name in HIGHER_IS_BETTER:
+        return -values
+
+    return values
+
+
+def leaderboard(truth_path, preds_dir, value_col, pred_cols=None,
+                log_preds=False, rank_by='gmfe', worst=10, workers=1,
+                out_path=None):
+    """
+    Score every prediction file of a directory against a resolved ground
+    truth. Each file is joined to the ground truth through one hash index on
+    the first identity column they share (inchi_key, connectivity_key,
+    smiles_hash or std_smiles), and every model is scored in one vectorized
+    pass. Writes a ranked leaderboard and the worst predicted compounds of
+    each model.
+    :str truth_path: path to the resolved ground truth csv
+    :str preds_dir: directory of prediction csvs
+    :str value_col: name of the ground truth value column
+    :list pred_cols: prediction columns to score, every numeric column if
+        None. A file with several is scored as one model per column.
+    :bool log_preds: if True the predictions are log10 values
+    :str rank_by: metric to rank the models by
+    :int worst: number of worst predicted compounds to list per model
+    :int workers: number of cores to devote to reading prediction files
+    :str out_path: path of the leaderboard, next to truth_path if None
+    :return: the leaderboard pd.DataFrame
+    """
+
+    if rank_by not in RANK_METRICS:
+        raise ValueError('Cannot rank by {}, choose one of {}.'
+                         .format(rank_by, list(RANK_METRICS)))
+
+    start = time.time()
+    truth = pd.read_csv(truth_path)
+    index = build_index(truth)
+    paths = prediction_paths(preds_dir)
+    print("Scoring {} prediction files against {} compounds".format(
+        len(paths), len(truth)))
+
+    preds, join_cols = align_predictions(paths, index, pred_cols, workers)
+    if preds.empty:
+        raise ValueError('No predictions found in {}.'.format(preds_dir))
+    if log_preds:
+        preds = 10 ** preds
+
+    x = truth[value_col]
+    board = fold_metrics(x, preds)
+    board.insert(1, 'coverage', board['n'] / x.notna().sum())
+    board['join_col'] = board.index.map(join_cols)
+    board = board.sort_values(rank_by, key=rank_key, kind='mergesort')
+    board = board.rename_axis('model').reset_index()
+    board.insert(0, 'rank', range(1, len(board) + 1))
+
+    if out_path is None:
+        out_path = get_std_path(truth_path, 'leaderboard_')
+    board.to_csv(out_path, index=False)
+
+    labels = truth[[col for col in JOIN_COLS if col in truth.columns]]
+    worst_path = os.path.splitext(out_path)[0] + '_worst.csv'
+    worst_errors(x, preds[board['model']], labels, worst) \
+        .to_csv(worst_path, index=False)
+
+    summary = {'truth_path': truth_path,
+               'preds_dir': preds_dir,
+               'value_col': value_col,
+               'log_preds': log_preds,
+               'models': len(board),
+               'rank_by': rank_by,
+               'best_model': board['model'].iloc[0],
+               'leaderboard_path': out_path,
+               'worst_path': worst_path,
+               'leaderboard_version': __version__,
+               'leaderboard_seconds': round(time.time() - start, 2)}
+    summary_path = os.path.splitext(out_path)[0] + '_summary.json'
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=4)
+
+    print(board.head(10).to_string(index=False))
+    print("Leaderboard written to:", out_path)
+    print("Worst predictions written to:", worst_path)
+
+    return board
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('truth_path', type=str,
+                        help='path to the resolved ground truth csv')
+    parser.add_argument('preds_dir', type=str,
+                        help='directory of prediction csvs')
+    parser.add_argument('--value-col', '-v', type=str, required=True,
+                        help='name of the ground truth value column')
+    parser.add_argument('--pred-cols', type=str, nargs='+', default=None,
+                        help='prediction columns to score, every numeric'
+                             ' column if not given')
+    parser.add_argument('--log-preds', action='store_true',
+                        help='predictions are log10 values')
+    parser.add_argument('--rank-by', type=str, default='gmfe',
+                        choices=RANK_METRICS,
+                        help='metric to rank the models by')
+    parser.add_argument('--worst', type=int, default=10,
+                        help='number of worst predictions to list per model')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='number of cores to devote')
+    parser.add_argument('--out', type=str, default=None,
+                        help='path of the leaderboard csv')
+    args = parser.parse_args()
+
+    leaderboard(args.truth_path, args.preds_dir, args.value_col,
+                args.pred_cols, args.log_preds, args.rank_by, args.worst,
+                args.workers, args.out)
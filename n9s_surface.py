@@ -0,0 +1,64 @@
+import argparse
+import numpy as np
+
+from utils.n9s_utils import build_surface, save_surface, N9sSurface
+
+
+def n9s_surface(path, r2s, lib_sizes, ex_captures, ns, trials=10000, seed=1,
+                workers=1):
+    """
+    Precompute n 9s savings over a grid and write it to a .npz file that
+    N9sSurface.load can answer queries from
+    :str path: path of the .npz file to write
+    :list r2s: increasing R^2 values
+    :list lib_sizes: increasing library sizes
+    :list ex_captures: numbers of top experimental values to capture
+    :list ns: numbers of 9's of confidence
+    :int trials: Number of trials to run at each grid point
+    :int seed: seed of the random state at each grid point
+    :int workers: number of cores to devote to job
+    """
+
+    surface = build_surface(r2s, lib_sizes, ex_captures, ns, trials, seed,
+                            workers)
+    save_surface(path, surface)
+
+    worst = np.unravel_index(np.argmax(surface['error']),
+                             surface['error'].shape)
+    print("Largest Monte Carlo error: {:.2f}% (R²={:.2f}, library of {},"
+          " top {}, {} 9s)".format(surface['error'][worst],
+                                   surface['r2'][worst[0]],
+                                   surface['lib_size'][worst[1]],
+                                   surface['ex_capture'][worst[2]],
+                                   surface['n'][worst[3]]))
+    print("Surface written to:", path)
+
+    return N9sSurface(surface)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', type=str,
+                        help='path of the .npz surface file to write')
+    parser.add_argument('--r2', type=float, nargs='+',
+                        default=list(np.linspace(0, .99, 12)),
+                        help='R² grid values')
+    parser.add_argument('--lib-sizes', type=int, nargs='+',
+                        default=[int(x) for x in np.logspace(1, 4, 10)],
+                        help='library size grid values')
+    parser.add_argument('--captures', type=int, nargs='+',
+                        default=[1, 5, 10, 50, 100],
+                        help='numbers of top compounds to capture')
+    parser.add_argument('--n', type=int, nargs='+', default=[1, 2, 3],
+                        help="numbers of 9's of confidence")
+    parser.add_argument('--trials', '-t', type=int, default=10000,
+                        help='number of trials at each grid point')
+    parser.add_argument('--seed', type=int, default=1,
+                        help='seed of the random state at each grid point')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='number of cores to devote')
+    args = parser.parse_args()
+
+    n9s_surface(args.path, sorted(args.r2), sorted(args.lib_sizes),
+                args.captures, args.n, args.trials, args.seed, args.workers)
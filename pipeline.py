@@ -0,0 +1,194 @@
+import argparse
+
+from concurrent.futures import Future
+
+from utils.meta_utils import read_meta, add_meta
+from utils.std_utils import read_data, get_std_path, KEY_COLS
+from utils.std_utils import __version__ as std_version
+from utils.resolve_utils import __version__ as resolve_version
+from utils.pipeline_utils import BackgroundWriter, STAGES
+from utils.pipeline_utils import stages_to_run, resume_path
+from utils.fingerprint_utils import hash_file, stage_fingerprint
+from utils.fingerprint_utils import stage_is_current, stage_records
+from utils.fingerprint_utils import print_summary, STAGE_RECORDS
+from utils.incremental_utils import row_keys, split_row_keys
+from utils.incremental_utils import read_keys, write_keys
+
+from standardize import standardize_df
+from resolve import resolve_df, resolve_groups
+from produce_mqd import mqd_df, sweep_cutoffs
+
+STAGE_VERSIONS = {'standardize': std_version,
+                  'resolve': resolve_version}
+
+
+def _record_stage(meta_path, stage, meta, stage_meta, input_hash, extra,
+                  artifact_path):
+    """
+    Fingerprint a finished stage and write its metadata. Runs on the
+    writer thread once the stage's artifact is on disk.
+    :return: hash of the artifact, the input hash of the next stage
+    """
+
+    if isinstance(input_hash, Future):
+        input_hash = input_hash.result()
+
+    fingerprint = stage_fingerprint(stage, meta, input_hash,
+                                    STAGE_VERSIONS[stage], extra)
+    artifact_hash = hash_file(artifact_path)
+    stage_meta = {**stage_meta,
+                  **stage_records(stage, fingerprint, artifact_hash)}
+
+    add_meta(meta_path, stage_meta)
+
+    return artifact_hash
+
+
+def pipeline(path, threshold=0.01, start='standardize', stop='mqd',
+             force=False, upper=None, lower=None, key_type='inchi_key'):
+    """
+    Run standardize -> resolve -> mqd in one process on the in-memory frame.
+    Artifacts are still written for every stage, on a background thread,
+    so any stage can later be resumed from the last persisted artifact.
+    Stages whose inputs are unchanged since their last run are skipped.
+    :str path: a directory containing metadata and data
+    :float threshold: threshold for value curation
+    :str start: first stage to run, reading the previous stage's artifact
+    :str stop: last stage to run
+    :bool force: run every stage even if its inputs are unchanged
+    :list upper: upper limit cutoffs to sweep in the mqd stage
+    :list lower: lower limit cutoffs to sweep in the mqd stage
+    :str key_type: identity key to group replicates on, one of KEY_COLS
+    """
+
+    meta = read_meta(path)  # Read once, kept up to date in memory
+    meta_path = meta.get('meta_path')
+
+    # Endpoints of a multi-endpoint file run as datasets of their own
+    if meta.get('endpoints'):
+        for endpoint, endpoint_path in meta['endpoints'].items():
+            print("Running endpoint:", endpoint)
+            pipeline(endpoint_path, threshold, start, stop, force, upper,
+                     lower, key_type)
+        return
+
+    data_path = meta.get('data_path')
+
+    writer = BackgroundWriter()
+    df = None
+    keys = None  # Row keys of the in-memory std df
+    upstream_hash = None  # Artifact hash of the last stage run here
+    decisions = []
+
+    try:
+        for stage in stages_to_run(start, stop):
+            input_path = resume_path(meta, stage)
+            extra = {'threshold': threshold} if stage == 'resolve' else None
+
+            # Decide whether the stage has to run
+            input_hash = upstream_hash
+            if stage not in STAGE_RECORDS:
+                reason = 'not cached'
+            elif upstream_hash is not None:
+                reason = 'upstream stage ran'
+            else:
+                input_hash = hash_file(input_path)
+                stage_meta = {**meta, 'std_key_type': key_type} \
+                    if stage == 'standardize' else meta
+                fingerprint = stage_fingerprint(stage, stage_meta, input_hash,
+                                                STAGE_VERSIONS[stage], extra)
+                if force:
+                    reason = 'forced'
+                elif stage_is_current(meta, stage, fingerprint):
+                    decisions.append((stage, 'skipped',
+                                      'inputs unchanged'))
+                    continue
+                else:
+                    reason = 'inputs changed'
+
+            decisions.append((stage, 'ran', reason))
+            print('Running stage:', stage)
+
+            if df is None:
+                df = read_data(input_path)
+
+            if stage == 'standardize':
+                raw_keys = row_keys(df)
+                df, stage_meta = standardize_df(df, meta, key_type=key_type)
+                df, keys = split_row_keys(df, raw_keys)
+                artifact_path = writer.write_csv(
+                    df, get_std_path(data_path, 'std_'))
+                stage_meta['std_data_path'] = artifact_path
+                keys_path = get_std_path(data_path, 'std_rowkeys_')
+                writer.submit(write_keys, keys_path, {'row_key': keys})
+                stage_meta['std_rowkeys_path'] = keys_path
+
+            elif stage == 'resolve':
+                if keys is None:  # Resuming from the std artifact
+                    sidecar = read_keys(meta.get('std_rowkeys_path'))
+                    keys = sidecar['row_key'] if sidecar else None
+                std_df = df
+                df, stage_meta = resolve_df(std_df, meta, threshold)
+                if keys is not None:
+                    groups = resolve_groups(std_df, keys, df,
+                                            {**meta, **stage_meta})
+                    groups_path = get_std_path(data_path, 'resolved_groups_')
+                    writer.submit(write_keys, groups_path, groups)
+                    stage_meta['resolved_groups_path'] = groups_path
+                artifact_path = writer.write_csv(
+                    df, get_std_path(data_path, 'resolved_'))
+                stage_meta['resolved_data_path'] = artifact_path
+
+            elif stage == 'mqd':
+                sweep = sweep_cutoffs(meta, upper, lower) \
+                    if upper or lower else None
+                df, artifacts, stage_meta = mqd_df(df, meta, sweep)
+                for prefix, artifact in artifacts.items():
+                    stage_meta[prefix + 'path'] = writer.write_csv(
+                        artifact, get_std_path(data_path, prefix))
+                stage_meta['mqd_data_path'] = writer.write_csv(
+                    df, get_std_path(data_path, 'mqd_'))
+
+            meta.update(stage_meta)
+
+            if stage in STAGE_RECORDS:
+                upstream_hash = writer.submit(_record_stage, meta_path,
+                                              stage, dict(meta), stage_meta,
+                                              input_hash, extra,
+                                              artifact_path)
+            else:
+                writer.submit(add_meta, meta_path, stage_meta)
+    finally:
+        writer.close()
+
+    print_summary(decisions)
+    print("Updated metadata at:", meta_path)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', type=str,
+                        help="path to directory with data to process")
+    parser.add_argument('--threshold', '-t', type=float, default=0.01,
+                        help='specify a threshold for value curation')
+    parser.add_argument('--start', type=str, default=STAGES[0],
+                        choices=STAGES,
+                        help='stage to start from, resuming from the'
+                             ' artifact of the previous stage')
+    parser.add_argument('--stop', type=str, default=STAGES[-1],
+                        choices=STAGES, help='last stage to run')
+    parser.add_argument('--force', '-f', action='store_true',
+                        help='run every stage even if its inputs are'
+                             ' unchanged')
+    parser.add_argument('--upper', nargs='+', default=None,
+                        help='upper limit cutoffs to sweep in the mqd stage')
+    parser.add_argument('--lower', nargs='+', default=None,
+                        help='lower limit cutoffs to sweep in the mqd stage')
+    parser.add_argument('--key', '-k', type=str, default='inchi_key',
+                        choices=list(KEY_COLS),
+                        help='identity key to group replicates on')
+    args = parser.parse_args()
+
+    pipeline(args.path, args.threshold, args.start, args.stop, args.force,
+             args.upper, args.lower, args.key)
@@ -3,6 +3,7 @@ import os
 
 from utils.meta_utils import produce_article_meta, produce_dataset_meta
 from utils.meta_utils import init_meta, add_meta, get_doi
+from utils.meta_utils import clean_doi, get_doi_records
 
 
 def produce_meta(data_path):
@@ -13,15 +14,26 @@ def produce_meta(data_path):
 
     print("Producing dataset metadata for:", data_path)
 
-    # Extract outpath from data path provided
-    outpath = os.path.dirname(data_path)
-
     # Ask for DOI
     doi = get_doi()
 
+    return write_meta(data_path, doi)
+
+
+def write_meta(data_path, doi, record=None):
+    """
+    Writes initial meta data for a dataset with a known DOI (or None)
+    :str data_path: filepath to dataset to be cleaned and curated
+    :str doi: DOI of the data source, None if there is no DOI
+    :dict record: Crossref record for the DOI if already fetched
+    """
+
+    # Extract outpath from data path provided
+    outpath = os.path.dirname(data_path)
+
     # If a valid DOI exists, scrape article meta and initate meta
     if doi:
-        article_meta = produce_article_meta(doi)
+        article_meta = produce_article_meta(doi, record)
         fullpath = init_meta(article_meta, outpath)
         dataset_meta = produce_dataset_meta(data_path)
         add_meta(fullpath, dataset_meta)
@@ -29,12 +41,51 @@ def produce_meta(data_path):
         dataset_meta = produce_dataset_meta(data_path)
         fullpath = init_meta(dataset_meta, outpath)
 
+    return fullpath
+
+
+def produce_meta_batch(data_paths, dois, workers=8):
+    """
+    Produces initial meta data for many datasets in one go. All Crossref
+    records are fetched concurrently before any metadata is written.
+    :list data_paths: filepaths to datasets to be cleaned and curated
+    :list dois: one DOI (or 'none') per data path
+    :int workers: number of concurrent Crossref requests
+    """
+
+    if len(data_paths) != len(dois):
+        raise ValueError('Please provide one DOI (or none) per data path.')
+
+    dois = [clean_doi(doi) for doi in dois]
+    records = get_doi_records([doi for doi in dois if doi], workers=workers)
+
+    for data_path, doi in zip(data_paths, dois):
+        print("Producing dataset metadata for:", data_path)
+        if doi and doi not in records:
+            print("The Crossref record for", doi, "could not be fetched."
+                  " Skipping", data_path)
+            continue
+        if doi and records.get(doi) is None:
+            print("Sorry, the DOI", doi, "is not valid or not in our system."
+                  " Skipping", data_path)
+            continue
+        write_meta(data_path, doi, records.get(doi))
+
 
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser()
-    parser.add_argument('data_path', type=str,
-                        help="path to dataset we will be cleaning")
+    parser.add_argument('data_path', type=str, nargs='+',
+                        help="path(s) to dataset(s) we will be cleaning")
+    parser.add_argument('--doi', type=str, nargs='+',
+                        help="one DOI per data path, 'none' if there is no"
+                             " DOI. Skips the interactive DOI prompt.")
+    parser.add_argument('--workers', '-w', type=int, default=8,
+                        help="number of concurrent Crossref requests")
     args = parser.parse_args()
 
-    produce_meta(args.data_path)
+    if args.doi:
+        produce_meta_batch(args.data_path, args.doi, args.workers)
+    else:
+        for data_path in args.data_path:
+            produce_meta(data_path)
@@ -5,24 +5,46 @@ from utils.meta_utils import read_meta, add_meta
 from utils.std_utils import read_data, write_std
 from utils.mqd_utils import get_mqd, get_kept_col
 from utils.mqd_utils import fix_value_col, fix_relation_col, tripartite
+from utils.mqd_utils import threshold_sweep
+from utils.units_utils import parse_quantity
 
 
-def mqd(path):
+def sweep_cutoffs(meta, upper=(), lower=()):
     """
-    :str path: a directory containing metadata and csv
+    Parse sweep cutoffs such as '10' or '10 uM' into the std units
+    :dict meta: metadata for the dataset
+    :list upper: upper limit cutoffs
+    :list lower: lower limit cutoffs
+    :return: dict with the upper and lower cutoffs as floats
+    """
+
+    std_unit = meta.get('std_unit')
+
+    return {'upper': [parse_quantity(c, std_unit) for c in upper or []],
+            'lower': [parse_quantity(c, std_unit) for c in lower or []]}
+
+
+def mqd_df(df, meta, sweep=None):
+    """
+    Produce model quality data from an in-memory resolved dataset
+    :pd.DataFrame df: resolved data
+    :dict meta: metadata for the dataset
+    :dict sweep: upper and lower cutoffs to label against, in place of
+        asking for a single upper and lower limit
+    :return: mqd df, dict of extra artifacts by file prefix
+        and dict of metadata to add
     """
 
-    # First read meta and store relevant paths into variables.
-    meta = read_meta(path)
-    meta_path = meta.get('meta_path')
     std_smiles_col = meta.get('std_smiles_col')
     class_col = meta.get('std_class_col')
     value_col = meta.get('std_value_col') or meta.get('value_col')
     units_col = meta.get('std_unit_col')
     relation_col = meta.get('std_relation_col')
-    resolved_data_path = meta.get('resolved_data_path')
+    profile = meta.get('resolved_profile')  # Column profile from resolve
 
-    df = read_data(resolved_data_path)
+    df = df.copy()  # Values are transformed in place below
+    artifacts = {}
+    mqd_meta = {}
 
     if not class_col and not value_col:
         raise ValueError('Data must contain a value column, '
@@ -32,10 +54,32 @@ def mqd(path):
     else:
         kept_col = get_kept_col(class_col, value_col)
 
-    if kept_col == value_col:
+    if kept_col == value_col and sweep:
+        # Label against every cutoff, keep '=' values for regression
+        upper_labels, lower_labels, stats = threshold_sweep(
+            df, relation_col, value_col, std_smiles_col,
+            sweep.get('upper', []), sweep.get('lower', []))
+        print(stats.to_string(index=False))
+
+        df, _, _ = tripartite(df, None, None, relation_col, value_col,
+                              units_col, std_smiles_col)
+        profile = None
+
+        for prefix, artifact in [('mqd_sweep_upper_', upper_labels),
+                                 ('mqd_sweep_lower_', lower_labels),
+                                 ('mqd_sweep_stats_', stats)]:
+            if artifact is not None:
+                artifacts[prefix] = artifact
+        mqd_meta['sweep_cutoffs'] = {k: sorted(v) for k, v in sweep.items()}
+
+        df, transformation = fix_value_col(df, units_col, value_col,
+                                           profile)
+        mqd_meta['value_transformation'] = transformation
+
+    elif kept_col == value_col:
         # Start by finding relevant splits
         upper_limit, lower_limit = fix_relation_col(df, relation_col,
-                                                    value_col)
+                                                    value_col, profile)
 
         if upper_limit or lower_limit:
             df, upper_df, lower_df, = tripartite(df, lower_limit,
@@ -44,32 +88,63 @@ def mqd(path):
                                                  value_col,
                                                  units_col,
                                                  std_smiles_col)
+            profile = None  # The profile no longer describes the split df
 
         # Next we transform the rx dataset if desired
-        df, transformation = fix_value_col(df, units_col, value_col)
-        add_meta(meta_path, {'value_transformation': transformation})
+        df, transformation = fix_value_col(df, units_col, value_col,
+                                           profile)
+        mqd_meta['value_transformation'] = transformation
 
-        # Write out upper + lower dfs if they exist
+        # Keep upper + lower dfs if they exist
         if upper_limit:
-            upper_data_path = write_std(upper_df, path, prefix='mqd_upper_')
-            add_meta(meta_path, {'mqd_upper_path': upper_data_path})
-            add_meta(meta_path, {'upper_limit': upper_limit})
+            artifacts['mqd_upper_'] = upper_df
+            mqd_meta['upper_limit'] = upper_limit
         if lower_limit:
-            lower_data_path = write_std(lower_df, path, prefix='mqd_lower_')
-            add_meta(meta_path, {'mqd_lower_path': lower_data_path})
-            add_meta(meta_path, {'lower_limit': lower_limit})
+            artifacts['mqd_lower_'] = lower_df
+            mqd_meta['lower_limit'] = lower_limit
 
     df = get_mqd(df, std_smiles_col, kept_col)
 
-    mqd_data_path = write_std(df, path, prefix='mqd_')
-    mqd_col = df.columns[1]
+    mqd_meta.update({'mqd_column': df.columns[1],
+                     'std_utc_fix': int(time.time())})
 
-    # Write standardized data and store meta
-    meta = {'mqd_data_path': mqd_data_path,
-            'mqd_column': mqd_col,
-            'std_utc_fix': int(time.time())}
+    return df, artifacts, mqd_meta
+
+
+def mqd(path, upper=None, lower=None):
+    """
+    :str path: a directory containing metadata and csv
+    :list upper: upper limit cutoffs to sweep, e.g. ['1 uM', '10 uM']
+    :list lower: lower limit cutoffs to sweep
+    """
+
+    # First read meta and store relevant paths into variables.
+    meta = read_meta(path)
+    meta_path = meta.get('meta_path')
+    resolved_data_path = meta.get('resolved_data_path')
 
-    add_meta(meta_path, meta)
+    # One mqd per endpoint for a file of several endpoints
+    if meta.get('endpoints'):
+        for endpoint, endpoint_path in meta['endpoints'].items():
+            print("Producing mqd for endpoint:", endpoint)
+            mqd(endpoint_path, upper, lower)
+        return
+
+    sweep = sweep_cutoffs(meta, upper, lower) if upper or lower else None
+
+    df = read_data(resolved_data_path)
+    df, artifacts, mqd_meta = mqd_df(df, meta, sweep)
+
+    # Write out upper + lower dfs if they exist
+    for prefix, artifact in artifacts.items():
+        artifact_path = write_std(artifact, path, prefix=prefix, meta=meta)
+        mqd_meta[prefix + 'path'] = artifact_path
+
+    mqd_data_path = write_std(df, path, prefix='mqd_', meta=meta)
+    mqd_meta['mqd_data_path'] = mqd_data_path
+
+    # Write standardized data and store meta
+    add_meta(meta_path, mqd_meta)
 
     # Print write paths
     print("Standard df will be written to:", mqd_data_path)
@@ -81,6 +156,12 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('path', type=str,
                         help="path to directory with data to produce mqd")
+    parser.add_argument('--upper', nargs='+', default=None,
+                        help="upper limit cutoffs to sweep, in the std units"
+                             " unless given (e.g. '10uM')")
+    parser.add_argument('--lower', nargs='+', default=None,
+                        help="lower limit cutoffs to sweep, in the std units"
+                             " unless given (e.g. '10uM')")
     args = parser.parse_args()
 
-    mqd(args.path)
+    mqd(args.path, args.upper, args.lower)
@@ -1,56 +1,236 @@
 import argparse
+import numpy as np
+import pandas as pd
 import time
 
 from utils.meta_utils import read_meta, add_meta
-from utils.std_utils import read_data, write_std
+from utils.std_utils import read_data, write_std, get_std_path
+from utils.std_utils import df_add_ik_unique
+from utils.profile_utils import profile_df
 
 from utils.resolve_utils import df_filter_invalid_smi, df_filter_replicates
 from utils.resolve_utils import class_keep_indices, __version__
 from utils.resolve_utils import process_filter_input, filters
 from utils.resolve_utils import value_keep_indices, resolve_type
+from utils.resolve_utils import replicate_rmsd, get_filter
+from utils.fingerprint_utils import hash_file, stage_fingerprint
+from utils.fingerprint_utils import stage_is_current, stage_records
+from utils.incremental_utils import read_keys, write_keys
+from utils.incremental_utils import group_table, reuse_groups
 
 
-def resolve_class(path, threshold):
+def resolve_df(std_data, meta, threshold, filter_fn=None, std_est=None):
+    """
+    Resolve replicates in an in-memory standardized dataset
+    :pd.DataFrame std_data: standardized data
+    :dict meta: metadata for the dataset
+    :float threshold: threshold for value curation
+    :fn filter_fn: class filter function, asked for if None
+    :float std_est: replicate rmsd if std_data is only part of the dataset
+    :return: resolved df and dict of metadata to add
+    """
 
-    # Read meta and extra necessary elements
-    meta = read_meta(path)
-    meta_path = meta.get('meta_path')
-    std_data_path = meta.get('std_data_path')
     std_smiles_col = meta.get('std_smiles_col')
     std_key_col = meta.get('std_key_col')
     class_col = meta.get('std_class_col')
     value_col = meta.get('std_value_col') or meta.get('value_col')
     relation_col = meta.get('std_relation_col')
+    resolved_meta = {}
 
-    # Read standardized data and remove invalid smiles
-    std_data = read_data(std_data_path)
+    # Remove invalid smiles
     resolved_data = df_filter_invalid_smi(std_data, std_smiles_col)
 
     # Filter value column if relevant
     if value_col is not None:
         resolved_data = resolve_type(resolved_data, value_col)
+        if std_est is None:
+            std_est = replicate_rmsd(resolved_data, std_smiles_col,
+                                     value_col, relation_col)
         idx_keep_dict = value_keep_indices(resolved_data, std_key_col,
                                            relation_col, std_smiles_col,
-                                           value_col, threshold)
+                                           value_col, threshold, std_est)
         resolved_data = df_filter_replicates(resolved_data, idx_keep_dict)
-        add_meta(meta_path, {'value_resolved_indices': idx_keep_dict})
+        resolved_meta['value_resolved_indices'] = idx_keep_dict
+        resolved_meta['replicate_rmsd'] = \
+            None if np.isnan(std_est) else float(std_est)
 
     # Filter the class column if relevant
     if class_col is not None:
-        filter_fn = process_filter_input(filters)
+        if filter_fn is None:
+            filter_fn = process_filter_input(filters)
         idx_keep_dict = class_keep_indices(resolved_data,
                                            std_key_col, filter_fn)
         resolved_data = df_filter_replicates(resolved_data, idx_keep_dict)
-        add_meta(meta_path, {'resolution_function': filter_fn.__name__})
-        add_meta(meta_path, {'class_resolved_indices': idx_keep_dict})
+        resolved_meta['resolution_function'] = filter_fn.__name__
+        resolved_meta['class_resolved_indices'] = idx_keep_dict
+
+    resolved_meta.update({'resolve_threshold': threshold,
+                          'resolved_rows': int(resolved_data.shape[0]),
+                          'resolved_profile': profile_df(resolved_data),
+                          'resolved_version': __version__,
+                          'resolved_utc_fix': int(time.time())})
+
+    return resolved_data, resolved_meta
+
+
+def resolve_incremental(std_data, std_keys, meta, threshold):
+    """
+    Re-resolve only the identity groups whose std rows changed since the
+    last run and reuse the stored result of every other group.
+    Returns None if a full run is needed instead.
+    :pd.DataFrame std_data: standardized data
+    :array std_keys: row key of each std row
+    :dict meta: metadata of the last run
+    :float threshold: threshold for value curation
+    :return: resolved df and dict of metadata to add
+    """
+
+    std_smiles_col = meta.get('std_smiles_col')
+    std_key_col = meta.get('std_key_col')
+    class_col = meta.get('std_class_col')
+    value_col = meta.get('std_value_col') or meta.get('value_col')
+    relation_col = meta.get('std_relation_col')
+
+    old_table = read_keys(meta.get('resolved_groups_path'))
+    filter_fn = get_filter(meta.get('resolution_function'))
+
+    if std_keys is None or old_table is None or \
+            (class_col is not None and filter_fn is None):
+        print("No previous incremental state, running a full resolve.")
+        return None
+
+    valid = df_filter_invalid_smi(std_data, std_smiles_col)
+    touched, unchanged, kept_row_keys = reuse_groups(
+        valid[std_key_col].values, std_keys[valid.index], old_table)
+    # The replicate rmsd is a property of the whole dataset. If it moved,
+    # every group with replicates has to be resolved again.
+    std_est = None
+    if value_col is not None:
+        valid = resolve_type(valid, value_col)
+        std_est = replicate_rmsd(valid, std_smiles_col, value_col,
+                                 relation_col)
+        old_est = meta.get('replicate_rmsd')
+        old_est = np.nan if old_est is None else old_est
+        if not np.isclose(std_est, old_est, equal_nan=True):
+            counts = valid[std_key_col].value_counts()
+            replicated = unchanged.isin(counts.index[counts > 1])
+            touched = touched.append(unchanged[replicated])
+            unchanged = unchanged[~replicated]
+            kept_row_keys = kept_row_keys[~replicated]
+
+    print("Reusing {} groups, re-resolving {} new or changed groups."
+          .format(len(unchanged), len(touched)))
+
+    touched_data = valid.loc[valid[std_key_col].isin(touched)]
+    resolved_touched, resolved_meta = resolve_df(touched_data, meta,
+                                                 threshold, filter_fn,
+                                                 std_est)
+
+    # Unchanged groups keep their row, found again through its row key
+    kept_idx = pd.Index(std_keys).get_indexer(kept_row_keys)
+    reused = {key: (int(idx) if row_key != 0 else None) for key, idx, row_key
+              in zip(unchanged.tolist(), kept_idx, kept_row_keys)}
+
+    resolved_idx = np.sort(np.r_[kept_idx[kept_row_keys != 0],
+                                 resolved_touched.index.values])
+    resolved_data = valid.loc[resolved_idx]
+
+    if value_col is not None:
+        resolved_meta['value_resolved_indices'] = \
+            {**reused, **resolved_meta['value_resolved_indices']}
+        reused = {key: idx for key, idx in reused.items() if idx is not None}
+    if class_col is not None:
+        resolved_meta['class_resolved_indices'] = \
+            {**reused, **resolved_meta['class_resolved_indices']}
+
+    resolved_meta.update({'resolved_rows': int(resolved_data.shape[0]),
+                          'resolved_profile': profile_df(resolved_data)})
+
+    return resolved_data, resolved_meta
+
+
+def resolve_groups(std_data, std_keys, resolved_data, meta):
+    """
+    Build the group table of a resolved dataset for later incremental runs
+    :pd.DataFrame std_data: standardized data
+    :array std_keys: row key of each std row
+    :pd.DataFrame resolved_data: resolved data, indexed like std_data
+    :dict meta: metadata for the dataset
+    """
+
+    std_key_col = meta.get('std_key_col')
+    valid = df_filter_invalid_smi(std_data, meta.get('std_smiles_col'))
+
+    return group_table(valid[std_key_col].values, std_keys[valid.index],
+                       resolved_data[std_key_col].values,
+                       std_keys[resolved_data.index])
+
+
+def resolve_class(path, threshold, force=False, incremental=False,
+                  inchi_key=False):
+
+    # Read meta and extra necessary elements
+    meta = read_meta(path)
+    meta_path = meta.get('meta_path')
+    std_data_path = meta.get('std_data_path')
+
+    # A file of several endpoints is resolved endpoint by endpoint
+    if meta.get('endpoints'):
+        for endpoint, endpoint_path in meta['endpoints'].items():
+            print("Resolving endpoint:", endpoint)
+            resolve_class(endpoint_path, threshold, force, incremental,
+                          inchi_key)
+        return
+
+    extra = {'threshold': threshold}
+    if inchi_key:
+        extra['inchi_key'] = True
+
+    # Skip if the std data, recorded answers and version are unchanged
+    std_hash = hash_file(std_data_path)
+    fingerprint = stage_fingerprint('resolve', meta, std_hash, __version__,
+                                    extra)
+    if not force and stage_is_current(meta, 'resolve', fingerprint):
+        print("Skipping resolve: inputs unchanged since the last run."
+              " Use --force to rerun.")
+        return
+
+    # Read standardized data and resolve replicates
+    std_data = read_data(std_data_path)
+    std_keys = read_keys(meta.get('std_rowkeys_path'))
+    if std_keys is not None:
+        std_keys = std_keys['row_key']
+
+    result = resolve_incremental(std_data, std_keys, meta, threshold) \
+        if incremental else None
+
+    if result is None:
+        resolved_data, resolved_meta = resolve_df(std_data, meta, threshold)
+    else:
+        resolved_data, resolved_meta = result
+
+    # Keep per-group results for later incremental runs
+    if std_keys is not None:
+        groups = resolve_groups(std_data, std_keys, resolved_data,
+                                {**meta, **resolved_meta})
+        resolved_meta['resolved_groups_path'] = write_keys(
+            get_std_path(meta.get('data_path'), 'resolved_groups_'), groups)
+
+    # Data grouped on another key only gets InChI keys now, once per
+    # resolved structure
+    if inchi_key and 'inchi_key' not in resolved_data.columns:
+        resolved_data = df_add_ik_unique(resolved_data,
+                                         meta.get('std_smiles_col'))
 
-    # Filter replicates and write data to curated data path
-    resolved_data_path = write_std(resolved_data, path, prefix='resolved_')
+    # Write data to curated data path
+    resolved_data_path = write_std(resolved_data, path, prefix='resolved_',
+                                   meta=meta)
+    resolved_meta['resolved_data_path'] = resolved_data_path
 
-    resolved_meta = {'resolved_data_path': resolved_data_path,
-                     'resolved_rows': int(resolved_data.shape[0]),
-                     'resolved_version': __version__,
-                     'resolved_utc_fix': int(time.time())}
+    fingerprint = stage_fingerprint('resolve', {**meta, **resolved_meta},
+                                    std_hash, __version__, extra)
+    resolved_meta.update(stage_records('resolve', fingerprint,
+                                       hash_file(resolved_data_path)))
 
     add_meta(meta_path, resolved_meta)  # Update metadata
 
@@ -65,6 +245,15 @@ if __name__ == '__main__':
                         help='path to directory with data to curate')
     parser.add_argument('--threshold', '-t', type=float, default=0.01,
                         help='specify a threshold for value curation')
+    parser.add_argument('--force', '-f', action='store_true',
+                        help="resolve even if nothing changed")
+    parser.add_argument('--incremental', '-i', action='store_true',
+                        help="only re-resolve groups changed since the"
+                             " last run")
+    parser.add_argument('--inchi-key', action='store_true',
+                        help="add InChI keys to the resolved data if it was"
+                             " grouped on another key")
     args = parser.parse_args()
 
-    resolve_class(args.path, args.threshold)
+    resolve_class(args.path, args.threshold, args.force, args.incremental,
+                  args.inchi_key)
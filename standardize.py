@@ -1,62 +1,94 @@
 import argparse
+import os
+import pandas as pd
+import re
 import time
 
-from utils.meta_utils import read_meta, add_meta
-from utils.std_utils import read_data, write_std, __version__
-from utils.std_utils import df_add_ik, df_add_std_smiles, get_invalid_smiles
+from utils.meta_utils import read_meta, add_meta, init_meta
+from utils.std_utils import read_data, write_std, get_std_path, __version__
+from utils.std_utils import df_add_key, df_add_std_smiles, get_invalid_smiles
+from utils.std_utils import KEY_COLS
+from utils.std_utils import BackgroundStructures, get_endpoint_cols
+from utils.std_utils import get_endpoint_type, validate_fast_path
 from utils.class_utils import get_class_map, df_add_std_class
 from utils.std_utils import select_cols, subset_data, df_add_value
 from utils.std_utils import get_col_types, get_smiles_col, get_rel_col
 from utils.relation_utils import get_relation_map, df_add_std_relation
-from utils.std_utils import get_unit_col, map_compliance
+from utils.relation_utils import VALID_RELATIONS, df_split_value_qualifiers
+from utils.relation_utils import relation_map_from_meta
+from utils.std_utils import get_unit_col, map_compliance, remove_nan
+from utils.std_utils import df_add_units
 from utils.units_utils import get_unit_map, df_add_std_units
 from utils.units_utils import df_units_to_vals
+from utils.profile_utils import recode_column
+from utils.fingerprint_utils import hash_file, stage_fingerprint
+from utils.fingerprint_utils import stage_is_current, stage_records
+from utils.incremental_utils import row_keys, split_row_keys
+from utils.incremental_utils import read_keys, write_keys
 
 
-def standardize(path):
+def standardize_df(df, meta, structures=None, columns=None,
+                   key_type='inchi_key'):
     """
-    :str path: a directory containing metadata and data to be standardized
+    Standardize an in-memory raw dataset, prompting the user for mappings.
+    Structures are standardized in the background while the prompts are
+    answered and joined before the columns to keep are chosen.
+    :pd.DataFrame df: raw data to be standardized
+    :dict meta: metadata for the dataset
+    :BackgroundStructures structures: structures already being (or done)
+        standardized, e.g. shared by the endpoints of one file
+    :dict columns: smiles_col, class_col and value_col if already chosen
+    :str key_type: identity key to group replicates on, one of KEY_COLS
+    :return: standardized df (indexed like df) and dict of metadata to add
     """
 
-    # First read meta and store relevant paths into variables.
-    meta = read_meta(path)
-    meta_path = meta.get('meta_path')
-    data_path = meta.get('data_path')
-
-    df = read_data(data_path)  # Now read in the raw data ...
+    profile = meta.get('data_profile')  # Column profile from produce_meta
     free_cols = list(df.columns)
+    std_meta = {}
 
     # Add the smiles col into the meta for later use ...
-    smiles_col = get_smiles_col(free_cols)
+    if columns is None:
+        smiles_col = get_smiles_col(free_cols)
+    else:
+        smiles_col = columns['smiles_col']
     free_cols.remove(smiles_col)
 
-    add_meta(meta_path, {'smiles_col': smiles_col})
+    std_meta['smiles_col'] = smiles_col
+
+    # Structure work needs nothing but the SMILES, so it starts now
+    if structures is None:
+        structures = BackgroundStructures(df[smiles_col], key_type=key_type)
 
     # Get column names
-    class_col, value_col, df = get_col_types(free_cols, df)
+    if columns is None:
+        class_col, value_col, df = get_col_types(free_cols, df)
+    else:
+        class_col, value_col = columns.get('class_col'), \
+            columns.get('value_col')
+        for col in [class_col, value_col]:
+            if col:
+                free_cols.remove(col)
+                df = remove_nan(col, df)
 
-    std_df = df_add_std_smiles(df, smiles_col)  # Add standardized SMILES ...
-    std_df = df_add_ik(std_df, 'std_smiles')  # And InChI keys
+    std_df = df
     default_cols = ['std_smiles']  # Initialize default columns to keep
 
-    invalids = get_invalid_smiles(df, smiles_col, 'std_smiles')
-
     # If a class col is specified,
     if class_col:
 
         # Ask the user for a mapping from their class to integers
-        class_map = get_class_map(std_df, class_col)
+        class_map = get_class_map(std_df, class_col, profile)
         std_df = df_add_std_class(std_df, class_map)
 
         # Keys can only be str, int, float, bool, or None
         # Enforce keys are str for writing to meta_data only
         compliant_class_map = map_compliance(class_map, class_col)
-        # Store and write class meta
+        # Store class meta
         class_meta = {'class_map': compliant_class_map,
                       'class_col': class_col,
                       'std_class_col': 'std_class'}
 
-        add_meta(meta_path, class_meta)
+        std_meta.update(class_meta)
         default_cols.append('std_class')
 
     if value_col:
@@ -65,7 +97,7 @@ def standardize(path):
         if relation_col:
 
             # Get user mapping for relation operators
-            relation_map = get_relation_map(std_df, relation_col)
+            relation_map = get_relation_map(std_df, relation_col, profile)
             std_df = df_add_std_relation(std_df, relation_map, relation_col)
 
             # Store relation meta
@@ -77,60 +109,429 @@ def standardize(path):
             std_df = std_df.assign(std_relation='=')
             relation_meta = {'std_relation_col': 'std_relation'}
 
-        # Write relation meta
-        add_meta(meta_path, relation_meta)
+        std_meta.update(relation_meta)
         default_cols.append('std_relation')
 
+        # Values given as text may carry their own qualifiers ('>10')
+        num_col = value_col
+        if not pd.api.types.is_numeric_dtype(std_df[value_col]):
+            std_df, counts = df_split_value_qualifiers(std_df, value_col,
+                                                       relation_col)
+            std_meta['value_qualifiers'] = counts
+            num_col = 'std_values'
+
         # Get unit column
         unit_col, std_df = get_unit_col(std_df, free_cols)
         if unit_col:
-            unit_map, std_unit = get_unit_map(std_df, unit_col)
+            unit_map, std_unit = get_unit_map(std_df, unit_col,
+                                              profile=profile)
             std_df = df_add_std_units(std_df, std_unit)
-            std_df = df_units_to_vals(std_df, unit_col, value_col, unit_map)
+            std_df = df_units_to_vals(std_df, unit_col, num_col, unit_map)
             unit_meta = {'unit_map': unit_map,
                          'std_unit': std_unit,
                          'unit_col': unit_col,
                          'std_unit_col': 'std_units',
                          'std_value_col': 'std_values'}
-            add_meta(meta_path, unit_meta)
+            std_meta.update(unit_meta)
+            std_meta['value_col'] = value_col
             default_cols.append('std_units')
             default_cols.append('std_values')
+        elif num_col == 'std_values':
+            std_meta.update({'std_value_col': 'std_values',
+                             'value_col': value_col})
+            default_cols.append('std_values')
         else:
             std_df = df_add_value(std_df, value_col)
-            add_meta(meta_path, {'value_col': value_col})
+            std_meta['value_col'] = value_col
             default_cols.append(value_col)
 
-    std_meta = {'std_smiles_col': 'std_smiles',
-                'std_key_col': 'inchi_key',
-                'invalid_smiles': invalids}
+    # Join the background structures: std SMILES and identity keys
+    structures = structures.join()
+    for col in structures.columns:
+        std_df[col] = std_df[smiles_col].map(structures[col])
 
-    default_cols.append('inchi_key')
-    add_meta(meta_path, std_meta)
+    # Invalid SMILES of every row kept by the column choice, including the
+    # rows the value and unit handling dropped since
+    std_smiles = df[smiles_col].map(structures['std_smiles'])
+    invalids = get_invalid_smiles(df.assign(std_smiles=std_smiles),
+                                  smiles_col, 'std_smiles')
+
+    std_meta.update({'std_smiles_col': 'std_smiles',
+                     'std_key_col': KEY_COLS[key_type],
+                     'std_key_type': key_type,
+                     'invalid_smiles': invalids})
+
+    default_cols.extend(col for col in ['inchi_key', KEY_COLS[key_type]]
+                        if col in std_df.columns and col not in default_cols)
 
     # List of columns to retain for final csv
     kept_cols, removed = select_cols(std_df, default_cols)
     cur_df = subset_data(std_df, kept_cols)
-    std_data_path = write_std(cur_df, path, prefix='std_')
+
+    std_meta.update({'retained_columns': kept_cols,
+                     'removed_columns': removed,
+                     'std_version': __version__,
+                     'std_utc_fix': int(time.time())})
+
+    return cur_df, std_meta
+
+
+def restandardize_df(df, meta):
+    """
+    Standardize raw rows without prompting, replaying the answers recorded
+    by the last run. Returns None if the rows hold class, relation or unit
+    values those answers do not cover.
+    :pd.DataFrame df: raw rows to be standardized
+    :dict meta: metadata holding the recorded answers
+    :return: standardized df (indexed like df) and invalid smiles dict
+    """
+
+    smiles_col = meta.get('smiles_col')
+    class_col = meta.get('class_col')
+    value_col = meta.get('value_col')
+    relation_col = meta.get('relation_col')
+    unit_col = meta.get('unit_col')
+
+    df = df.copy()
+    for col in [class_col, value_col]:
+        if col:
+            df = remove_nan(col, df)
+
+    std_df = df_add_std_smiles(df, smiles_col)
+    std_df = df_add_key(std_df, meta.get('std_key_type', 'inchi_key'))
+    invalids = get_invalid_smiles(df, smiles_col, 'std_smiles')
+
+    if class_col:
+        class_map = meta['class_map'][class_col]  # Keys stored as str
+        std_class, missing = recode_column(std_df[class_col].astype(str),
+                                           class_map)
+        if missing:
+            return None
+        std_df['std_class'] = std_class.values
+
+    if value_col:
+        if relation_col:
+            relation_map = {**{r: r for r in VALID_RELATIONS},
+                            **relation_map_from_meta(meta['relation_map'])}
+            std_relation, missing = recode_column(std_df[relation_col],
+                                                  relation_map)
+            if missing:
+                return None
+            std_df['std_relation'] = std_relation.values
+        else:
+            std_df = std_df.assign(std_relation='=')
+
+        num_col = value_col
+        if meta.get('value_qualifiers') is not None:
+            std_df, _ = df_split_value_qualifiers(std_df, value_col,
+                                                  relation_col)
+            num_col = 'std_values'
+
+        if unit_col:
+            unit_map = dict(meta['unit_map'])
+            if unit_col not in std_df.columns:  # Unit column was created
+                std_df = df_add_units(std_df, unit_col, meta['std_unit'])
+            if not std_df[unit_col].astype(str).isin(unit_map.keys()).all():
+                return None
+            std_df = df_add_std_units(std_df, meta['std_unit'])
+            std_df = df_units_to_vals(std_df, unit_col, num_col, unit_map)
+        elif num_col == value_col:
+            std_df = df_add_value(std_df, value_col)
+
+    return subset_data(std_df, meta['retained_columns']), invalids
+
+
+def standardize_incremental(meta, raw_df, raw_keys):
+    """
+    Standardize only the raw rows that are new or changed since the last
+    run and reuse the stored std rows for the rest.
+    Returns None if a full (interactive) run is needed instead.
+    :dict meta: metadata of the last run
+    :pd.DataFrame raw_df: current raw data
+    :pd.Series raw_keys: row keys of the current raw data
+    :return: std df, its row keys and dict of metadata to add
+    """
+
+    std_data_path = meta.get('std_data_path')
+    old = read_keys(meta.get('std_rowkeys_path'))
+
+    # Older runs did not record the value column next to a unit column
+    missing_value_col = meta.get('std_value_col') and not meta.get('value_col')
+
+    if old is None or std_data_path is None or missing_value_col:
+        print("No previous incremental state, running a full standardize.")
+        return None
+
+    old_keys = old['row_key']
+    old_std = read_data(std_data_path)
+
+    # Keep std rows whose raw row is still there, unchanged
+    keep = pd.Index(raw_keys.values).get_indexer(old_keys) >= 0
+    new_rows = ~raw_keys.isin(old_keys)
+    print("Reusing {} std rows, standardizing {} new or changed raw rows."
+          .format(int(keep.sum()), int(new_rows.sum())))
+
+    restandardized = restandardize_df(raw_df.loc[new_rows], meta)
+    if restandardized is None:
+        print("New rows hold values the recorded mappings do not cover,"
+              " running a full standardize.")
+        return None
+
+    new_std, new_invalids = restandardized
+    new_std, new_keys = split_row_keys(new_std, raw_keys)
+
+    std_df = pd.concat([old_std.loc[keep], new_std], ignore_index=True)
+    std_keys = pd.concat([pd.Series(old_keys[keep]),
+                          pd.Series(new_keys)], ignore_index=True).values
+
+    # Invalid smiles of rows that are still in the raw data, plus new ones
+    smiles = set(raw_df[meta.get('smiles_col')])
+    invalids = {smi: idx for smi, idx in meta.get('invalid_smiles', {}).items()
+                if smi in smiles}
+    invalids.update(new_invalids)
+
+    std_meta = {'invalid_smiles': invalids,
+                'std_version': __version__,
+                'std_utc_fix': int(time.time())}
+
+    return std_df, std_keys, std_meta
+
+
+def standardize(path, force=False, incremental=False, key_type='inchi_key'):
+    """
+    :str path: a directory containing metadata and data to be standardized
+    :bool force: standardize even if nothing changed since the last run
+    :bool incremental: only standardize raw rows new since the last run
+    :str key_type: identity key to group replicates on, one of KEY_COLS
+    """
+
+    # First read meta and store relevant paths into variables.
+    meta = read_meta(path)
+    meta_path = meta.get('meta_path')
+    data_path = meta.get('data_path')
+
+    # Skip if the data, recorded answers, key and version are unchanged
+    data_hash = hash_file(data_path)
+    fingerprint = stage_fingerprint('standardize',
+                                    {**meta, 'std_key_type': key_type},
+                                    data_hash, __version__)
+    if not force and stage_is_current(meta, 'standardize', fingerprint):
+        print("Skipping standardize: inputs unchanged since the last run."
+              " Use --force to rerun.")
+        return
+
+    df = read_data(data_path)  # Now read in the raw data ...
+    raw_keys = row_keys(df)
+
+    # Stored rows can only be reused if they carry the same key
+    same_key = meta.get('std_key_type', 'inchi_key') == key_type
+    result = standardize_incremental(meta, df, raw_keys) \
+        if incremental and same_key else None
+
+    if result is None:
+        std_df, std_meta = standardize_df(df, meta, key_type=key_type)
+        std_df, std_keys = split_row_keys(std_df, raw_keys)
+    else:
+        std_df, std_keys, std_meta = result
+
+    write_std_stage(path, meta, std_df, std_keys, std_meta, data_hash)
+
+
+def write_std_stage(path, meta, std_df, std_keys, std_meta, data_hash):
+    """
+    Write the std data, its row keys and the stage records into meta
+    :str path: a directory containing metadata and data
+    :dict meta: metadata for the dataset
+    :pd.DataFrame std_df: standardized data
+    :array std_keys: row key of each std row
+    :dict std_meta: metadata of the standardization
+    :str data_hash: hash of the raw data file
+    """
+
+    meta_path = meta.get('meta_path')
+    data_path = meta.get('data_path')
 
     # Write standardized data and store meta
-    kept_meta = {'std_data_path': std_data_path,
-                 'retained_columns': kept_cols,
-                 'removed_columns': removed,
-                 'std_version': __version__,
-                 'std_utc_fix': int(time.time())}
+    std_data_path = write_std(std_df, path, prefix='std_', meta=meta)
+    std_meta['std_data_path'] = std_data_path
+    std_meta['std_rowkeys_path'] = write_keys(
+        get_std_path(data_path, 'std_rowkeys_'), {'row_key': std_keys})
 
-    add_meta(meta_path, kept_meta)
+    fingerprint = stage_fingerprint('standardize', {**meta, **std_meta},
+                                    data_hash, __version__)
+    std_meta.update(stage_records('standardize', fingerprint,
+                                  hash_file(std_data_path)))
+
+    add_meta(meta_path, std_meta)
 
     # Print write paths
     print("Standard df will be written to:", std_data_path)
     print("Updated metadata at:", meta_path)
 
 
+def endpoint_dir(path, endpoint_col):
+    """
+    Directory of an endpoint's dataset, inside the directory of the file
+    :str path: a directory containing metadata and data
+    :str endpoint_col: name of the endpoint column
+    """
+
+    name = re.sub(r'[^0-9a-zA-Z]+', '_', endpoint_col).strip('_').lower()
+    if not name:
+        raise ValueError('Endpoint column {!r} has no letters or digits to '
+                         'name its directory.'.format(endpoint_col))
+
+    return os.path.join(path, name)
+
+
+def endpoint_dirs(path, endpoint_cols):
+    """
+    Directory of every endpoint's dataset. Fails if endpoint columns
+    would share a directory, which would overwrite one with the other.
+    :str path: a directory containing metadata and data
+    :list endpoint_cols: names of the endpoint columns
+    :return: dict of endpoint column -> directory
+    """
+
+    dirs = {col: endpoint_dir(path, col) for col in endpoint_cols}
+
+    shared = {}
+    for col, endpoint_path in dirs.items():
+        shared.setdefault(endpoint_path, []).append(col)
+    clashes = [cols for cols in shared.values() if len(cols) > 1]
+    if clashes:
+        raise ValueError('Endpoint columns {} would share a directory, '
+                         'rename them to differ in more than case and '
+                         'punctuation.'.format(
+                             ', '.join(' and '.join(repr(c) for c in cols)
+                                       for cols in clashes)))
+
+    return dirs
+
+
+def standardize_endpoints(path, force=False, key_type='inchi_key'):
+    """
+    Standardize a file holding several endpoints (class or value columns).
+    Every structure is standardized once; each endpoint then becomes its
+    own dataset in a subdirectory, with its own mappings and metadata, that
+    resolve.py and produce_mqd.py process like any other.
+    :str path: a directory containing metadata and data to be standardized
+    :bool force: standardize endpoints even if nothing changed
+    :str key_type: identity key to group replicates on, one of KEY_COLS
+    """
+
+    meta = read_meta(path)
+    df = read_data(meta.get('data_path'))
+
+    free_cols = list(df.columns)
+    smiles_col = get_smiles_col(free_cols)
+    free_cols.remove(smiles_col)
+
+    endpoint_cols = get_endpoint_cols(free_cols)
+    shared_cols = [col for col in free_cols if col not in endpoint_cols]
+    endpoint_paths = endpoint_dirs(path, endpoint_cols)
+
+    structures = None  # Standardized once, when a first endpoint needs it
+    endpoints = {}
+    for endpoint_col in endpoint_cols:
+        print("Standardizing endpoint:", endpoint_col)
+        endpoint_path = endpoint_paths[endpoint_col]
+        name = os.path.basename(endpoint_path)
+
+        # The endpoint's rows become a dataset of their own
+        endpoint_df = df.loc[df[endpoint_col].notna(),
+                             [smiles_col, endpoint_col] + shared_cols]
+        os.makedirs(endpoint_path, exist_ok=True)
+        endpoint_data_path = os.path.join(endpoint_path, name + '.csv')
+        endpoint_df.to_csv(endpoint_data_path, index=False)
+
+        endpoint_meta = {'data_path': endpoint_data_path,
+                         'endpoint': endpoint_col,
+                         'parent_meta_path': meta.get('meta_path')}
+        if any('metadata.json' in f for f in os.listdir(endpoint_path)):
+            add_meta(read_meta(endpoint_path)['meta_path'], endpoint_meta)
+        else:
+            init_meta(endpoint_meta, endpoint_path)
+        endpoint_meta = read_meta(endpoint_path)
+
+        data_hash = hash_file(endpoint_data_path)
+        fingerprint = stage_fingerprint('standardize',
+                                        {**endpoint_meta,
+                                         'std_key_type': key_type},
+                                        data_hash, __version__)
+        endpoints[endpoint_col] = endpoint_path
+        if not force and stage_is_current(endpoint_meta, 'standardize',
+                                          fingerprint):
+            print("Skipping endpoint: inputs unchanged since the last run.")
+            continue
+
+        if structures is None:
+            structures = BackgroundStructures(df[smiles_col],
+                                              key_type=key_type)
+
+        endpoint_df = read_data(endpoint_data_path)
+        raw_keys = row_keys(endpoint_df)
+        kind = get_endpoint_type(endpoint_col)
+        columns = {'smiles_col': smiles_col, kind + '_col': endpoint_col}
+
+        std_df, std_meta = standardize_df(endpoint_df, endpoint_meta,
+                                          structures, columns, key_type)
+        std_df, std_keys = split_row_keys(std_df, raw_keys)
+
+        write_std_stage(endpoint_path, endpoint_meta, std_df, std_keys,
+                        std_meta, data_hash)
+
+    add_meta(meta.get('meta_path'), {'smiles_col': smiles_col,
+                                     'endpoints': endpoints})
+
+
+def validate_std(path):
+    """
+    Check the MolVS fast path gives the same structures as the full MolVS
+    path on a dataset, and report the throughput of both. Any mismatches
+    are written next to the data.
+    :str path: a directory containing metadata and data
+    """
+
+    meta = read_meta(path)
+    df = read_data(meta.get('data_path'))
+
+    smiles_col = meta.get('smiles_col') or get_smiles_col(list(df.columns))
+    smiles = pd.unique(df[smiles_col].dropna().astype(str)).tolist()
+
+    mismatches = validate_fast_path(smiles)
+    if not mismatches.empty:
+        mismatch_path = get_std_path(meta.get('data_path'),
+                                     'fast_path_mismatches_')
+        mismatches.to_csv(mismatch_path, index=False)
+        print("Mismatches written to:", mismatch_path)
+
+    return mismatches
+
+
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser()
     parser.add_argument('path', type=str,
                         help="path to directory with data to standardize")
+    parser.add_argument('--force', '-f', action='store_true',
+                        help="standardize even if nothing changed")
+    parser.add_argument('--incremental', '-i', action='store_true',
+                        help="only standardize rows new since the last run")
+    parser.add_argument('--endpoints', '-e', action='store_true',
+                        help="standardize several class/value columns, each"
+                             " into its own dataset")
+    parser.add_argument('--key', '-k', type=str, default='inchi_key',
+                        choices=list(KEY_COLS),
+                        help="identity key to group replicates on")
+    parser.add_argument('--validate', action='store_true',
+                        help="check the MolVS fast path against full MolVS"
+                             " on this dataset and report throughput")
     args = parser.parse_args()
 
-    standardize(args.path)
+    if args.validate:
+        validate_std(args.path)
+    elif args.endpoints:
+        standardize_endpoints(args.path, args.force, args.key)
+    else:
+        standardize(args.path, args.force, args.incremental, args.key)
@@ -0,0 +1,54 @@
+import collections
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+
+class StubServer:
+    """
+    Local stand-in for a remote HTTP service. Each GET is answered by
+    respond(path, count), where count is the number of earlier requests
+    for the same path, and must return (status, body).
+    """
+
+    def __init__(self, respond):
+        """
+        :function respond: (path, count) -> (status, body)
+        """
+
+        self.respond = respond
+        self.requests = collections.Counter()
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                path = unquote(self.path)
+                with stub.lock:
+                    count = stub.requests[path]
+                    stub.requests[path] += 1
+                status, body = stub.respond(path, count)
+
+                body = body.encode()
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}'.format(self.server.server_port)
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
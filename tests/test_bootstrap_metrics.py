@@ -0,0 +1,57 @@
+import sys
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..',
+                             'data_analysis'))
+
+from Metrics.bootstrap_metrics import bootstrap_ci, \
+    paired_bootstrap  # noqa: E402
+from Metrics.fold_metrics import fold_metrics  # noqa: E402
+
+
+class BootstrapTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.x = 10 ** rng.normal(size=50)
+        self.y = pd.DataFrame({'good': self.x * 10 ** rng.normal(0, .1, 50),
+                               'bad': self.x * 10 ** rng.normal(0, 1, 50)})
+
+    def test_estimates_match_fold_metrics(self):
+        ci = bootstrap_ci(self.x, self.y, resamples=200)
+        points = fold_metrics(self.x, self.y)
+        for _, row in ci.iterrows():
+            self.assertAlmostEqual(row['estimate'],
+                                   points.loc[row['model'], row['metric']])
+            self.assertLessEqual(row['lower'], row['upper'])
+
+    def test_paired_difference(self):
+        paired = paired_bootstrap(self.x, self.y, 'good', resamples=200)
+        gmfe = paired.set_index('metric').loc['gmfe']
+        self.assertEqual(gmfe['model'], 'bad')
+        self.assertGreater(gmfe['lower'], 0)
+        self.assertLess(gmfe['p_value'], 0.05)
+
+    def test_paired_on_shared_rows(self):
+        # bad is missing the rows good predicts worst; the comparison must
+        # drop them from good too
+        y = self.y.copy()
+        worst = np.argsort(-np.abs(np.log10(y['good'] / self.x)))[:10]
+        y.loc[worst, 'bad'] = np.nan
+        shared = y.loc[y['bad'].notna()]
+
+        paired = paired_bootstrap(self.x, y, 'good', resamples=200) \
+            .set_index('metric')
+        points = fold_metrics(self.x[y['bad'].notna()], shared)
+        self.assertEqual(paired.loc['gmfe', 'n'], 40)
+        self.assertAlmostEqual(paired.loc['gmfe', 'difference'],
+                               points.loc['bad', 'gmfe'] -
+                               points.loc['good', 'gmfe'])
+
+
+if __name__ == '__main__':
+    unittest.main()
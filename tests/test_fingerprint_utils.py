@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+from utils.fingerprint_utils import hash_file, stage_fingerprint, \
+    stage_is_current, stage_records
+from utils.meta_utils import add_meta, init_meta, read_meta
+
+
+class StageFingerprintTest(unittest.TestCase):
+
+    def test_current_after_metadata_round_trip(self):
+        for null in [None, float('nan')]:
+            path = tempfile.mkdtemp()
+            std_path = os.path.join(path, 'std_data.csv')
+            with open(std_path, 'w') as f:
+                f.write('std_smiles,value\nC,1\n')
+
+            meta_path = init_meta({'data_path': 'data.csv'}, path)
+            meta = read_meta(path)
+
+            # As write_std_stage does, from the in-memory answers
+            std_meta = {'relation_col': 'rel',
+                        'relation_map': {null: '=', '>>': '>'},
+                        'std_data_path': std_path}
+            fingerprint = stage_fingerprint('standardize',
+                                            {**meta, **std_meta}, 'abc',
+                                            'v1')
+            std_meta.update(stage_records('standardize', fingerprint,
+                                          hash_file(std_path)))
+            add_meta(meta_path, std_meta)
+
+            # As the next run's pre-check does, from the reloaded json
+            reloaded = read_meta(path)
+            self.assertTrue(stage_is_current(
+                reloaded, 'standardize',
+                stage_fingerprint('standardize', reloaded, 'abc', 'v1')))
+
+    def test_sensitive_to_answers(self):
+        meta = {'relation_map': {None: '=', '>>': '>'}}
+        other = {'relation_map': {None: '<', '>>': '>'}}
+
+        self.assertNotEqual(
+            stage_fingerprint('standardize', meta, 'abc', 'v1'),
+            stage_fingerprint('standardize', other, 'abc', 'v1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from leaderboard import leaderboard
+
+
+class LeaderboardTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.truth_path = os.path.join(self.tmp.name, 'truth.csv')
+        self.preds_dir = os.path.join(self.tmp.name, 'preds')
+        os.makedirs(self.preds_dir)
+
+        truth = pd.DataFrame({'std_smiles': ['C', 'CC', 'CCC', 'CCCC'],
+                              'value': [1., 10., 100., 1000.]})
+        truth.to_csv(self.truth_path, index=False)
+
+        # over: all 1.5x too high, an AFE of 1.5, all within 2-fold.
+        # under: two 4.8x and two 1.2x too low, an AFE of 1/2.4 (lower than
+        # over's but further from 1), half within 2-fold.
+        preds = {'over': truth['value'] * 1.5,
+                 'under': truth['value'] / np.array([4.8, 4.8, 1.2, 1.2])}
+        for name, values in preds.items():
+            pd.DataFrame({'std_smiles': truth['std_smiles'],
+                          'pred': values}) \
+                .to_csv(os.path.join(self.preds_dir, name + '.csv'),
+                        index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rank(self, rank_by):
+        out_path = os.path.join(self.tmp.name, 'board.csv')
+        board = leaderboard(self.truth_path, self.preds_dir, 'value',
+                            rank_by=rank_by, out_path=out_path)
+        return list(board['model'])
+
+    def test_fold_perc_ranks_higher_first(self):
+        self.assertEqual(self.rank('2_fold_perc'), ['over', 'under'])
+
+    def test_afe_ranks_by_distance_from_one(self):
+        # under has the lower AFE but is further from unbiased
+        self.assertEqual(self.rank('afe'), ['over', 'under'])
+        self.assertEqual(self.rank('gmfe'), ['over', 'under'])
+
+    def test_unknown_metric(self):
+        with self.assertRaisesRegex(ValueError, 'Cannot rank by'):
+            self.rank('r_squared')
+
+
+if __name__ == '__main__':
+    unittest.main()
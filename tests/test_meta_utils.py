@@ -0,0 +1,86 @@
+import json
+import tempfile
+import unittest
+
+from utils.meta_utils import get_doi_record, get_doi_records
+from tests.http_stub import StubServer
+
+RECORD = {'title': ['A paper'], 'publisher': 'Someone'}
+
+
+def crossref(path, count):
+    """
+    Fake Crossref works endpoint
+    """
+
+    doi = path[len('/works/'):]
+    if doi == '10.1/missing':
+        return 404, 'Resource not found.'
+    if doi == '10.1/malformed':
+        return 400, 'Bad request.'
+    if doi == '10.1/down':
+        return 503, 'Service unavailable'
+    if doi == '10.1/flaky' and count < 2:
+        return 503, 'Service unavailable'
+
+    return 200, json.dumps({'status': 'ok',
+                            'message': {**RECORD, 'DOI': doi}})
+
+
+class CrossrefTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer(crossref).__enter__()
+        self.url = self.server.url + '/works/{}'
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_success_is_cached(self):
+        record = get_doi_record('10.1/ok', cache_dir=self.cache_dir,
+                                url=self.url)
+        self.assertEqual(record['DOI'], '10.1/ok')
+
+        again = get_doi_record('10.1/ok', cache_dir=self.cache_dir,
+                               url=self.url)
+        self.assertEqual(again, record)
+        self.assertEqual(self.server.requests['/works/10.1/ok'], 1)
+
+    def test_not_found(self):
+        self.assertIsNone(get_doi_record('10.1/missing', cache_dir=None,
+                                         url=self.url))
+        self.assertEqual(self.server.requests['/works/10.1/missing'], 1)
+
+    def test_rejected(self):
+        self.assertIsNone(get_doi_record('10.1/malformed', cache_dir=None,
+                                         url=self.url))
+        self.assertEqual(self.server.requests['/works/10.1/malformed'], 1)
+
+    def test_doi_is_quoted(self):
+        doi = '10.1002/(SICI)1097-4636#12?3'
+        record = get_doi_record(doi, cache_dir=None, url=self.url)
+        self.assertEqual(record['DOI'], doi)
+
+    def test_server_error_is_retried(self):
+        record = get_doi_record('10.1/flaky', cache_dir=None, url=self.url,
+                                backoff=0)
+        self.assertEqual(record['DOI'], '10.1/flaky')
+        self.assertEqual(self.server.requests['/works/10.1/flaky'], 3)
+
+    def test_batch_skips_failures(self):
+        records = get_doi_records(['10.1/ok', '10.1/missing', '10.1/down',
+                                   '10.1/flaky', '10.1/ok'], workers=4,
+                                  cache_dir=None, url=self.url, retries=2,
+                                  backoff=0)
+
+        self.assertEqual(records['10.1/ok']['DOI'], '10.1/ok')
+        self.assertEqual(records['10.1/flaky']['DOI'], '10.1/flaky')
+        self.assertIsNone(records['10.1/missing'])
+        self.assertNotIn('10.1/down', records)
+        self.assertEqual(self.server.requests['/works/10.1/down'], 3)
+        self.assertEqual(self.server.requests['/works/10.1/ok'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
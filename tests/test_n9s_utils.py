@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from utils.n9s_utils import capture_depths, n_9s_keep, build_surface, \
+    save_surface, N9sSurface
+
+
+class CaptureDepthsTest(unittest.TestCase):
+
+    def test_depths(self):
+        ex_vals = np.array([[1., 2., 3., 4.],
+                            [4., 3., 2., 1.]])
+        pred_vals = np.array([[2., 1., 3., 4.],
+                              [1., 2., 3., 4.]])
+        self.assertEqual(list(capture_depths(ex_vals, pred_vals, 1)), [2, 4])
+        self.assertEqual(list(capture_depths(ex_vals, pred_vals, 2)), [2, 4])
+
+
+class N9sSurfaceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, 'surface.npz')
+        save_surface(cls.path, build_surface([0.5, 0.9], [100, 1000], [1],
+                                             ns=[2], trials=500))
+        cls.surface = N9sSurface.load(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_grid_points(self):
+        savings, error = self.surface.query(0.9, 1000, 1, 2)
+        self.assertEqual(savings, self.surface.savings[1, 1, 0, 0])
+        self.assertEqual(error, self.surface.error[1, 1, 0, 0])
+
+    def test_interpolation_is_between_grid_points(self):
+        low = self.surface.query(0.5, 100, 1, 2)[0]
+        high = self.surface.query(0.9, 100, 1, 2)[0]
+        self.assertTrue(low <= self.surface.query(0.7, 100, 1, 2)[0] <= high)
+
+    def test_off_grid(self):
+        with self.assertRaisesRegex(ValueError, 'outside the surface grid'):
+            self.surface.query(0.95, 100, 1, 2)
+        with self.assertRaisesRegex(ValueError, 'ex_capture must be'):
+            self.surface.query(0.9, 100, 5, 2)
+
+    def test_keep_beyond_grid(self):
+        # Larger libraries are given the fraction of the largest grid size
+        model = n_9s_keep(5000, 0.9, 1, 2, self.surface)
+        self.assertEqual(model['model_lib_size'], 1000)
+        self.assertEqual(model['source'], 'surface')
+        self.assertEqual(model['keep'], int(np.ceil(
+            5000 * (100. - model['savings']) / 100.)))
+
+    def test_keep_below_grid(self):
+        model = n_9s_keep(50, 0.9, 1, 2, self.surface, trials=500)
+        self.assertEqual(model['model_lib_size'], 50)
+        self.assertEqual(model['source'], 'simulation')
+
+
+class N9sKeepTest(unittest.TestCase):
+
+    def test_simulated(self):
+        model = n_9s_keep(200, 0.8, 1, 2, trials=500)
+        self.assertEqual(model['source'], 'simulation')
+        self.assertTrue(1 <= model['keep'] <= 200)
+
+    def test_keeps_at_least_the_capture(self):
+        model = n_9s_keep(20, 0.99, 5, 0, trials=200)
+        self.assertGreaterEqual(model['keep'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
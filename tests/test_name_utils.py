@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+from utils.name_utils import CactusBackend, resolve_names, read_name_cache
+from tests.http_stub import StubServer
+
+SMILES = {'aspirin': 'CC(=O)Oc1ccccc1C(=O)O',
+          'caffeine': 'Cn1c(=O)c2c(ncn2C)n(C)c1=O'}
+
+
+def cactus(path, count):
+    """
+    Fake CACTUS resolver: known names, a flaky name failing twice with a
+    503, a name that is always down and 404 for everything else
+    """
+
+    name = path.split('/')[-2]
+    if name == 'flaky':
+        return (503, 'busy') if count < 2 else (200, 'CCO\n')
+    if name == 'down':
+        return 503, 'busy'
+    if name in SMILES:
+        return 200, SMILES[name] + '\n'
+
+    return 404, 'Page not found'
+
+
+class ResolveNamesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer(cactus).__enter__()
+        self.backends = [CactusBackend(self.server.url +
+                                       '/chemical/structure/{}/smiles')]
+        self.cache_path = os.path.join(tempfile.mkdtemp(), 'names.json')
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def resolve(self, names):
+        return resolve_names(names, self.backends, self.cache_path,
+                             concurrency=4, retries=3, backoff=0)
+
+    def requests(self, name):
+        return self.server.requests['/chemical/structure/{}/smiles'
+                                    .format(name)]
+
+    def test_cache_hit_and_miss(self):
+        resolved = self.resolve(['aspirin', 'caffeine', 'aspirin'])
+        self.assertEqual(resolved, SMILES)
+        self.assertEqual(self.requests('aspirin'), 1)
+
+        again = self.resolve(['Aspirin ', 'caffeine'])
+        self.assertEqual(again['caffeine'], SMILES['caffeine'])
+        self.assertEqual(again['Aspirin '], SMILES['aspirin'])
+        self.assertEqual(self.requests('aspirin'), 1)
+        self.assertEqual(self.requests('caffeine'), 1)
+
+    def test_server_error_is_retried(self):
+        self.assertEqual(self.resolve(['flaky']), {'flaky': 'CCO'})
+        self.assertEqual(self.requests('flaky'), 3)
+
+    def test_not_found_is_cached_as_miss(self):
+        self.assertEqual(self.resolve(['unobtainium']),
+                         {'unobtainium': None})
+        self.assertIn('unobtainium', read_name_cache(self.cache_path))
+
+        self.resolve(['unobtainium'])
+        self.assertEqual(self.requests('unobtainium'), 1)
+
+    def test_failures_are_not_cached(self):
+        self.assertEqual(self.resolve(['down']), {'down': None})
+        self.assertEqual(self.requests('down'), 4)
+        self.assertNotIn('down', read_name_cache(self.cache_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
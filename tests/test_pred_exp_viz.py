@@ -0,0 +1,46 @@
+import os
+import sys
+import unittest
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+matplotlib.use('Agg')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..',
+                             'data_analysis'))
+
+from Viz.pred_exp_viz import PredExpViz, DENSITY_MIN_POINTS  # noqa: E402
+
+
+class DensityModeTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        x = 10 ** rng.normal(size=DENSITY_MIN_POINTS)
+        self.df = pd.DataFrame({'x': x,
+                                'y': x * 10 ** rng.normal(0, .3, len(x)),
+                                'hue': rng.normal(size=len(x)),
+                                'group': rng.choice(['A', 'B'], len(x))})
+
+    def test_automatic(self):
+        self.assertTrue(PredExpViz(self.df, 'x', 'y').density)
+        self.assertTrue(PredExpViz(self.df, 'x', 'y', 'hue').density)
+        self.assertFalse(PredExpViz(self.df.head(100), 'x', 'y').density)
+
+    def test_categorical_hue_falls_back(self):
+        for density in [None, True]:
+            with self.assertWarns(UserWarning):
+                viz = PredExpViz(self.df, 'x', 'y', 'group', density=density)
+            self.assertFalse(viz.density)
+
+    def test_renders_with_lines(self):
+        viz = PredExpViz(self.df, 'x', 'y', 'hue').main()
+        viz.add_unity()
+        viz.add_nfold_error(n=2)
+        self.assertEqual(len(viz.ax.lines), 3)
+        matplotlib.pyplot.close('all')
+
+
+if __name__ == '__main__':
+    unittest.main()
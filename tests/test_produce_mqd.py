@@ -0,0 +1,43 @@
+import unittest
+
+import pandas as pd
+
+from produce_mqd import sweep_cutoffs
+from utils.mqd_utils import threshold_sweep, tripartite
+
+
+class SweepWithoutUnitsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({'std_smiles': ['C', 'CC', 'CCC', 'CCCC'],
+                                'std_value': [1., 5., 20., 50.],
+                                'std_relation': ['=', '>', '=', '<']})
+        self.meta = {'std_smiles_col': 'std_smiles',
+                     'std_value_col': 'std_value',
+                     'std_relation_col': 'std_relation'}
+
+    def test_plain_cutoffs(self):
+        cutoffs = sweep_cutoffs(self.meta, ['10', '2.5'], [])
+        self.assertEqual(cutoffs, {'upper': [10., 2.5], 'lower': []})
+
+    def test_unit_cutoff_without_std_unit(self):
+        with self.assertRaisesRegex(ValueError, 'no std unit'):
+            sweep_cutoffs(self.meta, ['10uM'])
+
+    def test_regression_split(self):
+        upper, _, _ = threshold_sweep(self.df, 'std_relation', 'std_value',
+                                      'std_smiles', [10.])
+        self.assertEqual(list(upper['upper_10']), [0, -1, 1, 0])
+
+        regression, upper_df, lower_df = tripartite(
+            self.df, None, None, 'std_relation', 'std_value', None,
+            'std_smiles')
+        self.assertEqual(list(regression.columns),
+                         ['std_smiles', 'std_value'])
+        self.assertEqual(list(regression['std_smiles']), ['C', 'CCC'])
+        self.assertIsNone(upper_df)
+        self.assertIsNone(lower_df)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from utils.profile_utils import profile_chunks, profile_values, \
+    recode_column
+
+
+class RecodeColumnTest(unittest.TestCase):
+
+    def setUp(self):
+        self.values = pd.Series(['>', None, '<', np.nan, '>'], name='rel')
+
+    def test_null_keys(self):
+        for null in [None, np.nan, float('nan')]:
+            recoded, missing = recode_column(self.values,
+                                             {'>': '>', '<': '<', null: '='})
+            self.assertEqual(list(recoded), ['>', '=', '<', '=', '>'])
+            self.assertEqual(missing, [])
+
+    def test_unmapped_null(self):
+        recoded, missing = recode_column(self.values, {'>': '>', '<': '<'})
+        self.assertEqual(missing, [None])
+        self.assertTrue(recoded.isna().tolist() ==
+                        [False, True, False, True, False])
+
+    def test_matches_replace(self):
+        mapping = {'>': 'gt', '<': 'lt', np.nan: 'eq'}
+        recoded, _ = recode_column(self.values, mapping)
+        expected = self.values.replace(mapping)
+        self.assertEqual(list(recoded), list(expected))
+
+
+class ProfileChunksTest(unittest.TestCase):
+
+    def test_counts_are_exact_across_chunks(self):
+        # 'b' is rare in every chunk but the most frequent overall
+        chunks = [pd.DataFrame({'col': ['a{}'.format(i)] * 2 + ['b']})
+                  for i in range(30)]
+        profile = profile_chunks(chunks, top_k=5)['columns']['col']
+        self.assertEqual(profile['value_counts'][0], ['b', 30])
+        self.assertEqual(profile['distinct_count'], 31)
+        self.assertEqual(len(profile['value_counts']), 5)
+        self.assertFalse(profile['value_counts_complete'])
+
+    def test_profile_values(self):
+        chunks = [pd.DataFrame({'rel': ['>', None]}),
+                  pd.DataFrame({'rel': ['<', '>']})]
+        profile = profile_chunks(chunks, top_k=2)
+        self.assertEqual(profile['columns']['rel']['value_counts'],
+                         [['>', 2], ['<', 1]])
+        self.assertEqual(profile_values(profile, 'rel'), ['>', '<', None])
+
+        profile = profile_chunks(chunks, top_k=1)
+        self.assertIsNone(profile_values(profile, 'rel'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import sys
+import os
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..',
+                             'data_analysis'))
+
+from Metrics.rank_metrics import capture_depth  # noqa: E402
+
+
+class CaptureDepthTest(unittest.TestCase):
+
+    def test_untied(self):
+        x = np.array([1., 2., 3., 4., 5.])
+        y = np.array([2., 1., 5., 3., 4.])
+        self.assertEqual(capture_depth(x, y, 1), 2)
+        self.assertEqual(capture_depth(x, y, 2), 2)
+        self.assertEqual(capture_depth(x, y, 3), 5)
+
+    def test_ties_at_cutoff_are_captured(self):
+        x = np.array([1., 1., 1., 1., 1., 2., 3.])
+        y = np.array([7., 6., 5., 4., 3., 2., 1.])
+        # All five tied best values are the target, not a subset of them
+        self.assertEqual(capture_depth(x, y, 2), 7)
+
+    def test_rounded_values_never_zero(self):
+        rng = np.random.default_rng(0)
+        x = np.round(rng.normal(size=500), 1)
+        y = x + rng.normal(0, .5, 500)
+        for top_n in [1, 5, 10]:
+            self.assertGreater(capture_depth(x, y, top_n), 0)
+
+    def test_no_predictions(self):
+        self.assertTrue(np.isnan(capture_depth([1., 2.], [np.nan, np.nan])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from standardize import endpoint_dirs, restandardize_df
+from utils.meta_utils import add_meta, init_meta, read_meta
+
+
+class RestandardizeTest(unittest.TestCase):
+
+    def test_replays_null_relation_from_disk(self):
+        df = pd.DataFrame({'smiles': ['CCO', 'c1ccccc1', 'CC(=O)O'],
+                           'rel': ['>', None, '>>'],
+                           'value': [1., 2., 3.]})
+
+        for null in [None, np.nan]:
+            path = tempfile.mkdtemp()
+            meta_path = init_meta({'data_path': 'data.csv'}, path)
+            add_meta(meta_path, {'smiles_col': 'smiles',
+                                 'value_col': 'value',
+                                 'relation_col': 'rel',
+                                 'relation_map': {null: '=', '>>': '>'},
+                                 'retained_columns': ['std_smiles',
+                                                      'std_relation',
+                                                      'value_col']})
+            meta = read_meta(path)
+            self.assertNotIn(None, meta['relation_map'])
+
+            result = restandardize_df(df, meta)
+            self.assertIsNotNone(result)
+            std_df, _ = result
+            self.assertEqual(list(std_df['std_relation']), ['>', '=', '>'])
+
+
+class EndpointDirsTest(unittest.TestCase):
+
+    def test_dirs(self):
+        dirs = endpoint_dirs('data', ['LogD (pH 7.4)', 'Solubility'])
+        self.assertEqual(dirs, {'LogD (pH 7.4)': os.path.join('data',
+                                                              'logd_ph_7_4'),
+                                'Solubility': os.path.join('data',
+                                                           'solubility')})
+
+    def test_collisions(self):
+        with self.assertRaisesRegex(ValueError, "'IC50 uM' and 'ic50-uM'"):
+            endpoint_dirs('data', ['IC50 uM', 'ic50-uM', 'Solubility'])
+        with self.assertRaisesRegex(ValueError, 'no letters or digits'):
+            endpoint_dirs('data', ['%'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from triage import triage
+from utils.n9s_utils import build_surface, save_surface
+from utils.triage_utils import count_rows, top_k_stream
+
+
+class TriageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'preds.csv')
+        preds = np.random.default_rng(0).permutation(100).astype(float)
+        preds[[3, 7]] = np.nan
+        self.df = pd.DataFrame({'id': range(100), 'pred': preds})
+        self.df.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_count_rows(self):
+        self.assertEqual(count_rows(self.path, 'pred', chunksize=7), 98)
+
+    def test_top_k_stream(self):
+        valid = self.df.dropna()
+        for largest in [False, True]:
+            kept, rows = top_k_stream(self.path, 'pred', 5, largest,
+                                      chunksize=9)
+            expected = valid.sort_values('pred', ascending=not largest)
+            self.assertEqual(rows, 98)
+            self.assertEqual(list(kept['id']), list(expected['id'][:5]))
+
+    def test_ties_keep_file_order(self):
+        pd.DataFrame({'id': range(6), 'pred': [2., 1., 1., 3., 1., 0.]}) \
+            .to_csv(self.path, index=False)
+        kept, _ = top_k_stream(self.path, 'pred', 3, chunksize=2)
+        self.assertEqual(list(kept['id']), [5, 1, 2])
+
+    def test_fraction(self):
+        out_path = os.path.join(self.tmp.name, 'kept.csv')
+        summary = triage(self.path, fraction=0.1, out_path=out_path)
+        self.assertEqual(summary['kept_rows'], 10)
+        self.assertEqual(len(pd.read_csv(out_path)), 10)
+        with open(os.path.join(self.tmp.name, 'kept_summary.json')) as f:
+            self.assertEqual(json.load(f)['rows'], 98)
+
+    def test_default_path_without_directory(self):
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            summary = triage('preds.csv', top=5)
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(summary['kept_path'], 'triage_preds.csv')
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name,
+                                                    'triage_preds.csv')))
+
+    def test_surface(self):
+        surface_path = os.path.join(self.tmp.name, 'surface.npz')
+        save_surface(surface_path, build_surface([0.5, 0.9], [1000, 10000],
+                                                 [1], ns=[2], trials=200))
+
+        # 98 rows is below the grid and simulated instead
+        summary = triage(self.path, r2=0.8, capture=1, n=2,
+                         surface_path=surface_path,
+                         out_path=os.path.join(self.tmp.name, 'kept.csv'))
+        self.assertEqual(summary['n9s_source'], 'simulation')
+        self.assertEqual(summary['n9s_model_lib_size'], 98)
+
+        # Off the grid fails before the file is read
+        with self.assertRaisesRegex(ValueError, 'outside the surface grid'):
+            triage(os.path.join(self.tmp.name, 'missing.csv'), r2=0.95,
+                   capture=1, n=2, surface_path=surface_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
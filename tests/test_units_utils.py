@@ -0,0 +1,37 @@
+import unittest
+
+from utils.units_utils import conversion_factor, parse_unit
+
+
+class ConversionFactorTest(unittest.TestCase):
+
+    def test_same_dimensions(self):
+        self.assertAlmostEqual(conversion_factor('nM', 'uM'), 1e-3)
+        self.assertAlmostEqual(conversion_factor('mol/L', 'mM'), 1e3)
+        self.assertAlmostEqual(conversion_factor('mL/min/kg', 'L/h/kg'),
+                               0.06)
+
+    def test_plain_dimensionless(self):
+        self.assertAlmostEqual(conversion_factor('%', 'fraction'), 0.01)
+        self.assertAlmostEqual(conversion_factor('fraction', '%'), 100)
+        self.assertAlmostEqual(conversion_factor('ratio', '%'), 100)
+
+    def test_ratios_of_quantities(self):
+        self.assertAlmostEqual(conversion_factor('mg/kg', 'ug/g'), 1)
+        self.assertIsNone(conversion_factor('mg/kg', '%'))
+        self.assertIsNone(conversion_factor('%', 'mg/kg'))
+        self.assertIsNone(conversion_factor('mL/L', 'mg/kg'))
+
+    def test_unknown_and_mismatched(self):
+        self.assertIsNone(conversion_factor('uM', 'mg'))
+        self.assertIsNone(conversion_factor('furlong', 'L'))
+        self.assertIsNone(parse_unit('furlong'))
+
+    def test_parse_unit(self):
+        factor, dims = parse_unit('mg/kg')
+        self.assertEqual(dims, (0, 0, 0, 0))
+        self.assertAlmostEqual(float(factor), 1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import time
+
+from utils.std_utils import get_std_path
+from utils.n9s_utils import n_9s_keep, N9sSurface
+from utils.triage_utils import count_rows, top_k_stream, __version__
+
+
+def triage(path, pred_col='pred', top=None, fraction=None, r2=None,
+           capture=None, n=3, surface_path=None, largest=False,
+           out_path=None):
+    """
+    Keep the best predicted rows of a predictions file, streaming it in
+    chunks. How many to keep is given directly (top or fraction) or derived
+    from the n 9s model: enough to hold the top capture compounds with n 9s
+    confidence for a model of the given R^2.
+    :str path: path to the predictions csv
+    :str pred_col: name of the prediction column
+    :int top: number of rows to keep
+    :float fraction: fraction of the rows to keep
+    :float r2: R^2 of the model that made the predictions
+    :int capture: number of top compounds to capture
+    :int n: number of 9's of confidence
+    :str surface_path: precomputed n 9s surface, simulated if None
+    :bool largest: if True the best predictions are the largest
+    :str out_path: path of the kept rows, next to path if None
+    :return: dict summarizing the triage
+    """
+
+    start = time.time()
+    summary = {'predictions_path': path,
+               'pred_col': pred_col,
+               'best': 'largest' if largest else 'lowest'}
+
+    if top is None:
+        surface = None
+        if fraction is None and surface_path:
+            # Check the query fits the surface before counting the file
+            surface = N9sSurface.load(surface_path)
+            surface.check(r2, capture, n)
+
+        lib_size = count_rows(path, pred_col)
+        if fraction is not None:
+            top = max(1, int(round(lib_size * fraction)))
+            summary['fraction'] = fraction
+        else:
+            model = n_9s_keep(lib_size, r2, capture, n, surface)
+            top = model.pop('keep')
+            summary.update({'r2': r2, 'capture': capture, 'n': n,
+                            'n9s_savings': model['savings'],
+                            'n9s_error': model['error'],
+                            'n9s_model_lib_size': model['model_lib_size'],
+                            'n9s_source': model['source']})
+            print("{} 9s savings of {:.2f}% (+/- {:.2f}%): keeping the top"
+                  " {} of {} predictions".format(n, model['savings'],
+                                                 model['error'], top,
+                                                 lib_size))
+
+    kept, rows = top_k_stream(path, pred_col, top, largest)
+
+    if out_path is None:
+        out_path = get_std_path(path, 'triage_')
+    kept.to_csv(out_path, index=False)
+
+    summary.update({'rows': rows,
+                    'kept_rows': len(kept),
+                    'kept_fraction': len(kept) / rows if rows else 0,
+                    'cutoff': float(kept[pred_col].iloc[-1])
+                    if len(kept) else None,
+                    'kept_path': out_path,
+                    'triage_version': __version__,
+                    'triage_seconds': round(time.time() - start, 2)})
+
+    summary_path = os.path.splitext(out_path)[0] + '_summary.json'
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=4)
+
+    print("Kept {} of {} rows (prediction cutoff {}).".format(
+        summary['kept_rows'], rows, summary['cutoff']))
+    print("Kept rows written to:", out_path)
+    print("Summary written to:", summary_path)
+
+    return summary
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', type=str,
+                        help='path to a predictions csv')
+    parser.add_argument('--pred-col', type=str, default='pred',
+                        help='name of the prediction column')
+    keep = parser.add_mutually_exclusive_group(required=True)
+    keep.add_argument('--top', type=int,
+                      help='number of best predicted rows to keep')
+    keep.add_argument('--fraction', type=float,
+                      help='fraction of best predicted rows to keep')
+    keep.add_argument('--r2', type=float,
+                      help="R² of the model, to keep what the n 9s model"
+                           " says is needed to hold the top --capture")
+    parser.add_argument('--capture', type=int, default=1,
+                        help='number of top compounds to capture')
+    parser.add_argument('--n', type=int, default=3,
+                        help="number of 9's of confidence")
+    parser.add_argument('--surface', type=str, default=None,
+                        help='precomputed n 9s surface (see n9s_surface.py),'
+                             ' simulated if not given')
+    parser.add_argument('--largest', action='store_true',
+                        help='keep the largest predictions instead of the'
+                             ' lowest')
+    parser.add_argument('--out', type=str, default=None,
+                        help='path of the kept rows')
+    args = parser.parse_args()
+
+    triage(args.path, args.pred_col, args.top, args.fraction, args.r2,
+           args.capture, args.n, args.surface, args.largest, args.out)
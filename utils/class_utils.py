@@ -1,42 +1,52 @@
 import questionary
 
+from utils.profile_utils import profile_values, recode_column
+
 
 def df_add_std_class(df, class_map):
     """
-    df_add_std_class adds standardized binary class to a df
+    df_add_std_class adds standardized binary class to a df.
+    Only the class column is read; the std_class column is added in place.
     :pd.DataFrame df: df of interest
     :dict class_map: mapping of old class to new class
     """
 
     class_col = list(class_map.keys())[0]
 
-    std_df = df \
-        .replace(to_replace=class_map) \
-        .rename(columns={class_col: 'std_class'})
+    std_class, missing = recode_column(df[class_col], class_map[class_col])
+    if missing:
+        print("Class values {} are not in the class map and were set to"
+              " NaN.".format(missing))
 
-    std_df[class_col] = df[class_col]
+    df['std_class'] = std_class.values
 
-    return std_df
+    return df
 
 
-def get_class_values(df, class_col):
+def get_class_values(df, class_col, profile=None):
     """
     return unique class values for the class_col
     :pd.DataFrame df: df of interest
     :str class_col: name of the class column
+    :dict profile: column profile of df, used instead of a scan if given
     """
 
+    values = profile_values(profile, class_col)
+    if values is not None:
+        return values
+
     return list(set(df[class_col].values))
 
 
-def get_class_map(df, class_col):
+def get_class_map(df, class_col, profile=None):
     """
     Assign class column to appropriate values
     :pd.DataFrame df: df with class to map
     :str class_col: name of column containing class of interest
+    :dict profile: column profile of df, used instead of a scan if given
     """
 
-    class_values = get_class_values(df, class_col)
+    class_values = get_class_values(df, class_col, profile)
     class_len = len(class_values)
     options = [x for x in range(0, class_len)]
 
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+
+__version__ = 'v1.0.0 (10-19-2026)'
+
+# Recorded answers and settings each stage depends on, besides its input
+STAGE_KEYS = {'standardize': ['smiles_col', 'class_col', 'class_map',
+                              'value_col', 'relation_col', 'relation_map',
+                              'unit_col', 'unit_map', 'std_unit',
+                              'retained_columns', 'std_key_type'],
+              'resolve': ['std_smiles_col', 'std_key_col', 'std_class_col',
+                          'std_value_col', 'value_col', 'std_relation_col',
+                          'resolution_function']}
+
+# Metadata keys holding each stage's fingerprint, artifact and artifact hash
+STAGE_RECORDS = {'standardize': ('std_fingerprint', 'std_data_path',
+                                 'std_data_hash'),
+                 'resolve': ('resolved_fingerprint', 'resolved_data_path',
+                             'resolved_data_hash')}
+
+
+def hash_file(path, block_size=2 ** 20):
+    """
+    Return the sha256 hex digest of a file, read in blocks
+    :str path: path to the file
+    :int block_size: number of bytes read at a time
+    """
+
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def _canonical(value):
+    """
+    The form value takes once written to and read back from the metadata
+    json, so answers hash the same in memory and after a reload (a None
+    key becomes 'null', a NaN key 'NaN')
+    :value: answer recorded in meta
+    """
+
+    return json.loads(json.dumps(value, default=str))
+
+
+def stage_fingerprint(stage, meta, input_hash, version, extra=None):
+    """
+    Fingerprint everything a stage's output depends on: the hash of its
+    input file, the recorded answers and settings in meta, any extra
+    arguments and the tool version.
+    :str stage: name of the stage
+    :dict meta: metadata holding the recorded answers
+    :str input_hash: hash of the stage's input file
+    :str version: version of the utils implementing the stage
+    :dict extra: other arguments the output depends on
+    """
+
+    content = {'stage': stage,
+               'input_hash': input_hash,
+               'answers': {k: _canonical(meta.get(k))
+                           for k in STAGE_KEYS[stage]},
+               'extra': _canonical(extra or {}),
+               'version': version}
+
+    encoded = json.dumps(content, sort_keys=True, default=str).encode()
+
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def stage_is_current(meta, stage, fingerprint):
+    """
+    A stage is current if its recorded fingerprint matches and its
+    artifact still exists unchanged on disk.
+    :dict meta: metadata for the dataset
+    :str stage: name of the stage
+    :str fingerprint: fingerprint of the stage's current inputs
+    """
+
+    fingerprint_key, path_key, hash_key = STAGE_RECORDS[stage]
+    artifact_path = meta.get(path_key)
+
+    if meta.get(fingerprint_key) != fingerprint:
+        return False
+    if artifact_path is None or not os.path.isfile(artifact_path):
+        return False
+
+    return hash_file(artifact_path) == meta.get(hash_key)
+
+
+def stage_records(stage, fingerprint, artifact_hash):
+    """
+    Return the metadata recording a finished stage
+    :str stage: name of the stage
+    :str fingerprint: fingerprint of the stage's inputs
+    :str artifact_hash: hash of the artifact the stage wrote
+    """
+
+    fingerprint_key, _, hash_key = STAGE_RECORDS[stage]
+
+    return {fingerprint_key: fingerprint, hash_key: artifact_hash}
+
+
+def print_summary(decisions):
+    """
+    Print which stages ran and which were skipped
+    :list decisions: (stage, decision, reason) tuples
+    """
+
+    print('Run summary:')
+    for stage, decision, reason in decisions:
+        print('  {:<12} {:<8} {}'.format(stage, decision, reason))
@@ -0,0 +1,143 @@
+import numpy as np
+import os
+import pandas as pd
+
+__version__ = 'v1.0.0 (10-19-2026)'
+
+# Odd 64-bit constant used to mix the occurrence number into a row hash
+_OCCURRENCE_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def row_keys(df):
+    """
+    Hash every raw row into a uint64 key. Identical rows are told apart
+    by their occurrence number, so appending a duplicate is a new row.
+    :pd.DataFrame df: raw data
+    """
+
+    hashes = pd.util.hash_pandas_object(df, index=False).values
+    occurrence = pd.Series(hashes).groupby(hashes).cumcount().values
+
+    with np.errstate(over='ignore'):
+        mixed = hashes ^ (occurrence.astype(np.uint64) * _OCCURRENCE_MIX)
+
+    return pd.Series(pd.util.hash_array(mixed), index=df.index)
+
+
+def split_row_keys(std_df, raw_keys):
+    """
+    Pair the rows of a standardized df (still carrying the raw index) with
+    the keys of the raw rows they came from, and reset its index.
+    :pd.DataFrame std_df: standardized df indexed like the raw data
+    :pd.Series raw_keys: row keys of the raw data
+    """
+
+    keys = raw_keys.loc[std_df.index].values
+
+    return std_df.reset_index(drop=True), keys
+
+
+def write_keys(path, columns):
+    """
+    Write a sidecar csv of uint64 key columns (stored as int64)
+    :str path: path of the sidecar csv
+    :dict columns: column name -> uint64 array
+    """
+
+    sidecar = pd.DataFrame({name: np.asarray(values, dtype=np.uint64)
+                            .view(np.int64)
+                            for name, values in columns.items()})
+    sidecar.to_csv(path, index=False)
+
+    return path
+
+
+def read_keys(path):
+    """
+    Read a sidecar csv written by write_keys, None if it does not exist
+    :str path: path of the sidecar csv
+    """
+
+    if path is None or not os.path.isfile(path):
+        return None
+
+    sidecar = pd.read_csv(path, dtype=np.int64)
+
+    return {name: sidecar[name].values.view(np.uint64)
+            for name in sidecar.columns}
+
+
+def group_signatures(keys, std_keys):
+    """
+    Summarize the rows of each identity group by xor-ing their row keys.
+    A group's signature changes whenever one of its rows is added,
+    removed or edited.
+    :array-like keys: identity key (e.g. InChI key) of each std row
+    :array std_keys: row key of each std row
+    :return: pd.Series of uint64 signatures indexed by identity key
+    """
+
+    codes, uniques = pd.factorize(np.asarray(keys))
+    order = np.argsort(codes, kind='stable')
+    starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+
+    signatures = np.bitwise_xor.reduceat(
+        np.asarray(std_keys, dtype=np.uint64)[order], starts)
+
+    return pd.Series(signatures, index=uniques[codes[order][starts]])
+
+
+def hash_keys(keys):
+    """
+    Hash identity keys (e.g. InChI keys) into uint64 for the sidecar files
+    :array-like keys: identity keys
+    """
+
+    return pd.util.hash_array(np.asarray(keys, dtype=object))
+
+
+def group_table(keys, std_keys, resolved_keys, resolved_std_keys):
+    """
+    Record the resolution result of every identity group: its signature
+    and the row key of the std row it kept (0 if the group was dropped).
+    :array-like keys: identity key of each valid std row
+    :array std_keys: row key of each valid std row
+    :array-like resolved_keys: identity key of each resolved row
+    :array resolved_std_keys: row key of each resolved row
+    :return: dict of uint64 columns, ready for write_keys
+    """
+
+    signatures = group_signatures(keys, std_keys)
+    position = pd.Index(resolved_keys).get_indexer(signatures.index)
+    resolved_std_keys = np.asarray(resolved_std_keys, dtype=np.uint64)
+
+    kept = np.zeros(len(signatures), dtype=np.uint64)
+    kept[position >= 0] = resolved_std_keys[position[position >= 0]]
+
+    return {'group_hash': hash_keys(signatures.index),
+            'signature': signatures.values,
+            'kept_row_key': kept}
+
+
+def reuse_groups(keys, std_keys, old_table):
+    """
+    Compare the current groups against the table of the last run.
+    :array-like keys: identity key of each valid std row
+    :array std_keys: row key of each valid std row
+    :dict old_table: group table of the last run, as read by read_keys
+    :return: identity keys of groups to re-resolve, identity keys of
+        unchanged groups and the row keys they kept (0 if dropped)
+    """
+
+    signatures = group_signatures(keys, std_keys)
+    position = pd.Index(old_table['group_hash']) \
+        .get_indexer(hash_keys(signatures.index))
+
+    found = position >= 0
+    unchanged = np.zeros(len(signatures), dtype=bool)
+    unchanged[found] = \
+        old_table['signature'][position[found]] == signatures.values[found]
+
+    kept = old_table['kept_row_key'][position[unchanged]]
+
+    return signatures.index[~unchanged], signatures.index[unchanged], kept
@@ -0,0 +1,150 @@
+import functools
+import os
+import numpy as np
+import pandas as pd
+import tqdm
+
+from multiprocessing import pool
+
+from utils.std_utils import KEY_COLS
+
+__version__ = 'v1.0.0 (10-19-2026)'
+
+# Identity columns predictions may be joined on, in order of preference
+JOIN_COLS = list(KEY_COLS.values()) + ['std_smiles']
+
+
+def prediction_paths(preds_dir):
+    """
+    List the prediction csvs of a directory, sorted by name
+    :str preds_dir: directory of prediction files
+    """
+
+    return sorted(os.path.join(preds_dir, f) for f in os.listdir(preds_dir)
+                  if f.lower().endswith('.csv'))
+
+
+def build_index(truth, key_cols=JOIN_COLS):
+    """
+    Hash index from each identity key of the ground truth to its row
+    :pd.DataFrame truth: resolved ground truth, one row per compound
+    :list key_cols: identity columns to index, if present
+    :return: dict of key column -> pd.Index of its values
+    """
+
+    index = {}
+    for col in key_cols:
+        if col not in truth.columns:
+            continue
+        keys = pd.Index(truth[col])
+        if keys.is_unique:
+            index[col] = keys
+
+    if not index:
+        raise ValueError('The ground truth has no unique identity column of'
+                         ' {}.'.format(key_cols))
+
+    return index
+
+
+def read_predictions(path, index, pred_cols=None):
+    """
+    Read a prediction file and align its predictions to the ground truth
+    rows, joining on the first identity column both share
+    :str path: path to the prediction csv
+    :dict index: identity column -> pd.Index, from build_index
+    :list pred_cols: prediction columns to read, every other numeric column
+        if None
+    :return: dict of model name -> predictions in ground truth row order
+        (NaN where missing), and the join column
+    """
+
+    df = pd.read_csv(path)
+    key_col = next((col for col in index if col in df.columns), None)
+    if key_col is None:
+        raise ValueError('{} has none of the identity columns {}.'
+                         .format(path, list(index)))
+
+    if pred_cols is None:
+        pred_cols = [col for col in df.select_dtypes('number').columns
+                     if col not in JOIN_COLS]
+    pred_cols = [col for col in pred_cols if col in df.columns]
+
+    positions = index[key_col].get_indexer(df[key_col])
+    found = positions >= 0
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    models = {}
+    for col in pred_cols:
+        aligned = np.full(len(index[key_col]), np.nan)
+        aligned[positions[found]] = df.loc[found, col].to_numpy(dtype=float)
+        model = name if len(pred_cols) == 1 else '{}:{}'.format(name, col)
+        models[model] = aligned
+
+    return models, key_col
+
+
+def align_predictions(paths, index, pred_cols=None, workers=1):
+    """
+    Predictions of every model in every file, aligned to the ground truth
+    :list paths: paths to the prediction csvs
+    :dict index: identity column -> pd.Index, from build_index
+    :list pred_cols: prediction columns to read, every numeric column if None
+    :int workers: number of cores to devote, one file per job
+    :return: pd.DataFrame with a column per model and the join column of
+        each model
+    """
+
+    func = functools.partial(read_predictions, index=index,
+                             pred_cols=pred_cols)
+
+    if workers > 1:
+        with pool.Pool(workers) as p:
+            results = list(tqdm.tqdm(p.imap(func, paths), total=len(paths)))
+    else:
+        results = [func(path) for path in tqdm.tqdm(paths)]
+
+    preds, join_cols = {}, {}
+    for models, key_col in results:
+        preds.update(models)
+        join_cols.update({model: key_col for model in models})
+
+    return pd.DataFrame(preds), join_cols
+
+
+def worst_errors(x, preds, labels, k=10):
+    """
+    The k largest absolute log10 fold errors of every model
+    :float_vec x: true values
+    :pd.DataFrame preds: predicted values with one column per model
+    :pd.DataFrame labels: identity columns of each ground truth row
+    :int k: number of compounds to list per model
+    :return: tidy pd.DataFrame of model, identity columns, true and
+        predicted values and the fold error, worst first
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = preds.to_numpy(dtype=float).T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        errors = np.log10(y / x)
+    ranked = np.where(np.isnan(errors), -np.inf, np.abs(errors))
+
+    k = min(k, ranked.shape[1])
+    rows = np.argpartition(-ranked, k - 1, axis=-1)[:, :k]
+    rows = np.take_along_axis(
+        rows, np.argsort(-np.take_along_axis(ranked, rows, axis=-1),
+                         axis=-1, kind='stable'), axis=-1)
+
+    models = np.repeat(np.arange(len(y)), k)
+    rows = rows.ravel()
+    keep = np.isfinite(ranked[models, rows])
+    models, rows = models[keep], rows[keep]
+
+    worst = labels.iloc[rows].reset_index(drop=True)
+    worst.insert(0, 'model', preds.columns[models])
+    worst['true'] = x[rows]
+    worst['pred'] = y[models, rows]
+    worst['log10_fold_error'] = errors[models, rows]
+    worst['fold_error'] = 10 ** np.abs(errors[models, rows])
+
+    return worst
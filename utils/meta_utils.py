@@ -1,13 +1,24 @@
 import json
 import os
-import pandas as pd
 import time
 import questionary
+import requests
 
-from crossref.restful import Works
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib.parse import quote
 
-__version__ = 'v1.1.0 (07-01-2020)'
+from utils.profile_utils import profile_data
+
+__version__ = 'v1.2.0 (10-19-2026)'
+
+CROSSREF_URL = 'https://api.crossref.org/works/{}'
+DOI_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache',
+                             'opnbnch', 'crossref')
+
+# Crossref answers worth retrying: rate limiting and server errors
+TRANSIENT_STATUS = (429, 500, 502, 503, 504)
 
 
 def read_meta(path):
@@ -84,14 +95,134 @@ def scrape_article_meta(record, meta_name):
         print("Scraping metadata failed on", str(meta_name))
 
 
-def produce_article_meta(doi):
+def get_session(pool_size=10):
+    """
+    Build a requests session with a connection pool large enough
+    to be shared by pool_size concurrent workers.
+    :int pool_size: number of pooled connections per host
+    """
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
+
+
+def _doi_cache_path(doi, cache_dir):
+    """
+    Return the cache file for a DOI, one json file per DOI
+    :str doi: A DOI string
+    :str cache_dir: directory holding cached Crossref records
+    """
+
+    return os.path.join(cache_dir, quote(doi.lower(), safe='') + '.json')
+
+
+def get_doi_record(doi, session=None, cache_dir=DOI_CACHE_DIR,
+                   url=CROSSREF_URL, timeout=30, retries=3, backoff=0.5):
+    """
+    Return the Crossref record for a DOI, reading from the on-disk cache
+    when possible. Returns None if Crossref does not know the DOI or
+    rejects it (any 4xx other than rate limiting).
+    Dropped connections, timeouts, rate limiting and server errors are
+    retried with exponential backoff; the last failure is raised.
+    :str doi: A DOI string
+    :requests.Session session: session to reuse, a new one if None
+    :str cache_dir: directory holding cached records, None to disable
+    :str url: Crossref works endpoint with a {} for the DOI
+    :float timeout: seconds to wait for a response
+    :int retries: number of retries for a transient failure
+    :float backoff: initial backoff in seconds, doubled per retry
+    """
+
+    if cache_dir is not None:
+        cache_path = _doi_cache_path(doi, cache_dir)
+        if os.path.isfile(cache_path):
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+
+    session = session or get_session(pool_size=1)
+
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url.format(quote(doi, safe='/')),
+                                   timeout=timeout)
+            if response.status_code in TRANSIENT_STATUS:
+                response.raise_for_status()
+            break
+        except (requests.ConnectionError, requests.Timeout,
+                requests.HTTPError):
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+    if 400 <= response.status_code < 500:
+        return None
+    response.raise_for_status()
+    record = response.json()['message']
+
+    if cache_dir is not None:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'w') as outfile:
+            json.dump(record, outfile)
+        os.replace(tmp_path, cache_path)
+
+    return record
+
+
+def get_doi_records(dois, workers=8, cache_dir=DOI_CACHE_DIR,
+                    url=CROSSREF_URL, retries=3, backoff=0.5):
+    """
+    Fetch the Crossref records for many DOIs concurrently over one pooled
+    session. Each distinct DOI is looked up once. A DOI that still fails
+    after its retries is reported and left out, without failing the batch.
+    :list dois: DOI strings
+    :int workers: number of concurrent requests
+    :str cache_dir: directory holding cached records, None to disable
+    :str url: Crossref works endpoint with a {} for the DOI
+    :int retries: number of retries for a transient failure
+    :float backoff: initial backoff in seconds, doubled per retry
+    :return: dict of doi -> record (None if unknown to Crossref), without
+        the DOIs that could not be fetched
+    """
+
+    unique_dois = list(dict.fromkeys(dois))
+    session = get_session(pool_size=workers)
+    failed = {}
+
+    def fetch(doi):
+        try:
+            return get_doi_record(doi, session, cache_dir, url,
+                                  retries=retries, backoff=backoff)
+        except (requests.RequestException, ValueError, KeyError) as e:
+            failed[doi] = e
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        records = list(executor.map(fetch, unique_dois))
+
+    session.close()
+
+    for doi, error in failed.items():
+        print("Could not fetch the Crossref record for", doi, "after",
+              retries, "retries:", error)
+
+    return {doi: record for doi, record in zip(unique_dois, records)
+            if doi not in failed}
+
+
+def produce_article_meta(doi, record=None):
     """
     Ingest a doi link and produces a metadata dict.
     :str doi: The url for a DOI "Digital Object Signifier"
+    :dict record: Crossref record for the DOI if already fetched
     """
 
-    works = Works()  # Initialize crossref API
-    record = works.doi(doi)  # Grab record for our paper
+    if record is None:
+        record = get_doi_record(doi)  # Grab record for our paper
 
     # Scrape all relevant info and store in the meta_dict
     title = scrape_article_meta(record, 'title')
@@ -120,19 +251,19 @@ def produce_article_meta(doi):
 def produce_dataset_meta(data_path):
     """
     Ingest a datapth and column names and produces a metadata dict.
+    The csv is streamed once to build a column profile that later
+    interactive prompts read from instead of rescanning the data.
     :str data_path: path to a csv to ingest
-    :str smiles_col: col name for col containing SMILES strings
-    :str class_col: col name for col containing experimental property classes
-    :str value_col: col name for col containing experimental values
     """
 
-    df = pd.read_csv(data_path)
-    raw_rows = df.shape[0]
-    column_names = list(df.columns)
+    profile = profile_data(data_path)
+    raw_rows = profile['row_num']
+    column_names = list(profile['columns'].keys())
 
     meta_dict = {'data_path': data_path,
                  'data_row_num': raw_rows,
                  'data_columns': column_names,
+                 'data_profile': profile,
                  'smiles_col': None,
                  'value_col': None,
                  'class_col': None}
@@ -150,6 +281,15 @@ def ask_for_doi():
 
     doi = questionary.text(doi_prompt).ask()
 
+    return clean_doi(doi)
+
+
+def clean_doi(doi):
+    """
+    Strip a DOI url down to the DOI, or return None for 'none'
+    :str doi: A DOI string or url
+    """
+
     if 'doi.org/' in doi:
         doi = doi.split('doi.org/')[1]
     elif doi == 'none':
@@ -174,13 +314,13 @@ def get_doi():
 
 def check_doi_validity(doi):
     """
-    Check if a DOI is valid and accessible through CrossRef
+    Check if a DOI is valid and accessible through CrossRef.
+    The record is cached, so producing article meta afterwards
+    does not hit Crossref again.
     :str doi: A DOI string
     """
 
-    works = Works()
-
-    if works.doi(doi):
+    if get_doi_record(doi):
         return True
     else:
         return False
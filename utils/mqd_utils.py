@@ -1,7 +1,12 @@
 import questionary
 import numpy as np
+import pandas as pd
 
 from utils.units_utils import get_unit_map, df_units_to_vals
+from utils.profile_utils import profile_values, profile_value_counts
+
+# Relations told apart by the threshold sweep; anything else counts as '='
+SWEEP_RELATIONS = ['=', '<', '<=', '>', '>=']
 
 
 def get_mqd(df, smiles_col, col2):
@@ -53,15 +58,51 @@ def _transform_value(df, transform, value_col):
     :str transform: transformation to perform
     :str value_col: value column of df
     """
-    if transform == 'log transform':
-        df[value_col] = np.log10(df[value_col])
-
-    elif transform == 'pIC50 transform':
-        df[value_col] = -1 * np.log10(df[value_col])
+    if transform in ['log transform', 'pIC50 transform']:
+        values = df[value_col].to_numpy(dtype=float, copy=True)
+        np.log10(values, out=values)
+        if transform == 'pIC50 transform':
+            np.negative(values, out=values)
+        df[value_col] = values
 
     return df
 
 
+def _round_sig_figs(values, num_figs):
+    """
+    Round an array to num_figs significant figures, giving the same floats
+    as formatting with '%.<num_figs>g' and parsing back. NaN, inf and zero
+    are returned unchanged.
+    :np.array values: values to round
+    :int num_figs: number of sig figs to use
+    """
+
+    values = np.asarray(values, dtype=float)
+    rounded = values.copy()
+
+    nonzero = np.isfinite(values) & (values != 0)
+    x = values[nonzero]
+    decimals = num_figs - 1 - np.floor(np.log10(np.abs(x))).astype(int)
+
+    # Scale by exact powers of ten so the division below is exact too
+    exact = np.abs(decimals) <= 22
+    scale = 10.0 ** np.abs(np.where(exact, decimals, 0))
+    up = decimals >= 0
+    scaled = np.where(up, x * scale, x / scale)
+    digits = np.round(scaled)
+    result = np.where(up, digits / scale, digits * scale)
+
+    # Scaling can move values sitting on a rounding tie; format those
+    tie = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) < 1e-6
+    slow = np.flatnonzero(tie | ~exact)
+    fmt = '%.' + str(num_figs) + 'g'
+    result[slow] = [float(fmt % v) for v in x[slow]]
+
+    rounded[nonzero] = result
+
+    return rounded
+
+
 def _get_N_sig_figs(df, value_col, num_figs):
     """
     Returns a value_col cut to the proper number of sig_figs
@@ -69,21 +110,24 @@ def _get_N_sig_figs(df, value_col, num_figs):
     :str value_col: value column in df
     :int num_figs: number of sig figs to use
     """
-    N = '%.' + str(num_figs) + 'g'
 
-    cut = ['%s' % float(N % x) for x in df[value_col]]
-    return [float(x) for x in cut]
+    return _round_sig_figs(df[value_col].values, num_figs)
 
 
-def _relation_display(df, relation_col, as_perc=True):
+def _relation_display(df, relation_col, as_perc=True, profile=None):
     """
     Displays the most common relations from the relation column.
     :pd.DataFrame df: a pandas DF
     :str relation_col: relation column in df
     :bool as_perc: display as percentage instead of raw count
+    :dict profile: column profile of df, used instead of a scan if given
     """
-    value_counts = df[relation_col].value_counts()
-    length = len(set(df[relation_col]))
+    value_counts = profile_value_counts(profile, relation_col)
+    if value_counts is None:
+        value_counts = df[relation_col].value_counts()
+        length = len(set(df[relation_col]))
+    else:
+        length = len(profile_values(profile, relation_col) or value_counts)
     if as_perc:
         print('The {} most common relations by percentage (%):'.format(length))
         print(np.round(value_counts/df.shape[0]*100, 2))
@@ -102,13 +146,15 @@ def _top_relation_vals(df, relation_col, value_col, relations):
     print(ge_df[value_col].value_counts().head(10))
 
 
-def _get_relation_limits(df, relation_col, value_col, unique_relations):
+def _get_relation_limits(df, relation_col, value_col, unique_relations,
+                         profile=None):
     """
     Prompts user to split dataset based upon relations or to keep it as is.
     :pd.DataFrame df: a pandas DF
     :str relation_col: relation column in df
     :str value_col: value column in df
     :list unique_relations: list of relations in relation_col
+    :dict profile: column profile of df, used instead of a scan if given
     """
 
     upper_relations = ['>', '>=']
@@ -116,7 +162,7 @@ def _get_relation_limits(df, relation_col, value_col, unique_relations):
 
     info = "\nWe recommend limiting rx datasets to only the '=' relation."
     print(info)
-    _relation_display(df, relation_col)
+    _relation_display(df, relation_col, profile=profile)
 
     initial_prompt = 'Do you want to subset your data based upon relation?'
     to_change = questionary.confirm(initial_prompt).ask()
@@ -171,49 +217,174 @@ def tripartite(df, lower_limit, upper_limit, relation_col, value_col,
     :smiles_col: smiles column in df
     """
 
-    # Regrssion dataframe
-    regression_df = df.loc[lambda x:x[relation_col] == '='] \
-        .loc[::, [smiles_col, value_col, units_col]]
+    # Read the columns once and build every mask from the same arrays
+    values = df[value_col].values.astype(float)
+    relations = df[relation_col].values
+    greater = np.isin(relations, ['>', '>='])
+    less = np.isin(relations, ['<', '<='])
+
+    # Regression dataframe
+    regression = relations == '='
     if truncate_reg:
-        regression_df = regression_df \
-            .loc[lambda x:x[value_col].between(lower_limit/100.,
-                                               upper_limit * 10)]
+        regression &= (values >= lower_limit / 100.) & \
+            (values <= upper_limit * 10)
+    regression_cols = [col for col in [smiles_col, value_col, units_col]
+                       if col]  # Data without units has no units column
+    regression_df = df.loc[regression, regression_cols]
 
     # Upper Limit df
     if upper_limit:
-        upper_class_df = df.loc[lambda x: ~((x[value_col] < upper_limit) &
-                                (x[relation_col].isin(['>', '>='])))]
-        is_active = ((upper_class_df[value_col].values >= upper_limit) &
-                     (upper_class_df[relation_col] != '<'))
-        upper_class_df = upper_class_df.assign(
-            active=[int(a) for a in is_active])
-        upper_class_df = upper_class_df \
-            .loc[::, [smiles_col, 'active']]
+        upper = ~((values < upper_limit) & greater)
+        is_active = (values >= upper_limit) & (relations != '<')
+        upper_class_df = df.loc[upper, [smiles_col]] \
+            .assign(active=is_active[upper].astype(int))
     else:
         upper_class_df = None
 
     # Lower class df
     if lower_limit:
-        lower_class_df = df.loc[lambda x: ~((x[value_col] > lower_limit) &
-                                (x[relation_col].isin(['<', '<='])))]
-        is_active = ((lower_class_df[value_col].values <= lower_limit) &
-                     (lower_class_df[relation_col] != '>'))
-        lower_class_df = lower_class_df.assign(
-            active=[int(a) for a in is_active])
-        lower_class_df = lower_class_df \
-            .loc[::, [smiles_col, 'active']]
+        lower = ~((values > lower_limit) & less)
+        is_active = (values <= lower_limit) & (relations != '>')
+        lower_class_df = df.loc[lower, [smiles_col]] \
+            .assign(active=is_active[lower].astype(int))
     else:
         lower_class_df = None
 
     return regression_df, upper_class_df, lower_class_df
 
 
-def fix_value_col(df, units_col, value_col):
+def _sweep_codes(relations):
+    """
+    Code relations by their position in SWEEP_RELATIONS, others as '='
+    :np.array relations: relation of each row
+    """
+
+    codes = np.zeros(len(relations), dtype=np.int8)
+    for code, relation in enumerate(SWEEP_RELATIONS[1:], start=1):
+        codes[relations == relation] = code
+
+    return codes
+
+
+def _sweep_stats(cum, n_valid, n_rows, cutoffs, positions, direction):
+    """
+    Class balance of every cutoff from cumulative relation counts
+    :np.array cum: cumulative count of each relation along the sorted values
+    :int n_valid: number of non-NaN values
+    :int n_rows: number of rows
+    :np.array cutoffs: sorted cutoffs
+    :np.array positions: number of sorted values on the low side of each
+        cutoff ('<' for upper, '<=' for lower cutoffs)
+    :str direction: 'upper' or 'lower'
+    """
+
+    eq, lt, le, gt, ge = range(len(SWEEP_RELATIONS))
+    low = cum[positions]  # Per cutoff and relation, values on the low side
+    high = cum[n_valid] - low
+
+    if direction == 'upper':
+        # Censored '>' values below the cutoff cannot be labeled
+        dropped = low[:, gt] + low[:, ge]
+        active = high[:, [eq, le, gt, ge]].sum(axis=1)
+    else:
+        dropped = high[:, lt] + high[:, le]
+        active = low[:, [eq, lt, le, ge]].sum(axis=1)
+
+    kept = n_rows - dropped
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        active_fraction = active / kept
+
+    return pd.DataFrame({'direction': direction,
+                         'cutoff': cutoffs,
+                         'n_kept': kept,
+                         'n_active': active,
+                         'n_inactive': kept - active,
+                         'n_dropped': dropped,
+                         'active_fraction': active_fraction})
+
+
+def threshold_sweep(df, relation_col, value_col, smiles_col,
+                    upper_cutoffs=(), lower_cutoffs=()):
+    """
+    Label the data against many upper and lower limits at once, with the
+    same censoring rules as tripartite. The values are sorted once and the
+    class balance of every cutoff comes from cumulative relation counts.
+    Labels are an int8 matrix keyed by SMILES, one column per cutoff:
+    1 active, 0 inactive, -1 censored value that cannot be labeled.
+    :pd.DataFrame df: a pandas DF
+    :str relation_col: relation column in df
+    :str value_col: value column in df
+    :str smiles_col: smiles column in df
+    :list upper_cutoffs: upper limits to label against
+    :list lower_cutoffs: lower limits to label against
+    :return: upper labels, lower labels (None if no cutoffs) and stats df
+    """
+
+    eq, lt, le, gt, ge = range(len(SWEEP_RELATIONS))
+    values = df[value_col].to_numpy(dtype=float)
+    codes = _sweep_codes(df[relation_col].values)
+    n_rows = len(values)
+
+    # One sort, then cumulative counts of each relation along it
+    order = np.argsort(values, kind='stable')
+    sorted_values = values[order]
+    n_valid = int((~np.isnan(values)).sum())
+    onehot = np.zeros((n_rows + 1, len(SWEEP_RELATIONS)), dtype=np.int64)
+    onehot[np.arange(1, n_rows + 1), codes[order]] = 1
+    cum = onehot.cumsum(axis=0)
+
+    valid = ~np.isnan(values)
+    labels, stats = {}, []
+
+    for direction, cutoffs in [('upper', upper_cutoffs),
+                               ('lower', lower_cutoffs)]:
+        if len(cutoffs) == 0:
+            labels[direction] = None
+            continue
+
+        cutoffs = np.sort(np.asarray(cutoffs, dtype=float))
+        columns = np.arange(len(cutoffs))
+
+        if direction == 'upper':
+            positions = np.searchsorted(sorted_values[:n_valid], cutoffs,
+                                        'left')
+            # Each value is >= the first n_passed of the sorted cutoffs
+            n_passed = np.searchsorted(cutoffs, values, 'right')
+            side = (columns < n_passed[:, None]) & valid[:, None]
+            censored = np.isin(codes, [gt, ge])
+            active = side & (codes != lt)[:, None]
+        else:
+            positions = np.searchsorted(sorted_values[:n_valid], cutoffs,
+                                        'right')
+            # Each value is <= all but the first n_passed sorted cutoffs
+            n_passed = np.searchsorted(cutoffs, values, 'left')
+            side = (columns >= n_passed[:, None]) & valid[:, None]
+            censored = np.isin(codes, [lt, le])
+            active = side & (codes != gt)[:, None]
+
+        matrix = active.astype(np.int8)
+        matrix[~side & valid[:, None] & censored[:, None]] = -1
+
+        names = ['{}_{:g}'.format(direction, c) for c in cutoffs]
+        labels[direction] = pd.concat(
+            [df[[smiles_col]].reset_index(drop=True),
+             pd.DataFrame(matrix, columns=names)], axis=1)
+
+        stats.append(_sweep_stats(cum, n_valid, n_rows, cutoffs, positions,
+                                  direction))
+
+    return labels['upper'], labels['lower'], pd.concat(stats,
+                                                       ignore_index=True)
+
+
+def fix_value_col(df, units_col, value_col, profile=None):
     """
     Optionally transform and handle a relation column in the df
     :pd.DataFrame df: a pandas DF
     :str units_col: units column in df
     :str value_col: value column in df
+    :dict profile: column profile of df, used instead of a scan if given
     """
 
     transform = _get_value_transform()
@@ -221,7 +392,8 @@ def fix_value_col(df, units_col, value_col):
     if transform:
         if transform == 'pIC50 transform':
             print('All units must be of type M.')
-            unit_map, std_unit = get_unit_map(df, units_col, forced_unit='M')
+            unit_map, std_unit = get_unit_map(df, units_col, forced_unit='M',
+                                              profile=profile)
             df = df_units_to_vals(df, units_col, value_col, unit_map)
         df = _transform_value(df, transform, value_col)
 
@@ -230,19 +402,23 @@ def fix_value_col(df, units_col, value_col):
     return df, transform
 
 
-def fix_relation_col(df, relation_col, value_col):
+def fix_relation_col(df, relation_col, value_col, profile=None):
     """
     Optionally fixes the relation column by splitting into multiple groups
     defined by upper and lower limits.
     :pd.DataFrame df: a pandas DF
     :str relation_col: relation column in df
     :str value_col: value column in df
+    :dict profile: column profile of df, used instead of a scan if given
     """
 
-    unique_relations = list(set(df[relation_col]))
+    unique_relations = profile_values(profile, relation_col)
+    if unique_relations is None:
+        unique_relations = list(set(df[relation_col]))
 
     # Nothing to change if all relations are '='
     if len(unique_relations) == 1 and unique_relations[0] == '=':
         return None, None
 
-    return _get_relation_limits(df, relation_col, value_col, unique_relations)
+    return _get_relation_limits(df, relation_col, value_col, unique_relations,
+                                profile)
@@ -0,0 +1,483 @@
+import bisect
+import functools
+import math
+import numpy as np
+import tqdm
+
+from multiprocessing import pool
+
+__version__ = 'v1.0.0 (10-19-2026)'
+
+# Largest number of simulated values held in memory at once (32 MB)
+MAX_ELEMENTS = 2 ** 22
+
+
+def n_to_perc_thresh(n):
+    """
+    Convert n to a percentile threshold for whole number n
+    :int n: Number of 9's of confidence
+    """
+
+    if n == 0:
+        perc_thresh = 50
+    else:
+        perc_thresh = 10**(2-n)
+
+    return perc_thresh
+
+
+def pearson_trials(corr, lib_size, trials, rng):
+    """
+    Draw experimental and predicted values for many trials at once, with
+    the given pearson correlation. Draws from rng in the same order as one
+    generate_pearson_data call per trial would (see notebooks/n_9s.ipynb).
+    :float corr: The pearson correlation coefficient of the data to sample
+    :int lib_size: number of samples in each trial
+    :int trials: number of trials to draw
+    :np.random.RandomState rng: random state to draw from
+    :return: (trials x lib_size) arrays of experimental and predicted values
+    """
+
+    uncorrelated = rng.standard_normal((trials, 2, lib_size))
+    ex_vals = uncorrelated[:, 0]
+
+    # Second row of the cholesky factor of [[1, corr], [corr, 1]]
+    pred_vals = corr * ex_vals
+    pred_vals += np.sqrt(1 - corr ** 2) * uncorrelated[:, 1]
+
+    return ex_vals, pred_vals
+
+
+def capture_depths(ex_vals, pred_vals, ex_capture):
+    """
+    For every trial (row), the number of top predicted values needed to
+    capture the top ex_capture experimental values. Top means lowest, as
+    in the notebook. This is the largest predicted rank among the top
+    experimental values, found by counting instead of ranking.
+    :np.array ex_vals: (trials x lib_size) experimental values
+    :np.array pred_vals: (trials x lib_size) predicted values
+    :int ex_capture: Number of top experimental values to capture
+    """
+
+    lib_size = ex_vals.shape[1]
+    k = min(ex_capture, lib_size)
+
+    if k == 1:
+        top_ex = np.argmin(ex_vals, axis=1)[:, None]
+    else:
+        top_ex = np.argpartition(ex_vals, k - 1, axis=1)[:, :k]
+
+    worst_pred = np.take_along_axis(pred_vals, top_ex, axis=1).max(axis=1)
+
+    return np.count_nonzero(pred_vals <= worst_pred[:, None], axis=1)
+
+
+def simulate_captures(ex_captures, lib_size, r2, trials=10000, seed=1,
+                      max_elements=MAX_ELEMENTS):
+    """
+    Simulate trials of a library and a model with a known R^2, in chunks
+    of trials small enough to keep max_elements values in memory. Every
+    capture count is measured on the same simulated trials.
+    :list ex_captures: Numbers of top experimental values to capture
+    :int lib_size: Size of the compound list or library
+    :num r2: The R^2 of the model in question
+    :int trials: Number of trials to run
+    :int seed: seed of the random state, None for inconsistent results
+    :int max_elements: number of simulated values held in memory at once
+    :return: (len(ex_captures) x trials) np.array of capture depths
+    """
+
+    corr = np.sqrt(r2)
+    rng = np.random.RandomState(seed)
+    chunk = max(1, max_elements // (2 * lib_size))
+
+    depths = np.empty((len(ex_captures), trials), dtype=np.int64)
+    for start in range(0, trials, chunk):
+        stop = min(start + chunk, trials)
+        ex_vals, pred_vals = pearson_trials(corr, lib_size, stop - start,
+                                            rng)
+        for i, ex_capture in enumerate(ex_captures):
+            depths[i, start:stop] = capture_depths(ex_vals, pred_vals,
+                                                   ex_capture)
+
+    return depths
+
+
+def simulate_capture(ex_capture, lib_size, r2, trials=10000, seed=1,
+                     max_elements=MAX_ELEMENTS):
+    """
+    Simulate trials of a library and a model with a known R^2
+    :int ex_capture: Number of top experimental values to capture
+    :int lib_size: Size of the compound list or library
+    :num r2: The R^2 of the model in question
+    :int trials: Number of trials to run
+    :int seed: seed of the random state, None for inconsistent results
+    :int max_elements: number of simulated values held in memory at once
+    :return: np.array of the capture depth of every trial
+    """
+
+    return simulate_captures([ex_capture], lib_size, r2, trials, seed,
+                             max_elements)[0]
+
+
+def n_9s_savings(depths, lib_size, n=3, percent=True):
+    """
+    Number of compounds that can be discarded with n 9s confidence,
+    given the simulated capture depths
+    :np.array depths: capture depth of every trial
+    :int lib_size: Size of the compound list or library
+    :int n: Number of 9's of confidence
+    :bool percent: if True, return savings as a percentage of lib_size
+    """
+
+    savings = lib_size - np.asarray(depths)
+    n_9s = np.round(np.percentile(savings, n_to_perc_thresh(n)))
+
+    if percent:
+        return np.round(n_9s * 100. / lib_size, 2)
+    else:
+        return n_9s
+
+
+def n_9s_error(depths, lib_size, n=3, z=1.96):
+    """
+    Monte Carlo error of n_9s_savings: half the width of the confidence
+    interval of the estimated percentile, taken between the order
+    statistics z binomial standard deviations either side of it
+    :np.array depths: capture depth of every trial
+    :int lib_size: Size of the compound list or library
+    :int n: Number of 9's of confidence
+    :float z: normal quantile of the interval, 1.96 for 95%
+    :return: error in percent of lib_size
+    """
+
+    savings = np.sort(lib_size - np.asarray(depths))
+    trials = len(savings)
+    p = n_to_perc_thresh(n) / 100.
+
+    spread = z * np.sqrt(trials * p * (1 - p))
+    low = int(np.clip(np.floor(trials * p - spread), 0, trials - 1))
+    high = int(np.clip(np.ceil(trials * p + spread), 0, trials - 1))
+
+    return (savings[high] - savings[low]) * 50. / lib_size
+
+
+def n_9s_performance(ex_capture, lib_size, r2, trials=10000, n=3,
+                     percent=True, verbose=True, seed=1):
+    """
+    Given a library and a desire to capture the top experimental values using
+    a model with a known R^2 ... how many compounds can we discard with n 9s
+    confidence?
+    :int ex_capture: Number of top experimental values to capture
+    :int lib_size: Size of the compound list or library
+    :num r2: The R^2 of the model in question
+    :int trials: Number of trials to run - default 10k
+    :int n: Number of 9's of confidence - default 3 9s, i.e. 99.9%
+    :bool percent: if True, return results as a percentage
+    :bool verbose: if True, print a verbose description of results
+    :int seed: seed of the random state, None for inconsistent results
+    """
+
+    depths = simulate_capture(ex_capture, lib_size, r2, trials, seed)
+    savings = n_9s_savings(depths, lib_size, n, percent=False)
+
+    if verbose:
+        perc_thresh = n_to_perc_thresh(n)
+        print('Simulating {} trials assuming a model with an R²={},'
+              .format(trials, r2),
+              'it is safe in {}% of simulated cases to assay only the\n'
+              'top {} predicted compounds'
+              .format((100 - perc_thresh), int(lib_size - savings)),
+              "out of a library of {}. This amounts to a \"{} 9's\" savings"
+              " of {}%.".format(lib_size, n,
+                                np.round(savings * 100. / lib_size, 2)))
+
+    if percent:
+        return np.round(savings * 100. / lib_size, 2)
+    else:
+        return savings
+
+
+def n_9s_keep(lib_size, r2, ex_capture, n=3, surface=None, trials=10000,
+              max_lib_size=10000, seed=1):
+    """
+    How many of the top predicted compounds of a library to keep so the
+    top ex_capture experimental values are among them with n 9s
+    confidence. Savings only grow with library size, so libraries larger
+    than the surface grid (or max_lib_size, when simulating) get the
+    fraction of the largest size, which keeps more than needed. Libraries
+    smaller than the surface grid are cheap to simulate and simulated.
+    :int lib_size: Size of the compound list or library
+    :num r2: The R^2 of the model in question
+    :int ex_capture: Number of top experimental values to capture
+    :int n: Number of 9's of confidence
+    :N9sSurface surface: precomputed surface to query, simulate if None
+    :int trials: Number of trials to run when simulating
+    :int max_lib_size: largest library size to simulate
+    :int seed: seed of the random state when simulating
+    :return: dict of the number to keep, % savings, Monte Carlo error and
+        the library size the savings were taken at
+    """
+
+    if surface is not None and lib_size >= surface.lib_size[0]:
+        model_size = min(lib_size, surface.lib_size[-1])
+        savings, error = surface.query(r2, model_size, ex_capture, n)
+        source = 'surface'
+    else:
+        model_size = min(lib_size, max_lib_size)
+        depths = simulate_capture(ex_capture, model_size, r2, trials, seed)
+        savings = float(n_9s_savings(depths, model_size, n))
+        error = float(n_9s_error(depths, model_size, n))
+        source = 'simulation'
+
+    keep = int(np.ceil(lib_size * (100. - savings) / 100.))
+
+    return {'keep': min(max(keep, min(ex_capture, lib_size)), lib_size),
+            'savings': savings,
+            'error': error,
+            'model_lib_size': int(model_size),
+            'source': source}
+
+
+def _point_savings(point, trials=10000, n=3, percent=True):
+    """
+    Private function for multiprocessing in savings_sweep
+    :tuple point: (ex_capture, lib_size, r2) to simulate
+    """
+
+    ex_capture, lib_size, r2 = point
+
+    return n_9s_performance(ex_capture, lib_size, r2, trials, n, percent,
+                            verbose=False)
+
+
+def savings_sweep(points, trials=10000, n=3, percent=True, workers=1):
+    """
+    Simulate n 9s savings at every point of a sweep, on a process pool
+    if workers > 1. Each point is seeded alike, so results do not depend
+    on workers.
+    :list points: (ex_capture, lib_size, r2) tuples to simulate
+    :int trials: Number of trials to run at each point
+    :int n: Number of 9's of confidence
+    :bool percent: if True, return savings as percentages
+    :int workers: number of cores to devote to job
+    """
+
+    func = functools.partial(_point_savings, trials=trials, n=n,
+                             percent=percent)
+
+    if workers > 1:
+        with pool.Pool(workers) as p:
+            savings = list(tqdm.tqdm(p.imap(func, points), total=len(points)))
+    else:
+        savings = [func(point) for point in tqdm.tqdm(points)]
+
+    return savings
+
+
+def chart_performance_vs_savings(ex_capture, lib_size, n=3, points=25,
+                                 trials=10000, workers=1):
+    """
+    Simulate n9s savings across a range of model performances, designated by r2
+    :int ex_capture: The number of top experimental values to capture
+    :int lib_size: The size of the list of compounds
+    :int n: Number of n's confidence to track
+    :int points: Number of points to break up the [0,.99] R^2 spectrum into
+    :int trials: Number of trials to run at each point
+    :int workers: number of cores to devote to job
+    """
+
+    r2_range = list(np.linspace(0, .99, points))
+    sweep = [(ex_capture, lib_size, r2) for r2 in r2_range]
+
+    return r2_range, savings_sweep(sweep, trials, n, workers=workers)
+
+
+def chart_libsize_vs_savings(ex_capture, r2, n=3, points=25, trials=10000,
+                             workers=1):
+    """
+    Simulate n 9s savings across a range of library sizes from 1 to 10,000.
+    :int ex_capture: The number of experimental values to capture
+    :num r2: The R^2 performance of the model of interest
+    :int n: The number of 9's to model performance for
+    :int points: The number of points to supply to the plot
+    :int trials: Number of trials to run at each point
+    :int workers: number of cores to devote to job
+    """
+
+    log_range = [int(x) for x in list(np.logspace(0, 4, points))]
+    sweep = [(ex_capture, lib, r2) for lib in log_range]
+
+    return log_range, savings_sweep(sweep, trials, n, workers=workers)
+
+
+def capture_vs_savings(lib_size, r2, n=3, points=25, trials=10000,
+                       workers=1):
+    """
+    Simulate n 9s savings across a range of experimental capture preferences
+    :int lib_size: The number of compounds in your library
+    :num r2: The R^2 performance of the model of interest
+    :int n: The number of 9's to model performance for
+    :int points: The number of points to supply to the plot
+    :int trials: Number of trials to run at each point
+    :int workers: number of cores to devote to job
+    """
+
+    capture_n = [int(x) for x in list(np.linspace(1, 500, points))]
+    sweep = [(capture, lib_size, r2) for capture in capture_n]
+
+    return capture_n, savings_sweep(sweep, trials, n, workers=workers)
+
+
+def _surface_point(point, ex_captures, ns, trials, seed):
+    """
+    Private function for multiprocessing in build_surface
+    :tuple point: (r2, lib_size) to simulate
+    :return: (len(ex_captures) x len(ns)) arrays of savings and errors
+    """
+
+    r2, lib_size = point
+    depths = simulate_captures(ex_captures, lib_size, r2, trials, seed)
+
+    savings = [[n_9s_savings(d, lib_size, n) for n in ns] for d in depths]
+    errors = [[n_9s_error(d, lib_size, n) for n in ns] for d in depths]
+
+    return np.array(savings), np.array(errors)
+
+
+def build_surface(r2s, lib_sizes, ex_captures, ns=(1, 2, 3), trials=10000,
+                  seed=1, workers=1):
+    """
+    Precompute n 9s % savings over a grid of model performance, library
+    size, capture count and confidence
+    :list r2s: increasing R^2 values
+    :list lib_sizes: increasing library sizes
+    :list ex_captures: numbers of top experimental values to capture
+    :list ns: numbers of 9's of confidence
+    :int trials: Number of trials to run at each grid point
+    :int seed: seed of the random state at each grid point
+    :int workers: number of cores to devote to job
+    :return: dict of arrays, as written by save_surface
+    """
+
+    points = [(r2, lib_size) for r2 in r2s for lib_size in lib_sizes]
+    func = functools.partial(_surface_point, ex_captures=list(ex_captures),
+                             ns=list(ns), trials=trials, seed=seed)
+
+    if workers > 1:
+        with pool.Pool(workers) as p:
+            results = list(tqdm.tqdm(p.imap(func, points), total=len(points)))
+    else:
+        results = [func(point) for point in tqdm.tqdm(points)]
+
+    shape = (len(r2s), len(lib_sizes), len(ex_captures), len(ns))
+
+    return {'savings': np.array([r[0] for r in results]).reshape(shape),
+            'error': np.array([r[1] for r in results]).reshape(shape),
+            'r2': np.asarray(r2s, dtype=float),
+            'lib_size': np.asarray(lib_sizes, dtype=np.int64),
+            'ex_capture': np.asarray(ex_captures, dtype=np.int64),
+            'n': np.asarray(ns, dtype=np.int64),
+            'trials': np.int64(trials),
+            'seed': np.int64(seed),
+            'version': np.str_(__version__)}
+
+
+def save_surface(path, surface):
+    """
+    Write a surface from build_surface to a compressed .npz file
+    :str path: path of the .npz file
+    :dict surface: arrays of the surface and its simulation parameters
+    """
+
+    np.savez_compressed(path, **surface)
+
+    return path
+
+
+class N9sSurface:
+    """
+    Answers n 9s savings queries from a precomputed surface, interpolating
+    linearly in R^2 and log library size between grid points. Capture
+    counts and numbers of 9's must be on the grid.
+    """
+
+    def __init__(self, surface):
+        """
+        :dict surface: arrays of the surface, from build_surface
+        """
+
+        self.savings = np.asarray(surface['savings'])
+        self.error = np.asarray(surface['error'])
+        self.r2 = [float(x) for x in surface['r2']]
+        self.lib_size = [int(x) for x in surface['lib_size']]
+        self.log_lib = [math.log10(x) for x in self.lib_size]
+        self.ex_capture = [int(x) for x in surface['ex_capture']]
+        self.n = [int(x) for x in surface['n']]
+        self.trials = int(surface['trials'])
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a surface written by save_surface
+        :str path: path of the .npz file
+        """
+
+        with np.load(path) as surface:
+            return cls(dict(surface))
+
+    @staticmethod
+    def _bracket(grid, value, name):
+        """
+        Indices of the grid points either side of value and the weight of
+        the upper one, for linear interpolation
+        """
+
+        if not grid[0] <= value <= grid[-1]:
+            raise ValueError('{} {} is outside the surface grid [{}, {}].'
+                             .format(name, value, grid[0], grid[-1]))
+        if len(grid) == 1:
+            return 0, 0, 0.
+
+        i = min(bisect.bisect_right(grid, value) - 1, len(grid) - 2)
+
+        return i, i + 1, (value - grid[i]) / (grid[i + 1] - grid[i])
+
+    def check(self, r2, ex_capture=1, n=3):
+        """
+        Raise a ValueError if the surface cannot answer queries for a model
+        of this R^2, capture count and number of 9's
+        :num r2: The R^2 of the model in question
+        :int ex_capture: Number of top experimental values to capture
+        :int n: Number of 9's of confidence
+        """
+
+        if ex_capture not in self.ex_capture or n not in self.n:
+            raise ValueError('ex_capture must be one of {} and n one of {}.'
+                             .format(self.ex_capture, self.n))
+        self._bracket(self.r2, r2, 'R^2')
+
+    def query(self, r2, lib_size, ex_capture=1, n=3):
+        """
+        Interpolated n 9s % savings and its Monte Carlo error
+        :num r2: The R^2 of the model in question
+        :int lib_size: Size of the compound list or library
+        :int ex_capture: Number of top experimental values to capture
+        :int n: Number of 9's of confidence
+        :return: (savings, error), both in percent of lib_size
+        """
+
+        self.check(r2, ex_capture, n)
+
+        i0, i1, wi = self._bracket(self.r2, r2, 'R^2')
+        j0, j1, wj = self._bracket(self.log_lib, math.log10(lib_size),
+                                   'log10 library size')
+        c, k = self.ex_capture.index(ex_capture), self.n.index(n)
+
+        result = []
+        for values in [self.savings, self.error]:
+            low = (1 - wj) * values[i0, j0, c, k] + wj * values[i0, j1, c, k]
+            high = (1 - wj) * values[i1, j0, c, k] + wj * values[i1, j1, c, k]
+            result.append(float((1 - wi) * low + wi * high))
+
+        return tuple(result)
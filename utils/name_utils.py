@@ -0,0 +1,314 @@
+import asyncio
+import json
+import os
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote
+from urllib.request import urlopen
+
+__version__ = 'v1.0.0 (10-19-2026)'
+
+CACTUS_URL = 'https://cactus.nci.nih.gov/chemical/structure/{}/smiles'
+
+
+class TransientLookupError(Exception):
+    """
+    Raised by a backend when a lookup failed for a reason worth retrying
+    (timeouts, dropped connections, rate limiting, server errors).
+    """
+
+
+def normalize_name(name):
+    """
+    Normalize a compound name for cache and synonym lookups
+    :str name: compound name as found in the data
+    """
+
+    return ' '.join(str(name).split()).lower()
+
+
+class SynonymBackend:
+    """
+    Resolve names from a local synonym table, a csv holding
+    one name and one SMILES column.
+    """
+
+    remote = False
+
+    def __init__(self, table_path, name_col='name', smiles_col='smiles'):
+        """
+        :str table_path: path to the synonym csv
+        :str name_col: column holding compound names
+        :str smiles_col: column holding SMILES strings
+        """
+
+        table = pd.read_csv(table_path).dropna(subset=[name_col, smiles_col])
+        self.table = {normalize_name(n): str(s) for n, s
+                      in zip(table[name_col], table[smiles_col])}
+
+    def lookup(self, name):
+        """
+        Return the SMILES for name, or None if it is not in the table
+        :str name: compound name
+        """
+
+        return self.table.get(normalize_name(name))
+
+
+class CactusBackend:
+    """
+    Resolve names through the NCI CACTUS chemical identifier resolver,
+    or any service answering GET requests in the same format.
+    """
+
+    remote = True
+
+    def __init__(self, url=CACTUS_URL, timeout=10):
+        """
+        :str url: url template with a single {} for the quoted name
+        :float timeout: seconds to wait for a single response
+        """
+
+        self.url = url
+        self.timeout = timeout
+
+    def lookup(self, name):
+        """
+        Return the SMILES for name, or None if the service does not know it.
+        Raises TransientLookupError for failures that may succeed on retry.
+        :str name: compound name
+        """
+
+        url = self.url.format(quote(str(name).strip()))
+
+        try:
+            with urlopen(url, timeout=self.timeout) as response:
+                answer = response.read().decode('utf8').strip()
+        except HTTPError as e:
+            if e.code == 404:
+                return None
+            if e.code == 429 or e.code >= 500:
+                raise TransientLookupError('HTTP {}'.format(e.code))
+            return None
+        except (URLError, TimeoutError, ConnectionError) as e:
+            raise TransientLookupError(str(e))
+
+        # Some names resolve to several structures, keep the first one
+        return answer.splitlines()[0] if answer else None
+
+
+def default_backends(synonym_path=None):
+    """
+    Local synonym table first (if given), then the remote CACTUS service
+    :str synonym_path: optional path to a synonym csv
+    """
+
+    backends = []
+    if synonym_path:
+        backends.append(SynonymBackend(synonym_path))
+    backends.append(CactusBackend())
+
+    return backends
+
+
+def read_name_cache(cache_path):
+    """
+    Read the on-disk name cache, a json of normalized name -> SMILES.
+    Names the remote service does not know are cached as null.
+    :str cache_path: path to the json cache
+    """
+
+    if cache_path is None or not os.path.isfile(cache_path):
+        return {}
+
+    with open(cache_path, 'r') as f:
+        return json.load(f)
+
+
+def write_name_cache(cache_path, cache):
+    """
+    Write the name cache atomically so an interrupted run keeps the old one
+    :str cache_path: path to the json cache
+    :dict cache: normalized name -> SMILES (or None)
+    """
+
+    cache_dir = os.path.dirname(cache_path)
+    if cache_dir and not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w') as outfile:
+        json.dump(cache, outfile, indent=1, sort_keys=True)
+    os.replace(tmp_path, cache_path)
+
+
+async def _lookup_with_retry(backend, name, semaphore, executor,
+                             retries, backoff):
+    """
+    Run one blocking backend lookup in the executor, retrying transient
+    failures with exponential backoff. Returns (found, smiles) where found
+    is False if every attempt failed.
+    """
+
+    loop = asyncio.get_running_loop()
+
+    async with semaphore:
+        for attempt in range(retries + 1):
+            try:
+                smiles = await loop.run_in_executor(executor,
+                                                    backend.lookup, name)
+                return True, smiles
+            except TransientLookupError:
+                if attempt < retries:
+                    await asyncio.sleep(backoff * 2 ** attempt)
+
+    return False, None
+
+
+async def _lookup_remote(backend, names, concurrency, retries, backoff):
+    """
+    Look up many names on one remote backend with bounded concurrency
+    """
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        tasks = [_lookup_with_retry(backend, name, semaphore, executor,
+                                    retries, backoff) for name in names]
+        results = await asyncio.gather(*tasks)
+
+    return dict(zip(names, results))
+
+
+def _run(coro):
+    """
+    Run a coroutine to completion, also from inside a running event loop
+    (e.g. a jupyter notebook) by handing it to a separate thread.
+    """
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def resolve_names(names, backends=None, cache_path=None, concurrency=8,
+                  retries=3, backoff=0.5):
+    """
+    Resolve compound names to SMILES. Local backends are asked first, then
+    the cache, then remote backends in order. Remote answers (including
+    definitive misses) are written back to the cache; names that failed
+    on every retry are left out of the cache so a later run tries again.
+    :list names: compound names to resolve
+    :list backends: backend objects with a lookup(name) method
+    :str cache_path: path to a json cache, or None for no caching
+    :int concurrency: maximum number of requests in flight per backend
+    :int retries: number of retries for a transient failure
+    :float backoff: initial backoff in seconds, doubled per retry
+    :return: dict of name -> SMILES, or None if unresolved
+    """
+
+    if backends is None:
+        backends = default_backends()
+
+    cache = read_name_cache(cache_path)
+    resolved = {}
+    pending = []
+
+    for name in dict.fromkeys(names):
+        if pd.isna(name):
+            resolved[name] = None
+            continue
+
+        smiles = None
+        for backend in backends:
+            if not backend.remote:
+                smiles = backend.lookup(name)
+                if smiles:
+                    break
+
+        if smiles:
+            resolved[name] = smiles
+        elif normalize_name(name) in cache:
+            resolved[name] = cache[normalize_name(name)]
+        else:
+            pending.append(name)
+
+    failed = set()
+    remote_backends = [b for b in backends if b.remote]
+
+    for i, backend in enumerate(remote_backends):
+        if not pending:
+            break
+
+        results = _run(_lookup_remote(backend, pending, concurrency,
+                                      retries, backoff))
+        still_pending = []
+        for name in pending:
+            found, smiles = results[name]
+            if smiles:
+                resolved[name] = smiles
+                cache[normalize_name(name)] = smiles
+            elif found and i == len(remote_backends) - 1 \
+                    and name not in failed:
+                resolved[name] = None
+                cache[normalize_name(name)] = None
+            else:
+                if not found:
+                    failed.add(name)
+                still_pending.append(name)
+        pending = still_pending
+
+    for name in pending:
+        resolved[name] = None
+
+    if cache_path is not None:
+        write_name_cache(cache_path, cache)
+
+    if failed:
+        print('Lookups failed after {} retries for {} name(s); they were'
+              ' not cached and will be retried next run.'
+              .format(retries, len(failed)))
+
+    return resolved
+
+
+def df_add_smiles_from_names(df, name_col, smiles_col='SMILES',
+                             backends=None, cache_path=None, **kwargs):
+    """
+    df_add_smiles_from_names adds a SMILES column resolved from a name column.
+    Each distinct name is resolved once; unresolved names are set to None
+    and reported rather than given a placeholder string.
+    :pd.DataFrame df: df of interest
+    :str name_col: name of the column holding compound names
+    :str smiles_col: name of the SMILES column to add
+    :list backends: backend objects with a lookup(name) method
+    :str cache_path: path to a json cache, or None for no caching
+    """
+
+    names = df[name_col].tolist()
+    resolved = resolve_names(names, backends, cache_path, **kwargs)
+
+    df[smiles_col] = [resolved.get(name) for name in names]
+
+    unresolved = get_unresolved_names(resolved)
+    if unresolved:
+        print('Could not resolve {} of {} names:'
+              .format(len(unresolved), len(resolved)), unresolved)
+
+    return df
+
+
+def get_unresolved_names(resolved):
+    """
+    Return the names that could not be resolved
+    :dict resolved: output of resolve_names
+    """
+
+    return [name for name, smiles in resolved.items()
+            if smiles is None and not pd.isna(name)]
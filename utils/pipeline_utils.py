@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+
+__version__ = 'v1.0.0 (10-19-2026)'
+
+STAGES = ['standardize', 'resolve', 'mqd']
+
+# Metadata key of the artifact each stage persists, used to resume
+STAGE_ARTIFACTS = {'standardize': 'std_data_path',
+                   'resolve': 'resolved_data_path',
+                   'mqd': 'mqd_data_path'}
+
+
+class BackgroundWriter:
+    """
+    Writes pipeline artifacts on a single background thread so the next
+    stage can start computing right away. Jobs run in submission order,
+    so a metadata update queued after an artifact only lands once that
+    artifact is on disk.
+    """
+
+    def __init__(self):
+
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.futures = []
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue a job on the writer thread
+        :fn fn: function to run
+        """
+
+        future = self.executor.submit(fn, *args, **kwargs)
+        self.futures.append(future)
+
+        return future
+
+    def write_csv(self, df, fullpath):
+        """
+        Queue a csv write. df must not be modified afterwards.
+        :pd.DataFrame df: The dataframe to write
+        :str fullpath: path of the csv to write
+        """
+
+        self.submit(df.to_csv, fullpath, index=False)
+
+        return fullpath
+
+    def close(self):
+        """
+        Wait for every queued job, re-raising the first failure
+        """
+
+        self.executor.shutdown(wait=True)
+
+        for future in self.futures:
+            future.result()
+
+
+def stages_to_run(start, stop):
+    """
+    Return the ordered list of stages between start and stop, inclusive
+    :str start: first stage to run
+    :str stop: last stage to run
+    """
+
+    first, last = STAGES.index(start), STAGES.index(stop)
+
+    if first > last:
+        raise ValueError('Stage {} comes after stage {}.'.format(start, stop))
+
+    return STAGES[first:last + 1]
+
+
+def resume_path(meta, stage):
+    """
+    Return the persisted input artifact for a stage
+    :dict meta: metadata for the dataset
+    :str stage: stage to resume from
+    """
+
+    if stage == STAGES[0]:
+        return meta.get('data_path')
+
+    previous = STAGES[STAGES.index(stage) - 1]
+    artifact_path = meta.get(STAGE_ARTIFACTS[previous])
+
+    if artifact_path is None:
+        raise ValueError('Cannot resume from {}: the {} stage has no'
+                         ' persisted artifact yet.'.format(stage, previous))
+
+    return artifact_path
@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+__version__ = 'v1.0.0 (10-19-2026)'
+
+
+def _merge_dtype(old, new):
+    """
+    Merge the dtype seen in an earlier chunk with the one of a new chunk
+    :str old: dtype string so far, None if unseen
+    :str new: dtype string of the new chunk
+    """
+
+    if old is None or old == new:
+        return new
+    try:
+        return str(np.result_type(np.dtype(old), np.dtype(new)))
+    except TypeError:
+        return 'object'
+
+
+def _to_builtin(value):
+    """
+    Convert numpy scalars into python builtins so they can be written to json
+    """
+
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _init_column():
+    return {'dtype': None,
+            'null_count': 0,
+            'counts': pd.Series(dtype='int64')}
+
+
+def _update_column(state, series):
+    """
+    Fold one chunk of a column into its running profile
+    :dict state: running profile of the column
+    :pd.Series series: chunk of the column
+    """
+
+    state['dtype'] = _merge_dtype(state['dtype'], str(series.dtype))
+
+    non_null = series.dropna()
+    state['null_count'] += int(series.shape[0] - non_null.shape[0])
+
+    if non_null.shape[0] == 0:
+        return
+
+    # Exact counts, merged chunk by chunk
+    state['counts'] = state['counts'].add(non_null.value_counts(),
+                                          fill_value=0)
+
+
+def _finalize_column(state, top_k):
+    """
+    Turn a running column profile into its json compliant summary. Only
+    the top_k most frequent values are kept, so value_counts_complete
+    tells whether they are every distinct value of the column.
+    """
+
+    counts = state['counts'].astype('int64') \
+        .sort_values(ascending=False, kind='mergesort')
+
+    return {'dtype': state['dtype'] or 'object',
+            'null_count': state['null_count'],
+            'distinct_count': len(counts),
+            'value_counts_complete': len(counts) <= top_k,
+            'value_counts': [[_to_builtin(v), int(c)]
+                             for v, c in counts.iloc[:top_k].items()]}
+
+
+def profile_chunks(chunks, top_k=20):
+    """
+    Build a profile from an iterable of DataFrame chunks in a single pass
+    :iterable chunks: DataFrames sharing the same columns
+    :int top_k: number of most frequent values kept per column
+    """
+
+    states = {}
+    row_num = 0
+
+    for chunk in chunks:
+        row_num += int(chunk.shape[0])
+        for col in chunk.columns:
+            state = states.setdefault(col, _init_column())
+            _update_column(state, chunk[col])
+
+    columns = {str(col): _finalize_column(state, top_k)
+               for col, state in states.items()}
+
+    return {'row_num': row_num,
+            'columns': columns,
+            'profile_version': __version__}
+
+
+def profile_data(data_path, chunksize=100000, top_k=20):
+    """
+    Stream a csv once and profile every column: dtype, null count,
+    distinct count and value frequencies.
+    :str data_path: path to a csv to profile
+    :int chunksize: number of rows read at a time
+    :int top_k: number of most frequent values kept per column
+    """
+
+    chunks = pd.read_csv(data_path, chunksize=chunksize)
+
+    return profile_chunks(chunks, top_k)
+
+
+def profile_df(df, top_k=20):
+    """
+    Profile an in-memory DataFrame
+    :pd.DataFrame df: df of interest
+    :int top_k: number of most frequent values kept per column
+    """
+
+    return profile_chunks([df], top_k)
+
+
+def profile_values(profile, col):
+    """
+    Return the distinct values of col from a profile, including None
+    if the column holds nulls. Returns None if the profile cannot answer,
+    in which case callers should fall back to scanning the data.
+    :dict profile: profile as produced by profile_data
+    :str col: column name
+    """
+
+    col_profile = (profile or {}).get('columns', {}).get(col)
+
+    if col_profile is None or not col_profile.get('value_counts_complete'):
+        return None
+
+    values = [v for v, _ in col_profile['value_counts']]
+    if col_profile['null_count'] > 0:
+        values.append(None)
+
+    return values
+
+
+def profile_value_counts(profile, col):
+    """
+    Return the value counts of col from a profile as a pd.Series,
+    most frequent first. Returns None if col was not profiled.
+    :dict profile: profile as produced by profile_data
+    :str col: column name
+    """
+
+    col_profile = (profile or {}).get('columns', {}).get(col)
+
+    if col_profile is None:
+        return None
+
+    value_counts = col_profile['value_counts']
+
+    return pd.Series([c for _, c in value_counts],
+                     index=[v for v, _ in value_counts], name=col)
+
+
+def recode_column(values, mapping):
+    """
+    Recode a column through a mapping with one lookup per distinct value.
+    Values missing from the mapping become NaN and are returned.
+    :pd.Series values: column to recode
+    :dict mapping: old value -> new value
+    :return: recoded pd.Series and list of unmapped values
+    """
+
+    codes, uniques = pd.factorize(values)
+    keys = list(uniques)
+
+    # factorize codes nulls as -1; give them their own slot, mapped by any
+    # null key (None from a profile, NaN from a scan of the values)
+    null_keys = [key for key in mapping
+                 if pd.api.types.is_scalar(key) and pd.isna(key)]
+    mapping = {**mapping, None: mapping[null_keys[0]]} if null_keys \
+        else mapping
+    if (codes < 0).any():
+        codes = np.where(codes < 0, len(keys), codes)
+        keys.append(None)
+
+    found = [key in mapping for key in keys]
+    mapped = pd.Series([mapping.get(key, np.nan) for key in keys]).values
+    missing = [key for key, hit in zip(keys, found) if not hit]
+
+    return pd.Series(mapped[codes], index=values.index,
+                     name=values.name), missing
@@ -1,13 +1,38 @@
+import pandas as pd
 import questionary
+import re
 
+from utils.profile_utils import profile_values, recode_column
 
-def get_unique_values(df, df_col):
+VALID_RELATIONS = ['<', '>', '>=', '<=', '=']
+
+# Qualifiers found in front of numbers inside value cells
+QUALIFIERS = {'': '=', '=': '=', '~': '=', '≈': '=',
+              '<': '<', '<<': '<', '>': '>', '>>': '>',
+              '<=': '<=', '=<': '<=', '≤': '<=',
+              '>=': '>=', '=>': '>=', '≥': '>='}
+
+_NUMBER = r'[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?'
+
+# Optional qualifier, a number and an optional upper end of a range
+QUALIFIED_VALUE = re.compile(
+    r'^\s*(?P<qualifier><<|>>|<=|=<|>=|=>|[<>=~≈≤≥])?\s*'
+    r'(?P<value>' + _NUMBER + r')'
+    r'(?:\s*(?:-|–|to)\s*(?P<upper>' + _NUMBER + r'))?\s*$')
+
+
+def get_unique_values(df, df_col, profile=None):
     """
     return unique values for the df_col
     :pd.DataFrame df: df of interest
     :str df_col: name of the df column
+    :dict profile: column profile of df, used instead of a scan if given
     """
 
+    values = profile_values(profile, df_col)
+    if values is not None:
+        return values
+
     return list(set(df[df_col].values))
 
 
@@ -25,18 +50,19 @@ def standardize_op(invalid_op, valid_ops):
     return assignment
 
 
-def get_relation_map(df, relation_col):
+def get_relation_map(df, relation_col, profile=None):
     """
     Assign non-standard relation values to
     a standard relation value.
     :pd.DataFrame df: df with class to map
     :str relation_col: name of column containing relations
+    :dict profile: column profile of df, used instead of a scan if given
     """
 
     relation_map = {}
-    valid_relations = ['<', '>', '>=', '<=', '=']
+    valid_relations = list(VALID_RELATIONS)
 
-    relation_vals = get_unique_values(df, relation_col)
+    relation_vals = get_unique_values(df, relation_col, profile)
 
     warned = False
     warning = \
@@ -55,17 +81,94 @@ def get_relation_map(df, relation_col):
     return relation_map
 
 
+def relation_map_from_meta(relation_map):
+    """
+    Turn a relation map read back from the metadata json into the one
+    recorded in memory: the json keys of a null relation ('null' for None,
+    'NaN' for NaN) become None again
+    :dict relation_map: relation map as stored in the metadata
+    """
+
+    null_keys = ['null', 'NaN', 'nan', 'None']
+
+    return {None if k in null_keys else k: v
+            for k, v in relation_map.items()}
+
+
 def df_add_std_relation(df, relation_map, relation_col):
     """
-    df_add_std_relation adds standardized relations to a df
+    df_add_std_relation adds standardized relations to a df.
+    Only the relation column is read; the std_relation column is added
+    in place. Valid relations map to themselves.
     :pd.DataFrame df: df of interest
     :dict relation_map: mapping of old relations to new
+    :str relation_col: name of column containing relations
+    """
+
+    relation_map = {**{r: r for r in VALID_RELATIONS}, **relation_map}
+
+    std_relation, missing = recode_column(df[relation_col], relation_map)
+    if missing:
+        print("Relations {} are not in the relation map and were set to"
+              " NaN.".format(missing))
+
+    df['std_relation'] = std_relation.values
+
+    return df
+
+
+def split_qualified_values(values, default_relations=None):
+    """
+    Split value cells such as '>10', '<=0.3', '~5', '1.2e-6' or '5-10'
+    into a relation and a number. Ranges become their midpoint.
+    :pd.Series values: raw value cells
+    :pd.Series default_relations: relation of cells without a qualifier,
+        '=' if None
+    :return: relations, numbers (NaN where unparsable) and a dict counting
+        qualified, range and unparsable cells
+    """
+
+    parts = values.astype(str).str.extract(QUALIFIED_VALUE)
+    parsed = parts['value'].notna()
+
+    lower = pd.to_numeric(parts['value'])
+    upper = pd.to_numeric(parts['upper'])
+    is_range = upper.notna()
+    numbers = lower.where(~is_range, (lower + upper) / 2)
+
+    qualifiers = parts['qualifier'].fillna('')
+    relations = qualifiers.map(QUALIFIERS)
+    if default_relations is not None:
+        relations = relations.mask(qualifiers == '', default_relations)
+    relations = relations.where(parsed)
+
+    counts = {'qualified': int((qualifiers != '').sum()),
+              'ranges': int(is_range.sum()),
+              'unparsable': int((~parsed & values.notna()).sum())}
+
+    return relations, numbers, counts
+
+
+def df_split_value_qualifiers(df, value_col, relation_col=None):
+    """
+    Fill std_relation and std_values from a value column whose cells carry
+    their own qualifiers. Cells without a qualifier take their relation
+    from relation_col (already standardized into std_relation) if given.
+    Columns are added in place.
+    :pd.DataFrame df: df of interest
+    :str value_col: name of the column holding qualified values
+    :str relation_col: name of the relation column, if any
+    :return: df and the counts of split_qualified_values
     """
 
-    std_df = df \
-        .replace(to_replace=relation_map) \
-        .rename(columns={relation_col: 'std_relation'})
+    default_relations = df['std_relation'] if relation_col else None
+    relations, numbers, counts = split_qualified_values(df[value_col],
+                                                        default_relations)
+
+    df['std_relation'] = relations.values
+    df['std_values'] = numbers.values
 
-    std_df[relation_col] = df[relation_col]
+    print("Split value cells: {qualified} with qualifiers, {ranges} ranges,"
+          " {unparsable} unparsable (set to NaN).".format(**counts))
 
-    return std_df
+    return df, counts
@@ -94,13 +94,14 @@ def class_keep_indices(df, key_col, filter_fn):
     :fn filter_fn: function to filter on
     """
 
-    unique_keys = list(set(df[key_col]))
+    unique_keys = list(set(df[key_col].tolist()))
+    positions = df.groupby(key_col, sort=False).indices
     idx_keep_dict = {}
 
     print('Searching for replicates.')
     for key in tqdm.tqdm(unique_keys):
 
-        group = df.loc[lambda x:x[key_col] == key]
+        group = df.iloc[positions[key]]
         idx = filter_fn(group)
 
         idx_keep_dict[key] = idx
@@ -121,20 +122,19 @@ def replicate_rmsd(df, key_col, value_col, relation_col):
     """
 
     uncensored_df = df[~df[relation_col].isin(['<', '<=', '>', '>='])]
+    values = uncensored_df[value_col]
+    groups = uncensored_df[key_col]
 
-    replicate_keys = pd.DataFrame(uncensored_df[key_col].value_counts()) \
-        .loc[lambda x:x[key_col] > 1] \
-        .index.to_list()
-
-    unique_devs = []
-    for key in replicate_keys:
-        values = uncensored_df \
-            .loc[lambda x:x[key_col] == key, value_col].values
-        unique_devs.extend(values - values.mean())
+    # Deviations from the group mean, for groups with replicates only.
+    # A missing value makes the whole group's mean (and deviations) NaN.
+    sizes = groups.map(groups.value_counts())
+    means = values.groupby(groups).transform('mean')
+    has_nan = values.isna().groupby(groups).transform('any')
+    devs = (values - means).where((sizes > 1) & ~has_nan)
 
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", category=RuntimeWarning)
-        rmsd = np.sqrt(np.nanmean([dev ** 2 for dev in unique_devs]))
+        rmsd = np.sqrt(np.nanmean(devs.values[sizes.values > 1] ** 2))
 
     return rmsd
 
@@ -233,7 +233,7 @@ def get_val_idx(group, value_col, mle, rmsd):
 
 
 def value_keep_indices(df, key_col, relation_col, smiles_col, value_col,
-                       threshold):
+                       threshold, std_est=None):
     """
     For a a value column, grab indices to keep.
     :pd.DataFrame df: DataFrame to curate
@@ -242,15 +242,18 @@ def value_keep_indices(df, key_col, relation_col, smiles_col, value_col,
     :str smiles_col: name of column holding std_smiles
     :str value_col: name of column holding our values
     :float threshold: maximum distance between two replicates
+    :float std_est: replicate rmsd if df is only part of the dataset
     """
 
-    unique_keys = list(set(df[key_col]))
-    std_est = replicate_rmsd(df, smiles_col, value_col, relation_col)
+    unique_keys = list(set(df[key_col].tolist()))
+    positions = df.groupby(key_col, sort=False).indices
+    if std_est is None:
+        std_est = replicate_rmsd(df, smiles_col, value_col, relation_col)
     idx_keep_dict = {}
 
     print('Searching for replicates.')
     for key in tqdm.tqdm(unique_keys):
-        group = df.loc[lambda x:x[key_col] == key]
+        group = df.iloc[positions[key]]
         mle = mle_censored_mean(group, std_est, value_col, relation_col)
         idx = get_val_idx(group, value_col, mle, std_est)
 
@@ -266,6 +269,11 @@ def resolve_type(df, value_col):
     :pd.DataFrame df: dataframe of interest
     :str value_col: value column to resolve
     """
+
+    # Nothing to coerce if the values never went through text
+    if pd.api.types.is_numeric_dtype(df[value_col]):
+        return df
+
     df.loc[::, value_col] = pd.to_numeric(df[value_col], errors='coerce')
 
     return df
@@ -288,5 +296,16 @@ def df_filter_replicates(df, idx_keep_dict):
     return df.loc[list(non_none_dict.values()), ::]
 
 
+def get_filter(fn_name):
+    """
+    Return the filter function recorded under fn_name in the metadata
+    :str fn_name: __name__ of the filter function
+    """
+
+    for filter_fn in filters.values():
+        if filter_fn.__name__ == fn_name:
+            return filter_fn
+
+
 filters = {'unanimous': _unanimous_class_filter,
            'majority': _simple_majority_filter}
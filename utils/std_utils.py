@@ -1,7 +1,10 @@
+import functools
 import molvs
+import numpy as np
 import os
 import pandas as pd
 import questionary
+import time
 import tqdm
 
 from multiprocessing import pool
@@ -10,7 +13,25 @@ from rdkit import Chem, rdBase
 import utils.meta_utils as meta_utils
 
 rdBase.DisableLog('rdApp.error')
-__version__ = 'v1.0.0 (07-01-2020)'
+__version__ = 'v1.2.0 (10-19-2026)'
+
+# Identity keys replicates can be grouped on, and the column holding each
+KEY_COLS = {'inchi_key': 'inchi_key',
+            'connectivity': 'connectivity_key',
+            'smiles_hash': 'smiles_hash'}
+
+# Elements of a molecule that may skip MolVS: no H atoms left to remove and
+# no metals to disconnect (B, C, N, O, F, Si, P, S, Cl, Se, Br, I)
+CLEAN_ELEMENTS = frozenset([5, 6, 7, 8, 9, 14, 15, 16, 17, 34, 35, 53])
+
+# Built once per process, not once per molecule
+_STANDARDIZER = molvs.standardize.Standardizer(prefer_organic=True)
+
+# Reactant side of every MolVS Normalization. A molecule none of them
+# match is left untouched by the Normalizer.
+_NORMALIZATION_QUERIES = [
+    Chem.MolFromSmarts(normalization.transform_str.split('>>')[0])
+    for normalization in _STANDARDIZER.normalizations]
 
 
 def read_data(data_path):
@@ -21,7 +42,27 @@ def read_data(data_path):
     return pd.read_csv(data_path)
 
 
-def std_mol_from_smiles(smiles):
+def is_clean_mol(mol):
+    """
+    Cheap check for a parsed molecule MolVS would leave unchanged: a single
+    fragment of CLEAN_ELEMENTS with no formal charges or isotopes, matching
+    no Normalization. Nothing is then left for fragment_parent to do.
+    :Chem.Mol mol: molecule parsed from SMILES
+    """
+
+    if len(Chem.GetMolFrags(mol)) != 1:
+        return False
+
+    for atom in mol.GetAtoms():
+        if atom.GetAtomicNum() not in CLEAN_ELEMENTS \
+                or atom.GetFormalCharge() or atom.GetIsotope():
+            return False
+
+    return not any(mol.HasSubstructMatch(query)
+                   for query in _NORMALIZATION_QUERIES)
+
+
+def std_mol_from_smiles(smiles, fast_path=True):
     """
     Adapted from:
     github.com/ATOMconsortium/AMPL/blob/master/atomsci/ddm/utils/struct_utils.py
@@ -29,41 +70,46 @@ def std_mol_from_smiles(smiles):
     Generate a standardized RDKit Mol object for the larges fragment
     of the molecule specified by smiles.
     :str smiles: SMILES formatted string
+    :bool fast_path: return clean molecules (see is_clean_mol) as parsed,
+        without running MolVS
     """
 
     cmpd_mol = Chem.MolFromSmiles(smiles)
 
     if cmpd_mol is None:
         return None
+    elif fast_path and is_clean_mol(cmpd_mol):
+        return cmpd_mol
     else:
-        stdizer = molvs.standardize.Standardizer(prefer_organic=True)
-        return stdizer.fragment_parent(cmpd_mol)
+        return _STANDARDIZER.fragment_parent(cmpd_mol)
 
 
-def _std_smiles_from_smiles(smiles):
+def _std_smiles_from_smiles(smiles, fast_path=True):
     """
     Adapted from:
     github.com/ATOMconsortium/AMPL/blob/master/atomsci/ddm/utils/struct_utils.py
     Generate a standardized SMILES string for the largest fragment
     of the molecule specified by smiles.
     :str smiles: SMILES formatted string
+    :bool fast_path: skip MolVS for clean molecules
     """
 
     try:
-        std_mol = std_mol_from_smiles(smiles)
+        std_mol = std_mol_from_smiles(smiles, fast_path)
         return Chem.MolToSmiles(std_mol)
     except Exception:
         return 'invalid_smiles'
 
 
-def _std_ik_from_smiles(smiles):
+def _std_ik_from_smiles(smiles, fast_path=True):
     """
     Generate a standardized inchi key for a given molecule specified by smiles
     :str smiles: SMILES formatted string
+    :bool fast_path: skip MolVS for clean molecules
     """
 
     try:
-        std_mol = std_mol_from_smiles(smiles)
+        std_mol = std_mol_from_smiles(smiles, fast_path)
         return Chem.inchi.MolToInchiKey(std_mol)
     except Exception:
         return "invalid_smiles"
@@ -184,6 +230,172 @@ def df_add_ik(df, smiles_col, workers=8):
     return df
 
 
+def df_add_key(df, key_type='inchi_key', workers=8):
+    """
+    Add the identity key replicates are grouped on, computed from the
+    std_smiles column:
+    'inchi_key' - the full InChI key
+    'connectivity' - the first (connectivity) block of the InChI key,
+        next to the full key
+    'smiles_hash' - a 64-bit hash of the canonical std SMILES, stored as
+        int64. Needs no RDKit, so no InChI key is made
+    :pd.DataFrame df: df with a std_smiles column
+    :str key_type: one of KEY_COLS
+    :int workers: number of CPUs to devote
+    """
+
+    if key_type == 'smiles_hash':
+        hashes = pd.util.hash_array(df['std_smiles'].to_numpy(dtype=object))
+        df['smiles_hash'] = hashes.view(np.int64)
+        return df
+
+    df = df_add_ik(df, 'std_smiles', workers)
+    if key_type == 'connectivity':
+        df['connectivity_key'] = df['inchi_key'].str.split('-').str[0]
+
+    return df
+
+
+def df_add_ik_unique(df, smiles_col, workers=8):
+    """
+    Add an inchi key column, generating one key per distinct SMILES.
+    Used to add InChI keys late, to data already reduced by resolve.
+    :pd.DataFrame df: df of interest
+    :str smiles_col: name of smiles column
+    :int workers: number of CPUs to devote
+    """
+
+    smiles = pd.DataFrame({'smiles': pd.unique(df[smiles_col])})
+    smiles = df_add_ik(smiles, 'smiles', workers).set_index('smiles')
+    df['inchi_key'] = df[smiles_col].map(smiles['inchi_key'])
+
+    return df
+
+
+def _list_structures(smi_list, key_type='inchi_key'):
+    """
+    Private function for multiprocessing in BackgroundStructures
+    :list smi_list: Batch of smiles strings to process
+    :str key_type: identity key to add, one of KEY_COLS
+    :return: df of smiles, std_smiles and key columns
+    """
+
+    structures = pd.DataFrame({'smiles': smi_list}, dtype=object)
+    structures['std_smiles'] = _list_smiles_from_smiles(smi_list)
+
+    if key_type == 'smiles_hash':
+        return df_add_key(structures, key_type)
+
+    structures['inchi_key'] = _list_ik_from_smiles(
+        structures['std_smiles'].tolist())
+    if key_type == 'connectivity':
+        structures['connectivity_key'] = \
+            structures['inchi_key'].str.split('-').str[0]
+
+    return structures
+
+
+class BackgroundStructures:
+    """
+    Standardizes every distinct SMILES, and keys it, on a process pool
+    while the main process goes on prompting the user. join waits for
+    the results, which can then be mapped onto the rows by SMILES.
+    """
+
+    def __init__(self, smiles, workers=8, key_type='inchi_key'):
+        """
+        Start standardizing in the background and return at once
+        :array-like smiles: SMILES to standardize
+        :int workers: number of CPUs to devote
+        :str key_type: identity key to add, one of KEY_COLS
+        """
+
+        unique = pd.unique(pd.Series(smiles, dtype=object)).tolist()
+        batchsize = 200
+        batches = [unique[i:i+batchsize]
+                   for i in range(0, len(unique), batchsize)]
+
+        self.key_type = key_type
+        self.n_batches = len(batches)
+        self.structures = None
+
+        print('Standardizing Smiles in the background')
+        self.pool = pool.Pool(max(workers, 1))
+        self.results = self.pool.imap(
+            functools.partial(_list_structures, key_type=key_type), batches)
+        self.pool.close()  # Workers exit once every batch is done
+
+    def join(self):
+        """
+        Wait for the background standardization to finish
+        :return: df of std_smiles and key columns indexed by the input SMILES
+        """
+
+        if self.structures is None:
+            print('Joining background standardization')
+            batches = list(tqdm.tqdm(self.results, total=self.n_batches))
+            self.pool.join()
+            if not batches:
+                batches = [_list_structures([], self.key_type)]
+            self.structures = pd.concat(batches).set_index('smiles')
+
+        return self.structures
+
+
+def std_structures(smiles, workers=8, key_type='inchi_key'):
+    """
+    Standardize every distinct SMILES once, to be shared by several
+    datasets (e.g. the endpoints of one file)
+    :array-like smiles: SMILES to standardize
+    :int workers: number of CPUs to devote
+    :str key_type: identity key to add, one of KEY_COLS
+    :return: df of std_smiles and key columns indexed by the input SMILES
+    """
+
+    return BackgroundStructures(smiles, workers, key_type).join()
+
+
+def validate_fast_path(smi_list):
+    """
+    Standardize every SMILES and key its std SMILES, as standardize does,
+    with and without the fast path. Check both give the same std SMILES
+    and InChI keys and report the throughput of each.
+    :list smi_list: list of SMILES strings
+    :return: df of the SMILES whose results differ (empty if none)
+    """
+
+    results = {}
+    timings = {}
+    for fast_path in [False, True]:
+        start = time.perf_counter()
+        std_smiles = [_std_smiles_from_smiles(smi, fast_path)
+                      for smi in tqdm.tqdm(smi_list)]
+        std_ik = [_std_ik_from_smiles(smi, fast_path) for smi in std_smiles]
+        timings[fast_path] = time.perf_counter() - start
+        results[fast_path] = pd.DataFrame({'std_smiles': std_smiles,
+                                           'inchi_key': std_ik})
+
+    mols = [Chem.MolFromSmiles(smi) for smi in smi_list]
+    n_clean = sum(is_clean_mol(mol) for mol in mols if mol is not None)
+
+    differs = (results[False] != results[True]).any(axis=1)
+    mismatches = pd.concat([pd.Series(smi_list, name='smiles'),
+                            results[False].add_prefix('molvs_'),
+                            results[True].add_prefix('fast_path_')],
+                           axis=1).loc[differs]
+
+    n = len(smi_list)
+    print("{} of {} molecules ({:.1%}) take the fast path"
+          .format(n_clean, n, n_clean / n if n else 0))
+    for fast_path, label in [(False, 'MolVS only'), (True, 'fast path')]:
+        print("{:<10}: {:.2f}s, {:.0f} molecules/s".format(
+            label, timings[fast_path], n / timings[fast_path]))
+    print("Speedup: {:.2f}x".format(timings[False] / timings[True]))
+    print("Identical output:", mismatches.empty)
+
+    return mismatches
+
+
 def get_invalid_smiles(df, base_smiles_col, std_smiles_col):
     """
     Return invalid smiles indices for a given data frame
@@ -201,25 +413,37 @@ def get_invalid_smiles(df, base_smiles_col, std_smiles_col):
     return invalid_dict
 
 
-def write_std(df, path, prefix='std_'):
+def get_std_path(data_path, prefix='std_'):
     """
-    write_std writes a standardized csv at a specified path
-    :pd.DataFrame df: The dataframe to write
-    :str outpath: path to output directory
-    :str filename: specific filename to write to
+    Compose the path of a derived csv from the raw data path and a prefix
+    :str data_path: path to the raw data
+    :str prefix: prefix for the derived file name
     """
 
-    # Compose filename from prefix and data path
-    meta = meta_utils.read_meta(path)
-
-    outpath = os.path.dirname(meta.get('data_path'))
-    old_name = os.path.basename(meta.get('data_path'))
+    outpath = os.path.dirname(data_path)
+    old_name = os.path.basename(data_path)
     filename = prefix + old_name
 
-    if not os.path.isdir(outpath):
+    if outpath and not os.path.isdir(outpath):
         os.makedirs(outpath)
 
-    fullpath = os.path.join(outpath, filename)
+    return os.path.join(outpath, filename)
+
+
+def write_std(df, path, prefix='std_', meta=None):
+    """
+    write_std writes a standardized csv at a specified path
+    :pd.DataFrame df: The dataframe to write
+    :str path: directory where metadata resides
+    :str prefix: prefix for the derived file name
+    :dict meta: metadata if already read, to avoid re-reading it
+    """
+
+    # Compose filename from prefix and data path
+    if meta is None:
+        meta = meta_utils.read_meta(path)
+
+    fullpath = get_std_path(meta.get('data_path'), prefix)
 
     df.to_csv(fullpath, index=False)
 
@@ -313,6 +537,29 @@ def get_smiles_col(free_cols):
     return get_valid_col(prompt, free_cols)
 
 
+def get_endpoint_cols(free_cols):
+    """
+    Get input from the user to select the class and value columns
+    of a file holding several endpoints.
+    :list free_cols: list of unassigned df columns
+    """
+
+    prompt = "Select the class and value columns, one per endpoint."
+
+    return questionary.checkbox(prompt, choices=free_cols).ask()
+
+
+def get_endpoint_type(endpoint_col):
+    """
+    Ask whether an endpoint column holds classes or values
+    :str endpoint_col: name of the endpoint column
+    """
+
+    prompt = "Does {} hold classes or values?".format(endpoint_col)
+
+    return questionary.select(prompt, choices=['class', 'value']).ask()
+
+
 def get_rel_col(free_cols):
     """
     Get input from the user to discern the relation
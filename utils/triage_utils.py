@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+__version__ = 'v1.0.0 (10-19-2026)'
+
+# Rows read from a predictions file at a time
+CHUNK_SIZE = 10 ** 6
+
+
+def count_rows(path, pred_col, chunksize=CHUNK_SIZE):
+    """
+    Count the rows of a predictions file holding a prediction, reading
+    only the prediction column a chunk at a time
+    :str path: path to the predictions csv
+    :str pred_col: name of the prediction column
+    :int chunksize: number of rows read at a time
+    """
+
+    rows = 0
+    for chunk in pd.read_csv(path, usecols=[pred_col], chunksize=chunksize):
+        rows += int(chunk[pred_col].notna().sum())
+
+    return rows
+
+
+def _select(kept, k, pred_col, largest):
+    """
+    Keep the k best rows of kept, in file order. Of rows tied with the
+    k-th best, the first ones in the file are kept.
+    :pd.DataFrame kept: candidate rows
+    :int k: number of rows to keep
+    :str pred_col: name of the prediction column
+    :bool largest: if True the best predictions are the largest
+    """
+
+    if len(kept) <= k:
+        return kept
+
+    values = kept[pred_col].to_numpy(dtype=float)
+    if largest:
+        values = -values
+    kth = np.partition(values, k - 1)[k - 1]
+
+    keep = values < kth
+    ties = np.flatnonzero(values == kth)
+    keep[ties[:k - np.count_nonzero(keep)]] = True
+
+    return kept.loc[keep]
+
+
+def top_k_stream(path, pred_col, k, largest=False, chunksize=CHUNK_SIZE):
+    """
+    Stream a predictions file and keep its k best rows. Memory holds at
+    most the k rows kept so far and one chunk. Rows of a chunk that cannot
+    beat the current k-th best are dropped before merging.
+    :str path: path to the predictions csv
+    :str pred_col: name of the prediction column
+    :int k: number of rows to keep
+    :bool largest: if True keep the largest predictions, else the lowest
+    :int chunksize: number of rows read at a time
+    :return: the kept rows sorted best first (ties in file order) and the
+        number of rows with a prediction
+    """
+
+    if k < 1:
+        raise ValueError('Cannot keep {} rows, k must be at least 1.'
+                         .format(k))
+
+    kept = None
+    rows = 0
+
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk = chunk.loc[chunk[pred_col].notna()]
+        rows += len(chunk)
+
+        if kept is not None and len(kept) >= k:
+            bound = kept[pred_col].min() if largest else kept[pred_col].max()
+            chunk = chunk.loc[chunk[pred_col] > bound] if largest \
+                else chunk.loc[chunk[pred_col] < bound]
+
+        kept = chunk if kept is None else pd.concat([kept, chunk])
+        kept = _select(kept, k, pred_col, largest)
+
+    if kept is None:
+        return pd.DataFrame(), 0
+
+    kept = kept.sort_values(pred_col, ascending=not largest, kind='mergesort')
+
+    return kept.reset_index(drop=True), rows
@@ -1,17 +1,189 @@
+import numpy as np
 import pandas as pd
 import questionary
+import re
 
+from fractions import Fraction
 
-def get_unit_values(df, unit_col):
+from utils.profile_utils import profile_values, profile_value_counts
+
+__version__ = 'v1.0.0 (10-19-2026)'
+
+# SI prefixes understood in front of any registered unit
+SI_PREFIXES = {'f': Fraction(1, 10 ** 15),
+               'p': Fraction(1, 10 ** 12),
+               'n': Fraction(1, 10 ** 9),
+               'u': Fraction(1, 10 ** 6),
+               'm': Fraction(1, 10 ** 3),
+               'c': Fraction(1, 10 ** 2),
+               'd': Fraction(1, 10),
+               'k': Fraction(10 ** 3)}
+
+# Registered units: factor to the base unit and dimension exponents over
+# amount (N), volume (V), mass (W) and time (T). Molar is mol/L.
+UNIT_REGISTRY = {'mol': (Fraction(1), (1, 0, 0, 0)),
+                 'M': (Fraction(1), (1, -1, 0, 0)),
+                 'L': (Fraction(1), (0, 1, 0, 0)),
+                 'g': (Fraction(1), (0, 0, 1, 0)),
+                 's': (Fraction(1), (0, 0, 0, 1)),
+                 'min': (Fraction(60), (0, 0, 0, 1)),
+                 'h': (Fraction(3600), (0, 0, 0, 1)),
+                 'day': (Fraction(86400), (0, 0, 0, 1)),
+                 '%': (Fraction(1, 100), (0, 0, 0, 0)),
+                 'fraction': (Fraction(1), (0, 0, 0, 0)),
+                 'ratio': (Fraction(1), (0, 0, 0, 0))}
+
+# Spellings mapped onto the registry before parsing
+UNIT_ALIASES = {'hr': 'h', 'hrs': 'h', 'hour': 'h',
+                'days': 'day', 'd': 'day', 'sec': 's', 'percent': '%',
+                'l': 'L', 'ml': 'mL', 'ul': 'uL', 'nl': 'nL'}
+
+
+def get_unit_values(df, unit_col, profile=None):
     """
     return unique unit values for the unit_col
     :pd.DataFrame df: df of interest
     :str unit_col: name of the unit column
+    :dict profile: column profile of df, used instead of a scan if given
     """
 
+    values = profile_values(profile, unit_col)
+    if values is not None:
+        return values
+
     return list(set(df[unit_col].values))
 
 
+def _parse_atom(atom):
+    """
+    Parse one unit without operators (e.g. 'mL' or 'nM')
+    :str atom: unit to parse
+    :return: (factor, dimensions) or None if unknown
+    """
+
+    atom = UNIT_ALIASES.get(atom, atom)
+
+    if atom in UNIT_REGISTRY:
+        return UNIT_REGISTRY[atom]
+
+    prefix, base = atom[:1], UNIT_ALIASES.get(atom[1:], atom[1:])
+    if prefix in SI_PREFIXES and base in UNIT_REGISTRY:
+        factor, dims = UNIT_REGISTRY[base]
+        return SI_PREFIXES[prefix] * factor, dims
+
+    return None
+
+
+def _parse_terms(unit):
+    """
+    Parse a unit string into its factor to the base units and the
+    dimensions of its numerator and denominator, before they cancel
+    :str unit: unit string
+    :return: (Fraction factor, numerator dims, denominator dims) or None
+    """
+
+    unit = str(unit).strip()
+    for alias in ['µ', 'μ']:
+        unit = unit.replace(alias, 'u')
+    unit = re.sub(r'\s+', '', unit)
+
+    parts = re.split(r'([/*.·])', unit)
+    if not parts[0]:
+        return None
+
+    factor = Fraction(1)
+    numerator, denominator = np.zeros(4, dtype=int), np.zeros(4, dtype=int)
+    sign = 1
+    for part in parts:
+        if part == '/':
+            sign = -1
+        elif part in '*.·':
+            continue
+        else:
+            parsed = _parse_atom(part)
+            if parsed is None:
+                return None
+            factor = factor * parsed[0] if sign > 0 else factor / parsed[0]
+            dims = sign * np.array(parsed[1])
+            numerator += np.maximum(dims, 0)
+            denominator += np.maximum(-dims, 0)
+
+    return factor, tuple(int(d) for d in numerator), \
+        tuple(int(d) for d in denominator)
+
+
+def parse_unit(unit):
+    """
+    Parse a unit string such as 'uM', 'mL/min/kg' or '%' into its factor
+    to the base units and its dimensions. Parts after the first '/' divide.
+    :str unit: unit string
+    :return: (Fraction factor, dimension tuple) or None if unknown
+    """
+
+    terms = _parse_terms(unit)
+    if terms is None:
+        return None
+
+    factor, numerator, denominator = terms
+
+    return factor, tuple(n - d for n, d in zip(numerator, denominator))
+
+
+def conversion_factor(cur_unit, std_unit):
+    """
+    Factor multiplying values in cur_unit into std_unit, from the registry.
+    None if either unit is unknown or their dimensions differ. Dimensionless
+    units only convert within the same kind: plain numbers (%, fraction,
+    ratio) or the same ratio of quantities (e.g. mg/kg and ug/g), never
+    a mass ratio into %.
+    :str cur_unit: unit to standardize
+    :str std_unit: unit to standardize to
+    """
+
+    cur, std = _parse_terms(cur_unit), _parse_terms(std_unit)
+
+    if cur is None or std is None:
+        return None
+
+    cur_dims = tuple(n - d for n, d in zip(cur[1], cur[2]))
+    std_dims = tuple(n - d for n, d in zip(std[1], std[2]))
+    if cur_dims != std_dims:
+        return None
+    if not any(cur_dims) and cur[1:] != std[1:]:
+        return None
+
+    return float(cur[0] / std[0])
+
+
+def parse_quantity(quantity, std_unit=None):
+    """
+    Parse a number with an optional unit (e.g. '10', '10 uM') into a float
+    in std_unit.
+    :str quantity: number, optionally followed by its unit
+    :str std_unit: unit to convert to
+    """
+
+    match = re.match(r'^\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)'
+                     r'\s*(.*?)\s*$', str(quantity))
+    if match is None:
+        raise ValueError('Cannot parse quantity: {}'.format(quantity))
+
+    number, unit = float(match.group(1)), match.group(2)
+    if not unit or unit == std_unit:
+        return number
+
+    if not std_unit:
+        raise ValueError('{} has a unit but the data has no std unit to '
+                         'convert it to, give it as a plain number.'
+                         .format(quantity))
+
+    factor = conversion_factor(unit, std_unit)
+    if factor is None:
+        raise ValueError('Cannot convert {} to {}'.format(unit, std_unit))
+
+    return number * factor
+
+
 def df_add_std_units(df, std_unit):
     """
     Add the std_unit column to a df.
@@ -45,16 +217,18 @@ def get_relationship(prompt, cur_unit, std_unit):
             print('Please enter a valid number')
 
 
-def get_unit_map(df, unit_col, forced_unit=None):
+def get_unit_map(df, unit_col, forced_unit=None, profile=None):
     """
     Gets the user map to map non-standard units
     to the standard unit.
     :pd.DataFrame df: The dataframe of interest
     :str unit_col: column holding the units
+    :str forced_unit: standard unit to convert to without asking
+    :dict profile: column profile of df, used instead of a scan if given
     """
 
     unit_map = {}
-    unit_values = get_unit_values(df, unit_col)
+    unit_values = get_unit_values(df, unit_col, profile)
     unit_values = [str(x) for x in unit_values]
     num_units = len(unit_values)
 
@@ -65,7 +239,10 @@ def get_unit_map(df, unit_col, forced_unit=None):
 
     text1 = "You have {} different unit types. Here are the most common:"
     print(text1.format(num_units))
-    print(pd.DataFrame(df[unit_col].value_counts()).head())
+    value_counts = profile_value_counts(profile, unit_col)
+    if value_counts is None:
+        value_counts = df[unit_col].value_counts()
+    print(pd.DataFrame(value_counts).head())
 
     if forced_unit is None:
         prompt = "Which units should be your standard units?"
@@ -78,10 +255,21 @@ def get_unit_map(df, unit_col, forced_unit=None):
         unit_values.remove(std_unit)
         unit_map[std_unit] = 1.0
 
+    # Units known to the registry are converted without asking
+    unknown = []
+    for cur_unit in unit_values:
+        mult_factor = conversion_factor(cur_unit, std_unit)
+        if mult_factor is None:
+            unknown.append(cur_unit)
+        else:
+            unit_map[cur_unit] = mult_factor
+            print("Converting {} to {} with factor {:g}".format(
+                cur_unit, std_unit, mult_factor))
+
     prompt = "What is the multiplication factor to convert {} to {}?" \
         " Enter 'none' if unit is non-standardizable."
 
-    for cur_unit in unit_values:
+    for cur_unit in unknown:
         mult_factor = get_relationship(prompt, cur_unit, std_unit)  # get float
         unit_map[cur_unit] = mult_factor
 
@@ -91,28 +279,26 @@ def get_unit_map(df, unit_col, forced_unit=None):
 def df_units_to_vals(df, unit_col, value_col, unit_map):
     """
     Removes rows with non standardizable units and
-    filters the non_standard units to match standard units.
+    converts the values of the others to the standard units.
+    Row order is kept.
     :pd.DataFrame df: The dataframe of interest
     :str unit_col: column holding the units
     :str value_col: column holding the values
     :dict unit_map: dict mapping non_standard units to
-    multiplicative conversion to standard
+    multiplicative conversion to standard ('none' if not convertible)
     """
-    non_std = [key for key in list(unit_map.keys()) if unit_map[key] == 'none']
-
-    # Retain only valid standard changes
-    for key in non_std:
-        unit_map.pop(key, None)
 
-    std_val_df = []
+    # Unit values are str keys in the map; 'none' and unmapped become NaN
+    factors = pd.to_numeric(df[unit_col].astype(str).map(unit_map),
+                            errors='coerce').values
+    keep = ~np.isnan(factors)
 
-    # Remove non standardizable rows and standardize units
-    for unit, factor in unit_map.items():
-        group = df.loc[lambda x:x[unit_col] == unit]
-        std_vals = [x * factor for x in group[value_col].to_list()]
-        group = group.assign(std_values=std_vals)
-        std_val_df.append(group)
+    if not keep.all():
+        print("Removing {} rows with non-standardizable units."
+              .format(int((~keep).sum())))
 
-    std_val_df = pd.concat(std_val_df)
+    std_val_df = df.loc[keep]
+    std_val_df = std_val_df.assign(
+        std_values=std_val_df[value_col].values * factors[keep])
 
     return std_val_df